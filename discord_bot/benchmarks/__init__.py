@@ -0,0 +1,3 @@
+"""
+Benchmarks du bot Discord (à lancer depuis le dossier discord_bot)
+"""
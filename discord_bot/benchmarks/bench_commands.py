@@ -0,0 +1,297 @@
+"""
+Benchmark de bout en bout des commandes slash
+
+Les vrais cogs sont exécutés avec le vrai BankAPIClient contre une API
+simulée en local (benchmarks.standin_api) et des interactions Discord
+factices : on mesure ainsi le temps passé dans le bot et le client API,
+sans Discord ni backend. /search passe par un index local des opérations
+temporaire, comme dans le bot. Le script affiche, pour chaque commande, les
+latences p50/p95/p99 et le débit obtenu au niveau de concurrence demandé.
+
+Usage :
+    python -m benchmarks.bench_commands
+    python -m benchmarks.bench_commands --concurrency 50 --requests 2000 --latency 30
+    python -m benchmarks.bench_commands --commands accounts,operations --users 500
+    python -m benchmarks.bench_commands --cache redis
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from benchmarks.standin_api import StandInAPI
+from benchmarks.standin_redis import StandInRedis
+from utils.api_client import BankAPIClient
+from utils.autocomplete import AccountChoicesCache
+from utils.cache_backends import RedisBackend, SQLiteBackend
+from utils.operation_index import OperationIndex
+from cogs.accounts import AccountsCog
+from cogs.auth import AuthCog
+from cogs.operations import OperationsCog
+from config import COLOR_ERROR, EMOJI_CROSS
+
+
+class FakeMessage:
+    """Message renvoyé par un followup (wait=True)"""
+    
+    async def edit(self, **kwargs):
+        """Modification du message (ignorée)"""
+
+
+class FakeResponse:
+    """Imitation de discord.InteractionResponse"""
+    
+    def __init__(self):
+        self._done = False
+    
+    def is_done(self) -> bool:
+        return self._done
+    
+    async def defer(self, **kwargs):
+        self._done = True
+    
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+    
+    async def edit_message(self, **kwargs):
+        self._done = True
+
+
+class FakeFollowup:
+    """Imitation de discord.Webhook pour interaction.followup"""
+    
+    def __init__(self):
+        self.sent: List[Dict[str, Any]] = []
+    
+    async def send(self, *args, wait: bool = False, **kwargs) -> Optional[FakeMessage]:
+        self.sent.append(kwargs)
+        return FakeMessage() if wait else None
+
+
+class FakeAttachment:
+    """Pièce jointe d'une commande (fichier CSV pour /operation-import)"""
+    
+    def __init__(self, data: bytes, filename: str = 'operations.csv'):
+        self.data = data
+        self.filename = filename
+        self.size = len(data)
+    
+    async def read(self) -> bytes:
+        return self.data
+
+
+class FakeInteraction:
+    """Interaction Discord factice, suffisante pour les commandes des cogs"""
+    
+    def __init__(self, client: Any, user_id: int):
+        self.client = client
+        self.user = SimpleNamespace(id=user_id, name=f"user{user_id}", display_name=f"user{user_id}")
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+    
+    async def edit_original_response(self, **kwargs):
+        self.followup.sent.append(kwargs)
+
+
+class CommandRunner:
+    """Exécute les commandes des cogs pour un utilisateur simulé"""
+    
+    def __init__(self, client: Any, api: StandInAPI):
+        self.client = client
+        self.api = api
+        self.accounts = AccountsCog(client)
+        self.auth = AuthCog(client)
+        self.operations = OperationsCog(client)
+        self.commands: Dict[str, Callable[[FakeInteraction, Dict[str, Any]], Awaitable[Any]]] = {
+            'accounts': lambda i, u: self.accounts.accounts.callback(self.accounts, i),
+            'balance': lambda i, u: self.accounts.balance.callback(self.accounts, i, compte_id=self._account(u)),
+            'operations': lambda i, u: self.accounts.operations.callback(
+                self.accounts, i, compte_id=self._account(u), limite=10
+            ),
+            'stats': lambda i, u: self.accounts.stats.callback(self.accounts, i),
+            'status': lambda i, u: self.auth.status.callback(self.auth, i),
+            'search': lambda i, u: self.operations.search.callback(
+                self.operations, i, nature=random.choice(['loyer', 'courses', 'salaire']), limite=10
+            ),
+            'operation': self._operation,
+            'import': self._import,
+        }
+    
+    @staticmethod
+    def _account(user: Dict[str, Any]) -> int:
+        """Tire un compte de l'utilisateur"""
+        return random.choice(user['accounts'])
+    
+    async def _operation(self, interaction: FakeInteraction, user: Dict[str, Any]):
+        """/operation puis confirmation"""
+        await self.operations.operation.callback(
+            self.operations, interaction, compte_id=self._account(user),
+            type_operation='credit', montant=12.5, nature='Benchmark'
+        )
+        view = interaction.followup.sent[-1].get('view')
+        if view is not None:
+            # Les réponses du bouton sont vérifiées avec celles de la commande
+            await view.confirm.callback(interaction)
+    
+    async def _import(self, interaction: FakeInteraction, user: Dict[str, Any]):
+        """/operation-import d'un fichier de 20 opérations puis confirmation"""
+        lines = ['compte_id;type_operation;montant;nature']
+        for index in range(20):
+            lines.append(f"{self._account(user)};{random.choice(['credit', 'depot', 'debit'])};{index + 1},50;Benchmark")
+        
+        await self.operations.operation_import.callback(
+            self.operations, interaction, fichier=FakeAttachment('\n'.join(lines).encode('utf-8'))
+        )
+        view = interaction.followup.sent[-1].get('view')
+        if view is not None:
+            await view.confirm.callback(interaction)
+    
+    async def run(self, command: str, user: Dict[str, Any]) -> float:
+        """Exécute une commande et retourne sa durée en secondes"""
+        interaction = FakeInteraction(self.client, int(user['discord_id']))
+        start = time.perf_counter()
+        await self.commands[command](interaction, user)
+        elapsed = time.perf_counter() - start
+        
+        # Une commande qui répond par un embed d'erreur fausserait les mesures
+        # (la couleur seule ne suffit pas : le solde d'un compte à découvert est aussi en rouge)
+        for message in interaction.followup.sent:
+            embed = message.get('embed')
+            if (
+                embed is not None
+                and embed.color == discord.Color(COLOR_ERROR)
+                and (embed.title or '').startswith(EMOJI_CROSS)
+            ):
+                raise RuntimeError(f"/{command} a répondu par une erreur: {embed.title} - {embed.description}")
+        
+        return elapsed
+
+
+def percentile(values: List[float], pct: int) -> float:
+    """Retourne le centile demandé (méthode inclusive)"""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+async def run_benchmark(args: argparse.Namespace):
+    """Démarre l'API simulée et le client, puis lance les commandes"""
+    api = StandInAPI(
+        users=args.users,
+        accounts_per_user=args.accounts,
+        operations_per_account=args.operations,
+        latency=args.latency / 1000,
+        seed=args.seed
+    )
+    await api.start()
+    
+    api_client = BankAPIClient()
+    api_client.base_url = api.base_url
+    redis = None
+    if args.cache == 'sqlite':
+        api_client.shared_cache = SQLiteBackend(os.path.join(tempfile.mkdtemp(), 'cache.db'))
+    elif args.cache == 'redis':
+        redis = StandInRedis()
+        api_client.shared_cache = RedisBackend(await redis.start())
+    await api_client.start()
+    operation_index = OperationIndex(os.path.join(tempfile.mkdtemp(), 'operations.db'))
+    await operation_index.open()
+    client = SimpleNamespace(
+        api_client=api_client, operation_index=operation_index, account_choices=AccountChoicesCache()
+    )
+    
+    runner = CommandRunner(client, api)
+    commands = args.commands.split(',')
+    unknown = [command for command in commands if command not in runner.commands]
+    if unknown:
+        raise SystemExit(f"Commandes inconnues: {', '.join(unknown)} (disponibles: {', '.join(runner.commands)})")
+    
+    users = list(api.users.values())
+    latencies: Dict[str, List[float]] = {command: [] for command in commands}
+    errors: Dict[str, int] = {command: 0 for command in commands}
+    remaining = args.requests
+    
+    async def worker():
+        """Exécute des commandes tirées au hasard jusqu'à épuisement du total"""
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            command = random.choice(commands)
+            try:
+                latencies[command].append(await runner.run(command, random.choice(users)))
+            except Exception as e:
+                errors[command] += 1
+                if errors[command] == 1:
+                    print(f"Erreur sur /{command}: {e}")
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    duration = time.perf_counter() - start
+    
+    # Laisser se terminer les préchargements de pages lancés par /operations
+    await asyncio.sleep(0.1)
+    await operation_index.close()
+    await api_client.close()
+    await api.close()
+    if redis:
+        await redis.close()
+    
+    print(f"{args.requests} commandes, concurrence {args.concurrency}, {args.users} utilisateurs, "
+          f"latence API {args.latency:.0f} ms, {api.requests} requêtes API, {duration:.2f} s")
+    print(f"{'Commande':<14}{'N':>7}{'Erreurs':>9}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}{'Débit (/s)':>12}")
+    
+    for command in commands:
+        values = latencies[command]
+        if not values:
+            print(f"{'/' + command:<14}{0:>7}{errors[command]:>9}")
+            continue
+        print(
+            f"{'/' + command:<14}{len(values):>7}{errors[command]:>9}"
+            f"{percentile(values, 50) * 1000:>11.1f}"
+            f"{percentile(values, 95) * 1000:>11.1f}"
+            f"{percentile(values, 99) * 1000:>11.1f}"
+            f"{len(values) / duration:>12.1f}"
+        )
+    
+    total = sum(len(values) for values in latencies.values())
+    print(f"{'Total':<14}{total:>7}{sum(errors.values()):>9}{'':>33}{total / duration:>12.1f}")
+    
+    stats = api_client.get_stats()
+    print(f"Cache des réponses: {stats['responses']}")
+    print(f"Cache partagé: {stats['shared']}")
+    print(f"Limiteur de débit: {stats['rate_limiter']}")
+    print(f"Index des opérations: {operation_index.stats()}")
+
+
+def main():
+    """Analyse les arguments et lance le benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de bout en bout des commandes slash")
+    parser.add_argument('--commands', default='accounts,balance,operations,stats,status,search',
+                        help="Commandes à exécuter, séparées par des virgules (operation et import créent des opérations)")
+    parser.add_argument('--requests', type=int, default=1000, help="Nombre total de commandes")
+    parser.add_argument('--concurrency', type=int, default=20, help="Commandes exécutées simultanément")
+    parser.add_argument('--users', type=int, default=200, help="Utilisateurs simulés")
+    parser.add_argument('--accounts', type=int, default=2, help="Comptes par utilisateur")
+    parser.add_argument('--operations', type=int, default=200, help="Opérations par compte")
+    parser.add_argument('--latency', type=float, default=20, help="Latence moyenne de l'API simulée (ms)")
+    parser.add_argument('--cache', choices=['memory', 'sqlite', 'redis'], default='memory',
+                        help="Cache partagé du client (redis : serveur RESP local benchmarks.standin_redis)")
+    parser.add_argument('--seed', type=int, default=42, help="Graine des données et du tirage des commandes")
+    args = parser.parse_args()
+    
+    random.seed(args.seed)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Micro-benchmark de la construction des embeds (utils.embeds)
+
+Mesure le nombre d'embeds construits par seconde pour les comptes, le
+solde, une page d'opérations et les statistiques, ainsi que le coût des
+fonctions de formatage appelées pour chaque champ.
+
+Les résultats peuvent être enregistrés comme référence puis comparés
+lors d'une modification : le script se termine en erreur si un cas
+ralentit au-delà de la tolérance.
+
+Usage :
+    python -m benchmarks.bench_embeds
+    python -m benchmarks.bench_embeds --save reference.json
+    python -m benchmarks.bench_embeds --compare reference.json [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from typing import Any, Callable, Dict
+
+from utils.embeds import (
+    create_accounts_embed, create_balance_embed, create_operations_embed,
+    create_stats_embed, format_currency, format_date, get_operation_emoji
+)
+from utils.models import Account, Operation, Stats
+from utils.validators import (
+    validate_operation_type, format_operation_type_display, sanitize_input
+)
+
+TYPES = ['credit', 'debit', 'virement', 'prelevement', 'depot', 'retrait']
+
+
+def build_accounts(count: int = 5) -> list:
+    """Construit des comptes de test"""
+    return [
+        Account(
+            id=i,
+            numero_compte=f"FR76{i:010d}",
+            type_compte='courant' if i % 2 else 'epargne',
+            solde=1500.0 - i * 700,
+            negatif_autorise=500.0,
+            relation='proprietaire' if i % 3 else 'procuration',
+            disponible=2000.0 - i * 700,
+            en_negatif=i > 2
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def build_operations(count: int = 10) -> list:
+    """Construit une page d'opérations de test, avec des dates qui se répètent comme dans un historique"""
+    return [
+        Operation(
+            id=100000 + i,
+            type_operation=TYPES[i % len(TYPES)],
+            montant=(i * 37) % 5000 + 0.99,
+            date_operation=f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:{i % 60:02d}:00",
+            solde_apres=10000 - i * 1.5,
+            destinataire=f"Destinataire {i % 50}" if i % 3 else None,
+            nature=f"Nature {i % 20}",
+            description="Opération générée pour le benchmark, avec une description longue" if i % 4 == 0 else None
+        )
+        for i in range(count)
+    ]
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    """Retourne les cas mesurés"""
+    accounts = build_accounts()
+    operations = build_operations()
+    stats = Stats(3, 12345.67, 42, 3200.0, 2750.5, 449.5, 1, 8000.0)
+    dates = [op.date_operation for op in operations]
+    
+    return {
+        'create_accounts_embed': lambda: create_accounts_embed(accounts, 4500.0),
+        'create_balance_embed': lambda: create_balance_embed(accounts[1]),
+        'create_operations_embed': lambda: create_operations_embed(operations, 'FR760000000001', 1, 953, 96),
+        'create_stats_embed': lambda: create_stats_embed(stats, 'Jean Dupont'),
+        'format_date (x10)': lambda: [format_date(date) for date in dates],
+        'format_currency (x10)': lambda: [format_currency(op.montant) for op in operations],
+        'get_operation_emoji (x6)': lambda: [get_operation_emoji(t) for t in TYPES],
+        'validate_operation_type (x6)': lambda: [validate_operation_type(t) for t in TYPES],
+        'format_operation_type_display (x6)': lambda: [format_operation_type_display(t) for t in TYPES],
+        'sanitize_input': lambda: sanitize_input("  Loyer\tde   mars\r\n 2024  "),
+    }
+
+
+def measure(func: Callable[[], Any], number: int = 2000) -> float:
+    """Retourne le meilleur débit mesuré, en appels par seconde"""
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    return number / best
+
+
+def main():
+    """Lance le benchmark et affiche les résultats"""
+    parser = argparse.ArgumentParser(description="Benchmark de la construction des embeds")
+    parser.add_argument('--save', help="Enregistre les résultats comme référence (JSON)")
+    parser.add_argument('--compare', help="Compare les résultats à une référence (JSON)")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Ralentissement toléré (0.2 = 20 %%)")
+    args = parser.parse_args()
+    
+    reference = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            reference = json.load(f)
+    
+    results = {}
+    regressions = []
+    
+    print(f"{'Cas':<38}{'Appels/s':>14}{'Référence':>14}")
+    
+    for name, func in build_cases().items():
+        results[name] = rate = measure(func)
+        line = f"{name:<38}{rate:>14,.0f}"
+        
+        if name in reference:
+            line += f"{reference[name]:>14,.0f}"
+            if rate < reference[name] * (1 - args.tolerance):
+                regressions.append(name)
+                line += "  ← régression"
+        
+        print(line)
+    
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Référence enregistrée dans {args.save}")
+    
+    if regressions:
+        print(f"{len(regressions)} cas plus lent(s) que la référence: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Micro-benchmark du décodage JSON des réponses de l'API
+
+Compare, pour une page de 1000 opérations, le temps de décodage et la
+mémoire occupée avec le module json standard, orjson (si installé) et
+les structures typées de utils.models.
+
+Usage : python -m benchmarks.bench_json [nombre_operations]
+"""
+
+import json
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable
+
+from utils.json_codec import JSON_BACKEND
+from utils.models import OperationsPage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def build_payload(count: int) -> bytes:
+    """Construit une réponse /accounts/{id}/operations telle que renvoyée par l'API PHP"""
+    types = ['credit', 'debit', 'virement', 'prelevement', 'depot', 'retrait']
+    operations = [
+        {
+            'id': str(100000 + i),
+            'type_operation': types[i % len(types)],
+            'montant': f"{(i * 37) % 5000 + 0.99:.2f}",
+            'destinataire': f"Destinataire {i % 50}" if i % 3 else None,
+            'nature': f"Nature {i % 20}",
+            'description': "Opération générée pour le benchmark" if i % 4 == 0 else None,
+            'date_operation': f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:{i % 60:02d}:00",
+            'solde_apres': f"{10000 - i * 1.5:.2f}"
+        }
+        for i in range(count)
+    ]
+    response = {
+        'success': True,
+        'data': {
+            'operations': operations,
+            'pagination': {'total': count, 'limit': count, 'offset': 0, 'has_more': False}
+        }
+    }
+    return json.dumps(response, ensure_ascii=False).encode('utf-8')
+
+
+def measure_time(func: Callable[[], Any], number: int = 50) -> float:
+    """Retourne le meilleur temps moyen d'un appel, en millisecondes"""
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    return best / number * 1000
+
+
+def measure_memory(func: Callable[[], Any]) -> int:
+    """Retourne la mémoire retenue par le résultat d'un appel, en octets"""
+    tracemalloc.start()
+    result = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    """Lance le benchmark et affiche les résultats"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    payload = build_payload(count)
+    
+    cases = {
+        'json.loads': lambda: json.loads(payload),
+        'json.loads + modèles': lambda: OperationsPage.from_api(json.loads(payload)['data']),
+    }
+    
+    if orjson is not None:
+        cases['orjson.loads'] = lambda: orjson.loads(payload)
+        cases['orjson.loads + modèles'] = lambda: OperationsPage.from_api(orjson.loads(payload)['data'])
+    
+    print(f"Réponse de {count} opérations : {len(payload) / 1024:.1f} Ko "
+          f"(backend utilisé par le client : {JSON_BACKEND})")
+    print(f"{'Décodage':<28}{'Temps (ms)':>12}{'Mémoire (Ko)':>15}")
+    
+    for name, func in cases.items():
+        elapsed = measure_time(func)
+        memory = measure_memory(func)
+        print(f"{name:<28}{elapsed:>12.3f}{memory / 1024:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
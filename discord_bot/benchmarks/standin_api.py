@@ -0,0 +1,453 @@
+"""
+Serveur aiohttp local imitant l'API PHP de Bank App, pour les benchmarks
+
+Les réponses reprennent la forme de celles de l'API (montants DECIMAL
+renvoyés sous forme de chaînes, pagination, codes d'erreur) à partir de
+données générées depuis une graine. Chaque requête subit une latence
+configurable pour simuler le réseau et la base de données.
+"""
+
+import asyncio
+import base64
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+TYPES = ['credit', 'debit', 'virement', 'prelevement', 'depot', 'retrait']
+CREDIT_TYPES = ('credit', 'depot')
+NATURES = ['Salaire', 'Loyer', 'Courses', 'Électricité', 'Restaurant', 'Transport', 'Abonnement', 'Santé']
+TOKEN_EXPIRY = 3600
+
+
+def make_token(user: Dict[str, Any]) -> str:
+    """Génère un JWT (non signé) avec le même contenu que JWT::generateAccessToken"""
+    now = int(time.time())
+    payload = {
+        'user_id': user['id'],
+        'discord_id': user['discord_id'],
+        'role': 'client',
+        'type': 'access',
+        'iat': now,
+        'exp': now + TOKEN_EXPIRY
+    }
+    
+    def encode(data: Dict[str, Any]) -> str:
+        return base64.b64encode(json.dumps(data).encode()).decode()
+    
+    return f"{encode({'typ': 'JWT', 'alg': 'HS256'})}.{encode(payload)}.standin"
+
+
+class StandInAPI:
+    """API Bank App simulée, avec des données générées depuis une graine"""
+    
+    def __init__(
+        self,
+        users: int = 100,
+        accounts_per_user: int = 2,
+        operations_per_account: int = 200,
+        latency: float = 0.02,
+        jitter: float = 0.5,
+        seed: int = 42
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.users_by_discord: Dict[str, Dict[str, Any]] = {}
+        self.accounts: Dict[int, Dict[str, Any]] = {}
+        self.operations: Dict[int, List[Dict[str, Any]]] = {}
+        self._next_operation_id = 1
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ''
+        self._seed(users, accounts_per_user, operations_per_account)
+    
+    @staticmethod
+    def discord_id(user_id: int) -> str:
+        """ID Discord lié à un utilisateur simulé"""
+        return str(100000000000000000 + user_id)
+    
+    def _seed(self, users: int, accounts_per_user: int, operations_per_account: int):
+        """Génère les utilisateurs, comptes et opérations"""
+        start = datetime(2024, 1, 1)
+        account_id = 1
+        
+        for user_id in range(1, users + 1):
+            user = {
+                'id': user_id,
+                'username': f"client{user_id}",
+                'email': f"client{user_id}@example.com",
+                'nom': f"Nom{user_id}",
+                'prenom': f"Prénom{user_id}",
+                'role': 'client',
+                'discord_id': self.discord_id(user_id),
+                'accounts': []
+            }
+            self.users[user_id] = user
+            self.users_by_discord[user['discord_id']] = user
+            
+            for index in range(accounts_per_user):
+                negatif_autorise = 500.0 if index == 0 else 0.0
+                solde = 0.0
+                operations = []
+                
+                for i in range(operations_per_account):
+                    type_operation = self.random.choice(TYPES)
+                    montant = round(self.random.uniform(1, 2000), 2)
+                    # Comme l'API, ne jamais dépasser le découvert autorisé
+                    if type_operation not in CREDIT_TYPES and solde - montant < -negatif_autorise:
+                        type_operation = 'credit'
+                    solde += montant if type_operation in CREDIT_TYPES else -montant
+                    date = start + timedelta(minutes=i * 97 + self.random.randint(0, 90))
+                    operations.append(self._operation(account_id, type_operation, montant, solde, date))
+                
+                # Les opérations sont servies de la plus récente à la plus ancienne
+                operations.reverse()
+                self.operations[account_id] = operations
+                self.accounts[account_id] = {
+                    'id': account_id,
+                    'user_id': user_id,
+                    'numero_compte': f"FR76{account_id:010d}",
+                    'type_compte': 'courant' if index == 0 else 'epargne',
+                    'solde': solde,
+                    'negatif_autorise': negatif_autorise,
+                    'statut': 'actif',
+                    'relation': 'proprietaire'
+                }
+                user['accounts'].append(account_id)
+                account_id += 1
+    
+    def _operation(
+        self,
+        compte_id: int,
+        type_operation: str,
+        montant: float,
+        solde_apres: float,
+        date: datetime,
+        destinataire: Optional[str] = None,
+        nature: Optional[str] = None,
+        description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Crée une opération au format de la table operations"""
+        operation = {
+            'id': self._next_operation_id,
+            'compte_id': compte_id,
+            'type_operation': type_operation,
+            'montant': montant,
+            'destinataire': destinataire or (f"Destinataire {self.random.randint(1, 50)}" if type_operation == 'virement' else None),
+            'nature': nature or self.random.choice(NATURES),
+            'description': description,
+            'date_operation': date.strftime('%Y-%m-%d %H:%M:%S'),
+            'solde_apres': solde_apres
+        }
+        self._next_operation_id += 1
+        return operation
+    
+    # Sérialisation au format PDO (DECIMAL en chaînes)
+    
+    @staticmethod
+    def _decimal(value: float) -> str:
+        """Formate un montant comme une colonne DECIMAL renvoyée par PDO"""
+        return f"{value:.2f}"
+    
+    def _account_json(self, account: Dict[str, Any]) -> Dict[str, Any]:
+        """Sérialise un compte comme /accounts"""
+        return {
+            'id': account['id'],
+            'numero_compte': account['numero_compte'],
+            'type_compte': account['type_compte'],
+            'solde': self._decimal(account['solde']),
+            'negatif_autorise': self._decimal(account['negatif_autorise']),
+            'statut': account['statut'],
+            'relation': account['relation']
+        }
+    
+    def _operation_json(self, operation: Dict[str, Any], with_account: bool = False) -> Dict[str, Any]:
+        """Sérialise une opération, avec le numéro de compte comme /operations/search"""
+        data = {
+            **operation,
+            'montant': self._decimal(operation['montant']),
+            'solde_apres': self._decimal(operation['solde_apres'])
+        }
+        if with_account:
+            data['numero_compte'] = self.accounts[operation['compte_id']]['numero_compte']
+        else:
+            del data['compte_id']
+        return data
+    
+    # Serveur HTTP
+    
+    @staticmethod
+    def _error(message: str, status: int) -> web.Response:
+        """Réponse d'erreur au format de sendJsonError"""
+        return web.json_response({'success': False, 'error': message}, status=status)
+    
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        """Latence simulée et authentification par JWT"""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self.random.uniform(1 - self.jitter, 1 + self.jitter))
+        
+        if request.path.startswith('/auth/'):
+            return await handler(request)
+        
+        authorization = request.headers.get('Authorization', '')
+        try:
+            payload = authorization.split('.')[1]
+            user_id = json.loads(base64.b64decode(payload))['user_id']
+            request['user'] = self.users[user_id]
+        except (IndexError, ValueError, KeyError):
+            return self._error('Token invalide ou expiré', 401)
+        
+        return await handler(request)
+    
+    def _get_account(self, request: web.Request) -> Optional[Dict[str, Any]]:
+        """Retourne le compte demandé s'il appartient à l'utilisateur"""
+        account = self.accounts.get(int(request.match_info['id']))
+        if account and account['user_id'] == request['user']['id']:
+            return account
+        return None
+    
+    async def discord_token(self, request: web.Request) -> web.Response:
+        """POST /auth/discord/token"""
+        data = await request.json()
+        user = self.users_by_discord.get(data.get('discord_id'))
+        if not user:
+            return self._error('Aucun compte bancaire lié à ce Discord', 404)
+        
+        return web.json_response({
+            'success': True,
+            'access_token': make_token(user),
+            'expires_in': TOKEN_EXPIRY,
+            'user': {'id': user['id'], 'username': user['username'], 'role': user['role']}
+        })
+    
+    async def list_accounts(self, request: web.Request) -> web.Response:
+        """GET /accounts"""
+        comptes = [self._account_json(self.accounts[i]) for i in request['user']['accounts']]
+        return web.json_response({
+            'success': True,
+            'data': {
+                'comptes': comptes,
+                'solde_total': sum(self.accounts[i]['solde'] for i in request['user']['accounts']),
+                'nombre_comptes': len(comptes)
+            }
+        })
+    
+    async def account_details(self, request: web.Request) -> web.Response:
+        """GET /accounts/{id}"""
+        account = self._get_account(request)
+        if not account:
+            return self._error('Compte non trouvé ou accès refusé', 404)
+        return web.json_response({'success': True, 'data': self._account_json(account)})
+    
+    async def account_balance(self, request: web.Request) -> web.Response:
+        """GET /accounts/{id}/balance"""
+        account = self._get_account(request)
+        if not account:
+            return self._error('Compte non trouvé ou accès refusé', 404)
+        
+        disponible = account['solde'] + account['negatif_autorise']
+        return web.json_response({
+            'success': True,
+            'data': {
+                'compte_id': account['id'],
+                'numero_compte': account['numero_compte'],
+                'type_compte': account['type_compte'],
+                'solde': self._decimal(account['solde']),
+                'negatif_autorise': self._decimal(account['negatif_autorise']),
+                'disponible': disponible,
+                'en_negatif': account['solde'] < 0
+            }
+        })
+    
+    async def account_operations(self, request: web.Request) -> web.Response:
+        """GET /accounts/{id}/operations"""
+        account = self._get_account(request)
+        if not account:
+            return self._error('Compte non trouvé ou accès refusé', 404)
+        
+        query = request.query
+        limit = min(int(query.get('limit', 50)), 100)
+        offset = int(query.get('offset', 0))
+        operations = self._filter(self.operations[account['id']], query)
+        
+        return web.json_response({
+            'success': True,
+            'data': {
+                'operations': [self._operation_json(op) for op in operations[offset:offset + limit]],
+                'pagination': {
+                    'total': len(operations),
+                    'limit': limit,
+                    'offset': offset,
+                    'has_more': offset + limit < len(operations)
+                }
+            }
+        })
+    
+    @staticmethod
+    def _filter(operations: List[Dict[str, Any]], query) -> List[Dict[str, Any]]:
+        """Applique les filtres de /accounts/{id}/operations et /operations/search"""
+        def matches(op: Dict[str, Any]) -> bool:
+            if query.get('type') and op['type_operation'] != query['type']:
+                return False
+            if query.get('nature') and query['nature'].lower() not in (op['nature'] or '').lower():
+                return False
+            if query.get('destinataire') and query['destinataire'].lower() not in (op['destinataire'] or '').lower():
+                return False
+            if query.get('montant_min') and op['montant'] < float(query['montant_min']):
+                return False
+            if query.get('montant_max') and op['montant'] > float(query['montant_max']):
+                return False
+            if query.get('date_debut') and op['date_operation'] < query['date_debut']:
+                return False
+            if query.get('date_fin') and op['date_operation'] > query['date_fin']:
+                return False
+            return True
+        
+        if not any(query.get(name) for name in (
+            'type', 'nature', 'destinataire', 'montant_min', 'montant_max', 'date_debut', 'date_fin'
+        )):
+            return operations
+        return [op for op in operations if matches(op)]
+    
+    async def create_operation(self, request: web.Request) -> web.Response:
+        """POST /operations"""
+        data = await request.json()
+        account = self.accounts.get(int(data.get('compte_id', 0)))
+        if not account or account['user_id'] != request['user']['id']:
+            return self._error('Compte non trouvé ou accès refusé', 404)
+        
+        type_operation = data['type_operation']
+        montant = float(data['montant'])
+        ancien_solde = account['solde']
+        nouveau_solde = ancien_solde + (montant if type_operation in CREDIT_TYPES else -montant)
+        if nouveau_solde < -account['negatif_autorise']:
+            return self._error('Opération refusée : découvert autorisé dépassé', 400)
+        
+        account['solde'] = nouveau_solde
+        operation = self._operation(
+            account['id'], type_operation, montant, nouveau_solde, datetime.now(),
+            data.get('destinataire'), data.get('nature'), data.get('description')
+        )
+        self.operations[account['id']].insert(0, operation)
+        
+        return web.json_response({
+            'success': True,
+            'message': 'Opération enregistrée avec succès',
+            'data': {
+                'operation': self._operation_json(operation),
+                'ancien_solde': self._decimal(ancien_solde),
+                'nouveau_solde': nouveau_solde
+            }
+        }, status=201)
+    
+    async def search_operations(self, request: web.Request) -> web.Response:
+        """GET /operations/search"""
+        query = request.query
+        limit = min(int(query.get('limit', 20)), 100)
+        offset = int(query.get('offset', 0))
+        compte_ids = request['user']['accounts']
+        if query.get('compte_id'):
+            compte_ids = [i for i in compte_ids if i == int(query['compte_id'])]
+        
+        operations = [op for i in compte_ids for op in self._filter(self.operations[i], query)]
+        operations.sort(key=lambda op: op['date_operation'], reverse=True)
+        
+        results = [self._operation_json(op, with_account=True) for op in operations[offset:offset + limit]]
+        return web.json_response({'success': True, 'data': {'operations': results, 'count': len(results)}})
+    
+    async def user_profile(self, request: web.Request) -> web.Response:
+        """GET /user/profile"""
+        user = request['user']
+        return web.json_response({
+            'success': True,
+            'data': {
+                **{key: user[key] for key in ('id', 'username', 'email', 'nom', 'prenom', 'role')},
+                'nombre_comptes': len(user['accounts']),
+                'nombre_operations': sum(len(self.operations[i]) for i in user['accounts'])
+            }
+        })
+    
+    async def user_stats(self, request: web.Request) -> web.Response:
+        """GET /user/stats"""
+        user = request['user']
+        month = datetime.now().strftime('%Y-%m')
+        operations = [
+            op for i in user['accounts'] for op in self.operations[i]
+            if op['date_operation'].startswith(month)
+        ]
+        revenus = sum(op['montant'] for op in operations if op['type_operation'] in CREDIT_TYPES)
+        depenses = sum(op['montant'] for op in operations if op['type_operation'] not in CREDIT_TYPES)
+        
+        return web.json_response({
+            'success': True,
+            'data': {
+                'comptes': {
+                    'nombre': len(user['accounts']),
+                    'solde_total': self._decimal(sum(self.accounts[i]['solde'] for i in user['accounts']))
+                },
+                'operations_mois': {
+                    'nombre': len(operations),
+                    'depenses': self._decimal(depenses),
+                    'revenus': self._decimal(revenus),
+                    'solde': revenus - depenses
+                },
+                'credits': {'nombre': 0, 'montant_restant': None}
+            }
+        })
+    
+    async def user_discord(self, request: web.Request) -> web.Response:
+        """GET /user/discord"""
+        user = request['user']
+        return web.json_response({
+            'success': True,
+            'data': {
+                'linked': True,
+                'discord': {
+                    'discord_id': user['discord_id'],
+                    'discord_username': user['username'],
+                    'linked_at': '2024-01-01 00:00:00',
+                    'last_used': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                }
+            }
+        })
+    
+    def create_app(self) -> web.Application:
+        """Construit l'application aiohttp"""
+        app = web.Application(middlewares=[self._middleware])
+        app.add_routes([
+            web.post('/auth/discord/token', self.discord_token),
+            web.get('/accounts', self.list_accounts),
+            web.get(r'/accounts/{id:\d+}', self.account_details),
+            web.get(r'/accounts/{id:\d+}/balance', self.account_balance),
+            web.get(r'/accounts/{id:\d+}/operations', self.account_operations),
+            web.post('/operations', self.create_operation),
+            web.get('/operations/search', self.search_operations),
+            web.get('/user/profile', self.user_profile),
+            web.get('/user/stats', self.user_stats),
+            web.get('/user/discord', self.user_discord),
+        ])
+        return app
+    
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Démarre le serveur et retourne son URL de base"""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+    
+    async def close(self):
+        """Arrête le serveur"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,125 @@
+"""
+Serveur local parlant le protocole Redis (RESP), pour les benchmarks
+
+Implémente uniquement les commandes utilisées par le backend de cache
+redis (PING, AUTH, SELECT, GET, SET ... PX, DEL, SADD, SMEMBERS, EXPIRE),
+en mémoire, avec expiration des clés.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class StandInRedis:
+    """Serveur RESP en mémoire"""
+    
+    def __init__(self, password: Optional[str] = None):
+        self.password = password
+        # clé -> (valeur, expiration ou None)
+        self._data: Dict[bytes, Tuple[Any, Optional[float]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.commands = 0
+        self.url = ''
+    
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Démarre le serveur et retourne son URL"""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        credentials = f":{self.password}@" if self.password else ''
+        self.url = f"redis://{credentials}{host}:{port}/0"
+        return self.url
+    
+    async def close(self):
+        """Arrête le serveur"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    def _lookup(self, key: bytes) -> Any:
+        """Retourne la valeur d'une clé non expirée"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry[0]
+    
+    @staticmethod
+    def _encode(reply: Any) -> bytes:
+        """Encode une réponse RESP"""
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, Exception):
+            return b'-ERR %s\r\n' % str(reply).encode()
+        if isinstance(reply, str):
+            return b'+%s\r\n' % reply.encode()
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, bytes):
+            return b'$%d\r\n%s\r\n' % (len(reply), reply)
+        return b'*%d\r\n' % len(reply) + b''.join(StandInRedis._encode(item) for item in reply)
+    
+    def _execute(self, args: List[bytes], state: Dict[str, bool]) -> Any:
+        """Exécute une commande"""
+        command = args[0].upper()
+        if command == b'AUTH':
+            state['authenticated'] = args[-1].decode() == self.password
+            return 'OK' if state['authenticated'] else ValueError('invalid password')
+        if self.password and not state['authenticated']:
+            return ValueError('NOAUTH Authentication required')
+        
+        if command == b'PING':
+            return 'PONG'
+        if command == b'SELECT':
+            return 'OK'
+        if command == b'GET':
+            value = self._lookup(args[1])
+            return value if value is None or isinstance(value, bytes) else ValueError('WRONGTYPE')
+        if command == b'SET':
+            expires_at = None
+            if len(args) >= 5 and args[3].upper() == b'PX':
+                expires_at = time.monotonic() + int(args[4]) / 1000
+            self._data[args[1]] = (args[2], expires_at)
+            return 'OK'
+        if command == b'DEL':
+            return sum(1 for key in args[1:] if self._data.pop(key, None) is not None)
+        if command == b'SADD':
+            members = self._lookup(args[1])
+            if members is None:
+                members = set()
+                self._data[args[1]] = (members, None)
+            added = len(set(args[2:]) - members)
+            members.update(args[2:])
+            return added
+        if command == b'SMEMBERS':
+            return list(self._lookup(args[1]) or ())
+        if command == b'EXPIRE':
+            if self._lookup(args[1]) is None:
+                return 0
+            self._data[args[1]] = (self._data[args[1]][0], time.monotonic() + int(args[2]))
+            return 1
+        return ValueError(f"unknown command '{command.decode()}'")
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Traite les commandes d'une connexion"""
+        state = {'authenticated': False}
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                
+                self.commands += 1
+                writer.write(self._encode(self._execute(args, state)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
@@ -3,76 +3,434 @@ Bot Discord pour Bank App
 Point d'entrée principal
 """
 
+import time
+
+# Début du chargement des modules (phase « import » du démarrage)
+_IMPORT_STARTED = time.perf_counter()
+
 import discord
+from discord import app_commands
 from discord.ext import commands
+import argparse
 import logging
 import asyncio
+import math
+import sys
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any, Optional, Dict, List, TYPE_CHECKING
 
 from config import (
     DISCORD_BOT_TOKEN, BOT_PREFIX, BOT_DESCRIPTION,
+    OPERATION_INDEX_ENABLED, OPERATION_INDEX_PATH,
+    METRICS_ENABLED, METRICS_HOST, METRICS_PORT, EVENT_LOOP_MONITOR_INTERVAL,
+    COMMAND_TREE_HASH_PATH, FORCE_COMMAND_SYNC,
+    GATEWAY_LEAN_MODE, GATEWAY_STATS_INTERVAL, EXIT_CODE_CONFIG_ERROR,
+    WARM_CACHE_ENABLED, WARM_CACHE_PATH, WARM_CACHE_ACTIVE_USERS, WARMUP_USERS,
     validate_config
 )
-
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
+from utils.api_client import BankAPIClient
+from utils.autocomplete import AccountChoicesCache
+from utils.logs import setup_logging
+from utils.command_sync import command_tree_hash, load_synced_hash, save_synced_hash
+from utils.metrics import (
+    REGISTRY, MetricsServer, monitor_event_loop, resident_memory_bytes,
+    COMMAND_DURATION, COMMANDS_TOTAL, COMMANDS_IN_FLIGHT, STARTUP_PHASE_DURATION,
+    GATEWAY_EVENTS_TOTAL
 )
 
+if TYPE_CHECKING:
+    # Importé au démarrage seulement si l'index est activé (sqlite3)
+    from utils.operation_index import OperationIndex
+
+IMPORT_DURATION = time.perf_counter() - _IMPORT_STARTED
+
+# Configuration du logging (écriture dans un thread dédié)
+setup_logging()
+
 logger = logging.getLogger(__name__)
 
 
-class BankBot(commands.Bot):
-    """Classe principale du bot bancaire"""
+class BankCommandTree(app_commands.CommandTree):
+    """Arbre des commandes slash, instrumenté pour les métriques"""
     
-    def __init__(self):
-        # Intents nécessaires
-        intents = discord.Intents.default()
-        intents.message_content = True
-        intents.members = True
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Note le début d'une commande (les autocomplétions ne sont pas mesurées)"""
+        if isinstance(interaction.client, BankBot):
+            interaction.client.note_active_user(str(interaction.user.id))
         
+        if interaction.type is discord.InteractionType.application_command:
+            interaction.extras['started_at'] = time.perf_counter()
+            COMMANDS_IN_FLIGHT.inc()
+        return True
+    
+    @staticmethod
+    def record_command(interaction: discord.Interaction, status: str):
+        """Enregistre la durée et le résultat d'une commande"""
+        started_at = interaction.extras.pop('started_at', None)
+        if started_at is None:
+            return
+        
+        name = interaction.command.qualified_name if interaction.command else 'inconnue'
+        COMMANDS_IN_FLIGHT.dec()
+        COMMANDS_TOTAL.labels(name, status).inc()
+        COMMAND_DURATION.labels(name).observe(time.perf_counter() - started_at)
+    
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        """Comptabilise la commande en erreur avant le traitement par défaut"""
+        self.record_command(interaction, 'error')
+        await super().on_error(interaction, error)
+
+
+class BankBot(commands.AutoShardedBot):
+    """Classe principale du bot bancaire
+    
+    Sans shard_ids, le processus gère tous les shards (nombre recommandé par
+    Discord) ; launcher.py répartit les shards entre plusieurs processus.
+    """
+    
+    def __init__(
+        self,
+        force_sync: bool = FORCE_COMMAND_SYNC,
+        lean_gateway: bool = GATEWAY_LEAN_MODE,
+        shard_ids: Optional[List[int]] = None,
+        shard_count: Optional[int] = None,
+        command_sync: bool = True
+    ):
         super().__init__(
             command_prefix=BOT_PREFIX,
             description=BOT_DESCRIPTION,
-            intents=intents
+            tree_cls=BankCommandTree,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            **self.gateway_options(lean_gateway)
         )
+        
+        # Mode lean : intents et caches réduits, messages ignorés
+        self.lean_gateway = lean_gateway
+        # Événements reçus de la gateway depuis le démarrage
+        self.gateway_events = 0
+        self._gateway_stats: Optional[asyncio.Task] = None
+        
+        # Client API partagé par tous les cogs
+        self.api_client: Optional[BankAPIClient] = None
+        # Utilisateurs récents, du moins au plus récent (préchargés après un redémarrage)
+        self.active_users: 'OrderedDict[str, None]' = OrderedDict()
+        self._warm_up: Optional[asyncio.Task] = None
+        # Comptes proposés par l'autocomplétion des paramètres compte_id
+        self.account_choices = AccountChoicesCache()
+        # Index local des opérations (None si désactivé)
+        self.operation_index: Optional['OperationIndex'] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self._loop_monitor: Optional[asyncio.Task] = None
+        # Synchroniser les commandes même si leur définition n'a pas changé
+        self.force_sync = force_sync
+        # Dans un cluster, seul le premier worker synchronise les commandes
+        self.command_sync = command_sync
+        # Durée des phases du démarrage (secondes), dans l'ordre
+        self.startup_phases: Dict[str, float] = {'import': IMPORT_DURATION}
+        self._phase_started = time.perf_counter()
+        STARTUP_PHASE_DURATION.labels('import').set(IMPORT_DURATION)
+    
+    @staticmethod
+    def gateway_options(lean: bool) -> Dict[str, Any]:
+        """Intents et caches demandés à la gateway"""
+        if not lean:
+            intents = discord.Intents.default()
+            intents.message_content = True
+            intents.members = True
+            return {'intents': intents}
+        
+        # Les interactions (commandes slash, boutons) arrivent sans intent ;
+        # guilds suffit pour on_guild_join/remove et la liste des serveurs
+        intents = discord.Intents.none()
+        intents.guilds = True
+        return {
+            'intents': intents,
+            'member_cache_flags': discord.MemberCacheFlags.none(),
+            'chunk_guilds_at_startup': False,
+            'max_messages': None
+        }
+    
+    def end_startup_phase(self, phase: str):
+        """Enregistre la durée d'une phase du démarrage, écoulée depuis la fin de la précédente"""
+        now = time.perf_counter()
+        self.startup_phases[phase] = now - self._phase_started
+        self._phase_started = now
+        STARTUP_PHASE_DURATION.labels(phase).set(self.startup_phases[phase])
     
     async def setup_hook(self):
         """Appelé lors de la configuration du bot"""
+        self.end_startup_phase('login')
         logger.info("Configuration du bot...")
+        started = time.perf_counter()
+        
+        # Le client API doit exister avant le chargement des cogs ; sa session,
+        # l'index local, le serveur de métriques et les cogs démarrent en parallèle
+        self.api_client = BankAPIClient()
+        services = [self.api_client.start(), self.load_cogs()]
+        if OPERATION_INDEX_ENABLED:
+            services.append(self.open_operation_index())
+        if METRICS_ENABLED:
+            services.append(self.start_metrics())
+        if WARM_CACHE_ENABLED:
+            services.append(self.restore_warm_cache())
+        await asyncio.gather(*services)
+        self.end_startup_phase('cogs')
+        
+        # Synchroniser les commandes slash si nécessaire
+        sync_duration = await self.sync_commands()
+        self.end_startup_phase('sync')
         
-        # Charger les cogs
+        self._gateway_stats = asyncio.create_task(self.report_gateway_stats(GATEWAY_STATS_INTERVAL))
+        
+        total = time.perf_counter() - started
+        if sync_duration is None:
+            logger.info(f"Configuration terminée en {total:.2f}s (synchronisation des commandes ignorée)")
+        else:
+            logger.info(
+                f"Configuration terminée en {total:.2f}s, dont {sync_duration:.2f}s "
+                f"de synchronisation des commandes"
+            )
+    
+    async def load_cogs(self):
+        """Charge les cogs en parallèle ; l'échec d'un cog n'empêche pas le chargement des autres"""
         cogs_dir = Path(__file__).parent / 'cogs'
+        cog_names = sorted(
+            f'cogs.{cog_file.stem}' for cog_file in cogs_dir.glob('*.py')
+            if not cog_file.name.startswith('_')
+        )
         
-        for cog_file in cogs_dir.glob('*.py'):
-            if cog_file.name.startswith('_'):
-                continue
-            
-            cog_name = f'cogs.{cog_file.stem}'
-            
+        async def load(cog_name: str):
+            started = time.perf_counter()
             try:
                 await self.load_extension(cog_name)
-                logger.info(f"Cog chargé: {cog_name}")
+                logger.info(f"Cog chargé: {cog_name} ({(time.perf_counter() - started) * 1000:.0f} ms)")
             except Exception as e:
                 logger.error(f"Erreur lors du chargement de {cog_name}: {e}")
         
-        # Synchroniser les commandes slash
+        await asyncio.gather(*(load(cog_name) for cog_name in cog_names))
+    
+    async def open_operation_index(self):
+        """Ouvre l'index local des opérations"""
+        from utils.operation_index import OperationIndex
+        
+        self.operation_index = OperationIndex(OPERATION_INDEX_PATH)
+        try:
+            await self.operation_index.open()
+        except Exception as e:
+            logger.error(f"Index local des opérations indisponible: {e}")
+            self.operation_index = None
+    
+    def note_active_user(self, discord_id: str):
+        """Marque un utilisateur comme actif"""
+        self.active_users[discord_id] = None
+        self.active_users.move_to_end(discord_id)
+        if len(self.active_users) > WARM_CACHE_ACTIVE_USERS:
+            self.active_users.popitem(last=False)
+    
+    async def restore_warm_cache(self):
+        """Recharge les caches enregistrés lors du dernier arrêt"""
+        from utils.warm_cache import load_warm_cache
+        
+        loop = asyncio.get_running_loop()
+        cache = await loop.run_in_executor(None, load_warm_cache, WARM_CACHE_PATH)
+        if cache is None:
+            return
+        
+        self.api_client.token_cache.restore(cache.tokens)
+        for account_id, numero in cache.account_numbers.items():
+            self.api_client.account_numbers.setdefault(account_id, numero)
+        for discord_id in cache.active_users:
+            self.note_active_user(discord_id)
+        
+        logger.info(
+            f"Cache rechargé: {len(cache.tokens)} token(s), {len(cache.account_numbers)} compte(s), "
+            f"{len(cache.active_users)} utilisateur(s) récent(s)"
+        )
+    
+    async def save_warm_cache(self):
+        """Enregistre les caches pour le prochain démarrage"""
+        from utils.warm_cache import WarmCache, save_warm_cache
+        
+        # Copie des caches dans la boucle, écriture du fichier hors de la boucle
+        cache = WarmCache(
+            tokens=self.api_client.token_cache.snapshot(),
+            account_numbers=dict(self.api_client.account_numbers),
+            active_users=list(self.active_users)
+        )
+        saved = await asyncio.get_running_loop().run_in_executor(None, save_warm_cache, WARM_CACHE_PATH, cache)
+        if saved:
+            logger.info(f"Cache enregistré: {len(cache.tokens)} token(s), {len(cache.account_numbers)} compte(s)")
+    
+    async def warm_up_api(self):
+        """Ouvre les connexions à l'API et précharge les comptes des utilisateurs récents"""
+        started = time.perf_counter()
+        tokens = self.api_client.token_cache.snapshot()
+        recent = [tokens[discord_id][0] for discord_id in reversed(self.active_users) if discord_id in tokens]
+        recent = recent[:WARMUP_USERS]
+        
+        succeeded = await self.api_client.warm_up(recent)
+        logger.info(
+            f"Préchauffage de l'API: {succeeded}/{max(len(recent), 1)} requête(s) "
+            f"en {time.perf_counter() - started:.2f}s"
+        )
+    
+    async def sync_commands(self) -> Optional[float]:
+        """Synchronise les commandes slash si leur définition a changé
+        
+        Retourne la durée de la synchronisation, ou None si elle a été ignorée.
+        """
+        if not self.command_sync:
+            return None
+        
+        tree_hash = command_tree_hash(self.tree)
+        
+        if not self.force_sync and load_synced_hash(COMMAND_TREE_HASH_PATH, self.application_id) == tree_hash:
+            logger.info("Commandes slash inchangées depuis la dernière synchronisation")
+            return None
+        
+        started = time.perf_counter()
         try:
             synced = await self.tree.sync()
-            logger.info(f"{len(synced)} commandes slash synchronisées")
         except Exception as e:
             logger.error(f"Erreur lors de la synchronisation des commandes: {e}")
+            return time.perf_counter() - started
+        
+        save_synced_hash(COMMAND_TREE_HASH_PATH, self.application_id, tree_hash)
+        logger.info(f"{len(synced)} commandes slash synchronisées")
+        return time.perf_counter() - started
+    
+    async def report_gateway_stats(self, interval: float):
+        """Journalise périodiquement la mémoire du processus et le débit d'événements de la gateway"""
+        mode = 'lean' if self.lean_gateway else 'complet'
+        
+        while True:
+            events = self.gateway_events
+            await asyncio.sleep(interval)
+            
+            rss = resident_memory_bytes()
+            memory = f"{rss / (1024 * 1024):.0f} Mo" if rss is not None else "inconnue"
+            logger.info(
+                f"Gateway (mode {mode}): {(self.gateway_events - events) / interval:.1f} événements/s, "
+                f"mémoire {memory}, {len(self.users)} utilisateurs en cache"
+            )
+    
+    async def start_metrics(self):
+        """Démarre le serveur de métriques et la mesure du retard de la boucle"""
+        REGISTRY.register_collector(self.collect_metrics)
+        self._loop_monitor = asyncio.create_task(monitor_event_loop(EVENT_LOOP_MONITOR_INTERVAL))
+        
+        self.metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT)
+        try:
+            await self.metrics_server.start()
+        except OSError as e:
+            logger.error(f"Impossible d'exposer les métriques sur {METRICS_HOST}:{METRICS_PORT}: {e}")
+            self.metrics_server = None
+    
+    def collect_metrics(self):
+        """Métriques lues à chaque collecte : gateway, serveurs et caches"""
+        latencies = [
+            ({'shard': shard_id}, latency) for shard_id, latency in self.latencies
+            if not math.isnan(latency) and not math.isinf(latency)
+        ]
+        yield ('bankbot_gateway_latency_seconds', 'gauge',
+               "Latence du dernier heartbeat de la gateway Discord, par shard", latencies)
+        
+        yield ('bankbot_guilds', 'gauge', "Serveurs Discord rejoints", [({}, len(self.guilds))])
+        yield ('bankbot_cached_users', 'gauge', "Utilisateurs Discord en cache", [({}, len(self.users))])
+        
+        rss = resident_memory_bytes()
+        if rss is not None:
+            yield ('bankbot_process_resident_memory_bytes', 'gauge', "Mémoire résidente du processus",
+                   [({}, rss)])
+        
+        if not self.api_client:
+            return
+        
+        stats = self.api_client.get_stats()
+        caches = {'tokens': stats['tokens'], 'responses': stats['responses']}
+        if self.api_client.shared_cache.shared:
+            caches['shared'] = stats['shared']
+        yield ('bankbot_cache_hits_total', 'counter', "Lectures servies par le cache",
+               [({'cache': name}, cache['hits']) for name, cache in caches.items()])
+        yield ('bankbot_cache_misses_total', 'counter', "Lectures absentes du cache",
+               [({'cache': name}, cache['misses']) for name, cache in caches.items()])
+        yield ('bankbot_cache_hit_ratio', 'gauge', "Part des lectures servies par le cache",
+               [({'cache': name}, cache['hit_ratio']) for name, cache in caches.items()])
+        yield ('bankbot_cache_entries', 'gauge', "Entrées en cache",
+               [({'cache': 'tokens'}, stats['tokens']['size']),
+                ({'cache': 'responses'}, stats['responses']['entries'])])
+        yield ('bankbot_cache_backend_errors_total', 'counter', "Erreurs et délais dépassés du cache partagé",
+               [({'backend': stats['shared']['backend']}, stats['shared']['errors'])])
+        yield ('bankbot_response_cache_bytes', 'gauge', "Taille estimée du cache des réponses",
+               [({}, stats['responses']['size_bytes'])])
+        yield ('bankbot_api_coalesced_requests_total', 'counter', "Requêtes GET servies par une requête identique en cours",
+               [({}, stats['coalescing']['coalesced'])])
+        yield ('bankbot_api_retries_total', 'counter', "Nouvelles tentatives de requêtes vers l'API",
+               [({}, stats['circuit_breaker']['retries'])])
+        yield ('bankbot_circuit_breaker_open', 'gauge', "Disjoncteur de l'API ouvert (1) ou fermé (0)",
+               [({}, 0 if stats['circuit_breaker']['state'] == 'closed' else 1)])
+        yield ('bankbot_rate_limited_total', 'counter', "Requêtes retardées ou refusées par le limiteur de débit local",
+               [({'result': 'delayed'}, stats['rate_limiter']['delayed']),
+                ({'result': 'rejected'}, stats['rate_limiter']['rejected'])])
+        
+        if self.operation_index:
+            index = self.operation_index.stats()
+            yield ('bankbot_search_total', 'counter', "Recherches /search, par source",
+                   [({'source': 'index'}, index['local_searches']),
+                    ({'source': 'api'}, index['api_fallbacks'])])
+    
+    async def close(self):
+        """Appelé lors de l'arrêt du bot"""
+        await super().close()
+        
+        if self._loop_monitor:
+            self._loop_monitor.cancel()
+        
+        if self._gateway_stats:
+            self._gateway_stats.cancel()
+        
+        if self._warm_up:
+            self._warm_up.cancel()
+        
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        REGISTRY.unregister_collector(self.collect_metrics)
+        
+        if self.operation_index:
+            await self.operation_index.close()
+        
+        if self.api_client:
+            if WARM_CACHE_ENABLED:
+                await self.save_warm_cache()
+            await self.api_client.close()
+    
+    async def on_connect(self):
+        """Appelé lorsque la connexion à la gateway est établie"""
+        if 'gateway' not in self.startup_phases:
+            self.end_startup_phase('gateway')
     
     async def on_ready(self):
         """Appelé lorsque le bot est prêt"""
         logger.info(f"Bot connecté en tant que {self.user} (ID: {self.user.id})")
         logger.info(f"Connecté à {len(self.guilds)} serveur(s)")
         
+        if 'ready' not in self.startup_phases:
+            self.end_startup_phase('ready')
+            phases = ', '.join(f"{phase} {duration:.2f}s" for phase, duration in self.startup_phases.items())
+            logger.info(f"Démarrage terminé en {sum(self.startup_phases.values()):.2f}s ({phases})")
+            
+            rss = resident_memory_bytes()
+            if rss is not None:
+                logger.info(
+                    f"Mémoire après connexion (mode {'lean' if self.lean_gateway else 'complet'}): "
+                    f"{rss / (1024 * 1024):.0f} Mo"
+                )
+            
+            # Sans attendre : le statut du bot est défini tout de suite
+            self._warm_up = asyncio.create_task(self.warm_up_api())
+        
         # Définir le statut du bot
         await self.change_presence(
             activity=discord.Activity(
@@ -81,6 +439,21 @@ class BankBot(commands.Bot):
             )
         )
     
+    async def on_message(self, message: discord.Message):
+        """Traitement des messages (commandes à préfixe), désactivé en mode lean"""
+        if self.lean_gateway:
+            return
+        await self.process_commands(message)
+    
+    async def on_socket_event_type(self, event_type: str):
+        """Appelé pour chaque événement reçu de la gateway"""
+        self.gateway_events += 1
+        GATEWAY_EVENTS_TOTAL.labels(event_type).inc()
+    
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        """Appelé après l'exécution d'une commande slash"""
+        BankCommandTree.record_command(interaction, 'ok')
+    
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
         """Gestion des erreurs de commandes"""
         if isinstance(error, commands.CommandNotFound):
@@ -139,34 +512,77 @@ class BankBot(commands.Bot):
         logger.info(f"Bot retiré du serveur: {guild.name} (ID: {guild.id})")
 
 
-async def main():
-    """Fonction principale"""
+async def main(
+    force_sync: bool = FORCE_COMMAND_SYNC,
+    shard_ids: Optional[List[int]] = None,
+    shard_count: Optional[int] = None,
+    command_sync: bool = True
+) -> int:
+    """Fonction principale, retourne le code de sortie du processus"""
     try:
         # Valider la configuration
         validate_config()
         logger.info("Configuration validée")
         
         # Créer et démarrer le bot
-        bot = BankBot()
+        bot = BankBot(
+            force_sync=force_sync,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            command_sync=command_sync
+        )
         
         async with bot:
             await bot.start(DISCORD_BOT_TOKEN)
             
     except ValueError as e:
         logger.error(f"Erreur de configuration: {e}")
-        return
+        return EXIT_CODE_CONFIG_ERROR
     except discord.LoginFailure:
         logger.error("Erreur d'authentification: token Discord invalide")
-        return
+        return EXIT_CODE_CONFIG_ERROR
     except Exception as e:
         logger.error(f"Erreur fatale: {e}", exc_info=True)
-        return
+        return 1
+    
+    return 0
+
+
+def parse_shard_ids(value: str) -> List[int]:
+    """Analyse une liste de shards : '0,1,2' ou '0-3'"""
+    shard_ids = []
+    for part in value.split(','):
+        start, _, end = part.strip().partition('-')
+        shard_ids.extend(range(int(start), int(end or start) + 1))
+    return shard_ids
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=BOT_DESCRIPTION)
+    parser.add_argument('--force-sync', action='store_true',
+                        help="Synchroniser les commandes slash même si elles n'ont pas changé")
+    parser.add_argument('--shard-ids', type=parse_shard_ids,
+                        help="Shards gérés par ce processus (ex. 0-3) ; nécessite --shard-count")
+    parser.add_argument('--shard-count', type=int, help="Nombre total de shards")
+    parser.add_argument('--no-sync', action='store_true',
+                        help="Ne pas synchroniser les commandes slash (workers secondaires d'un cluster)")
+    args = parser.parse_args()
+    
+    if args.shard_ids is not None and args.shard_count is None:
+        parser.error("--shard-ids nécessite --shard-count")
+    
+    exit_code = 0
     try:
-        asyncio.run(main())
+        exit_code = asyncio.run(main(
+            force_sync=args.force_sync or FORCE_COMMAND_SYNC,
+            shard_ids=args.shard_ids,
+            shard_count=args.shard_count,
+            command_sync=not args.no_sync
+        ))
     except KeyboardInterrupt:
         logger.info("Bot arrêté par l'utilisateur")
     except Exception as e:
         logger.error(f"Erreur lors du démarrage: {e}", exc_info=True)
+        exit_code = 1
+    
+    sys.exit(exit_code)
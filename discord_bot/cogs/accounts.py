@@ -5,15 +5,19 @@ Commandes pour la gestion des comptes bancaires
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
 import logging
-from typing import Optional
+from typing import Optional, Dict
 
-from utils.api_client import BankAPIClient
+from utils.api_client import BankAPIClient, BankAPIError
+from utils.concurrency import gather_api_calls
+from utils.autocomplete import account_autocomplete
+from utils.models import OperationsPage
 from utils.embeds import (
-    create_error_embed, create_accounts_embed, 
+    create_error_embed, create_accounts_embed, create_retry_later_embed,
     create_balance_embed, create_operations_embed, create_stats_embed
 )
-from config import MSG_NOT_LINKED
+from config import MSG_NOT_LINKED, OPERATIONS_VIEW_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +27,7 @@ class AccountsCog(commands.Cog):
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.api_client = BankAPIClient()
+        self.api_client: BankAPIClient = bot.api_client
     
     async def cog_load(self):
         """Appelé lors du chargement du cog"""
@@ -31,8 +35,6 @@ class AccountsCog(commands.Cog):
     
     async def cog_unload(self):
         """Appelé lors du déchargement du cog"""
-        if self.api_client.session:
-            await self.api_client.session.close()
         logger.info("AccountsCog déchargé")
     
     async def get_token(self, user_id: str) -> Optional[str]:
@@ -53,21 +55,14 @@ class AccountsCog(commands.Cog):
                 return
             
             # Récupérer les comptes
-            response = await self.api_client._request('GET', '/accounts', token=token)
+            summary = await self.api_client.get_accounts_summary(token)
             
-            if not response.get('success'):
-                embed = create_error_embed(
-                    "Erreur",
-                    response.get('error', 'Impossible de récupérer les comptes')
-                )
+            if summary is None:
+                embed = create_error_embed("Erreur", "Impossible de récupérer les comptes")
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
             
-            data = response.get('data', {})
-            accounts = data.get('comptes', [])
-            solde_total = data.get('solde_total', 0)
-            
-            if not accounts:
+            if not summary.comptes:
                 embed = create_error_embed(
                     "Aucun compte",
                     "Vous n'avez aucun compte bancaire actif."
@@ -75,9 +70,12 @@ class AccountsCog(commands.Cog):
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
             
-            embed = create_accounts_embed(accounts, solde_total)
+            embed = create_accounts_embed(summary.comptes, summary.solde_total)
             await interaction.followup.send(embed=embed, ephemeral=True)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des comptes: {e}")
             embed = create_error_embed(
@@ -88,6 +86,7 @@ class AccountsCog(commands.Cog):
     
     @app_commands.command(name="balance", description="Afficher le solde d'un compte")
     @app_commands.describe(compte_id="ID du compte (optionnel, affiche tous les comptes si non spécifié)")
+    @app_commands.autocomplete(compte_id=account_autocomplete)
     async def balance(self, interaction: discord.Interaction, compte_id: Optional[int] = None):
         """Commande pour afficher le solde"""
         await interaction.response.defer(ephemeral=True)
@@ -102,21 +101,14 @@ class AccountsCog(commands.Cog):
             
             # Si aucun compte spécifié, afficher tous les comptes
             if compte_id is None:
-                response = await self.api_client._request('GET', '/accounts', token=token)
+                summary = await self.api_client.get_accounts_summary(token)
                 
-                if not response.get('success'):
-                    embed = create_error_embed(
-                        "Erreur",
-                        response.get('error', 'Impossible de récupérer les comptes')
-                    )
+                if summary is None:
+                    embed = create_error_embed("Erreur", "Impossible de récupérer les comptes")
                     await interaction.followup.send(embed=embed, ephemeral=True)
                     return
                 
-                data = response.get('data', {})
-                accounts = data.get('comptes', [])
-                solde_total = data.get('solde_total', 0)
-                
-                embed = create_accounts_embed(accounts, solde_total)
+                embed = create_accounts_embed(summary.comptes, summary.solde_total)
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
             
@@ -134,6 +126,9 @@ class AccountsCog(commands.Cog):
             embed = create_balance_embed(balance_data)
             await interaction.followup.send(embed=embed, ephemeral=True)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du solde: {e}")
             embed = create_error_embed(
@@ -145,8 +140,9 @@ class AccountsCog(commands.Cog):
     @app_commands.command(name="operations", description="Afficher les dernières opérations d'un compte")
     @app_commands.describe(
         compte_id="ID du compte",
-        limite="Nombre d'opérations à afficher (max 10)"
+        limite="Nombre d'opérations par page (max 10)"
     )
+    @app_commands.autocomplete(compte_id=account_autocomplete)
     async def operations(
         self,
         interaction: discord.Interaction,
@@ -164,11 +160,19 @@ class AccountsCog(commands.Cog):
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
             
-            # Limiter à 10 opérations maximum
-            limite = min(limite, 10)
+            # Limiter à 10 opérations maximum par page
+            limite = max(1, min(limite, 10))
             
-            # Récupérer les opérations
-            ops_data = await self.api_client.get_account_operations(token, compte_id, limit=limite)
+            # Récupérer les opérations, et le numéro de compte en parallèle s'il n'est pas déjà connu
+            compte_numero = self.api_client.account_numbers.get(compte_id)
+            if compte_numero is None:
+                ops_data, account = await gather_api_calls(
+                    self.api_client.get_account_operations(token, compte_id, limit=limite),
+                    self.api_client.get_account_details(token, compte_id)
+                )
+                compte_numero = account.numero_compte if account else str(compte_id)
+            else:
+                ops_data = await self.api_client.get_account_operations(token, compte_id, limit=limite)
             
             if not ops_data:
                 embed = create_error_embed(
@@ -178,21 +182,32 @@ class AccountsCog(commands.Cog):
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
             
-            operations = ops_data.get('operations', [])
+            view = OperationsPaginationView(
+                self.api_client,
+                str(interaction.user.id),
+                compte_id,
+                compte_numero,
+                limite,
+                ops_data
+            )
             
-            # Récupérer le numéro de compte
-            account = await self.api_client.get_account_details(token, compte_id)
-            compte_numero = account.get('numero_compte', str(compte_id)) if account else str(compte_id)
+            if view.page_count <= 1:
+                await interaction.followup.send(embed=view.build_embed(), ephemeral=True)
+                return
             
-            embed = create_operations_embed(
-                operations,
-                compte_numero,
-                page=1,
-                total=ops_data.get('pagination', {}).get('total')
+            view.message = await interaction.followup.send(
+                embed=view.build_embed(),
+                view=view,
+                ephemeral=True,
+                wait=True
             )
             
-            await interaction.followup.send(embed=embed, ephemeral=True)
+            # Charger la page suivante pendant que l'utilisateur lit la première
+            view.prefetch(1)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des opérations: {e}")
             embed = create_error_embed(
@@ -215,8 +230,10 @@ class AccountsCog(commands.Cog):
                 return
             
             # Récupérer les statistiques
-            stats = await self.api_client.get_user_stats(token)
-            profile = await self.api_client.get_user_profile(token)
+            stats, profile = await gather_api_calls(
+                self.api_client.get_user_stats(token),
+                self.api_client.get_user_profile(token)
+            )
             
             if not stats or not profile:
                 embed = create_error_embed(
@@ -226,11 +243,13 @@ class AccountsCog(commands.Cog):
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
             
-            username = f"{profile['prenom']} {profile['nom']}"
-            embed = create_stats_embed(stats, username)
+            embed = create_stats_embed(stats, profile.full_name)
             
             await interaction.followup.send(embed=embed, ephemeral=True)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des statistiques: {e}")
             embed = create_error_embed(
@@ -240,6 +259,153 @@ class AccountsCog(commands.Cog):
             await interaction.followup.send(embed=embed, ephemeral=True)
 
 
+class OperationsPaginationView(discord.ui.View):
+    """Vue de pagination des opérations d'un compte"""
+    
+    def __init__(
+        self,
+        api_client: BankAPIClient,
+        user_id: str,
+        compte_id: int,
+        compte_numero: str,
+        page_size: int,
+        first_page: OperationsPage
+    ):
+        super().__init__(timeout=OPERATIONS_VIEW_TIMEOUT)
+        self.api_client = api_client
+        # Le token est redemandé à chaque page : il peut expirer pendant la durée de la vue
+        self.user_id = user_id
+        self.compte_id = compte_id
+        self.compte_numero = compte_numero
+        self.page_size = page_size
+        self.total = first_page.total
+        self.current_page = 0
+        self.message: Optional[discord.WebhookMessage] = None
+        # Pages déjà chargées et chargements en cours, conservés pendant la durée de la vue
+        self.pages: Dict[int, OperationsPage] = {0: first_page}
+        self._pending: Dict[int, asyncio.Task] = {}
+        self._update_buttons()
+    
+    @property
+    def page_count(self) -> int:
+        """Nombre total de pages"""
+        return max(1, -(-self.total // self.page_size))
+    
+    def build_embed(self) -> discord.Embed:
+        """Crée l'embed de la page courante"""
+        return create_operations_embed(
+            self.pages[self.current_page].operations,
+            self.compte_numero,
+            page=self.current_page + 1,
+            total=self.total,
+            page_count=self.page_count
+        )
+    
+    def _update_buttons(self):
+        """Active ou désactive les boutons selon la page courante"""
+        self.previous_page.disabled = self.current_page == 0
+        self.next_page.disabled = self.current_page >= self.page_count - 1
+    
+    async def _load_page(self, page: int) -> Optional[OperationsPage]:
+        """Récupère une page depuis l'API et la conserve"""
+        token = await self.api_client.get_user_token(self.user_id)
+        if not token:
+            return None
+        
+        ops_data = await self.api_client.get_account_operations(
+            token,
+            self.compte_id,
+            limit=self.page_size,
+            offset=page * self.page_size
+        )
+        
+        if ops_data:
+            self.pages[page] = ops_data
+        
+        return ops_data
+    
+    def prefetch(self, page: int):
+        """Charge une page en arrière-plan si elle n'est pas déjà disponible"""
+        if page < 0 or page >= self.page_count or page in self.pages or page in self._pending:
+            return
+        
+        task = asyncio.create_task(self._load_page(page))
+        self._pending[page] = task
+        task.add_done_callback(lambda done: self._prefetch_done(page, done))
+    
+    def _prefetch_done(self, page: int, task: asyncio.Task):
+        """Oublie un préchargement terminé ; son échec n'est signalé que si la page est affichée"""
+        self._pending.pop(page, None)
+        if not task.cancelled():
+            task.exception()
+    
+    async def _get_page(self, page: int) -> Optional[OperationsPage]:
+        """Retourne une page depuis la mémoire, le préchargement en cours ou l'API"""
+        if page in self.pages:
+            return self.pages[page]
+        
+        task = self._pending.get(page)
+        if task is not None:
+            return await asyncio.shield(task)
+        
+        return await self._load_page(page)
+    
+    async def _show_page(self, interaction: discord.Interaction, page: int):
+        """Affiche une page et précharge la suivante"""
+        if page in self.pages:
+            # Page déjà en mémoire : réponse immédiate, sans appel API
+            self.current_page = page
+            self._update_buttons()
+            await interaction.response.edit_message(embed=self.build_embed(), view=self)
+        else:
+            await interaction.response.defer()
+            
+            try:
+                ops_data = await self._get_page(page)
+            except BankAPIError as e:
+                embed = create_retry_later_embed(e.code, e.retry_after)
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            
+            if not ops_data:
+                embed = create_error_embed(
+                    "Erreur",
+                    "Impossible de récupérer cette page d'opérations."
+                )
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            
+            self.current_page = page
+            self._update_buttons()
+            await interaction.edit_original_response(embed=self.build_embed(), view=self)
+        
+        self.prefetch(page + 1)
+    
+    @discord.ui.button(label="◀ Précédent", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Bouton page précédente"""
+        await self._show_page(interaction, self.current_page - 1)
+    
+    @discord.ui.button(label="Suivant ▶", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Bouton page suivante"""
+        await self._show_page(interaction, self.current_page + 1)
+    
+    async def on_timeout(self):
+        """Désactive les boutons à l'expiration de la vue"""
+        for task in self._pending.values():
+            task.cancel()
+        
+        for item in self.children:
+            item.disabled = True
+        
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+
 async def setup(bot: commands.Bot):
     """Fonction pour charger le cog"""
     await bot.add_cog(AccountsCog(bot))
@@ -6,11 +6,17 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
+from typing import Optional, TYPE_CHECKING
 
-from utils.api_client import BankAPIClient
-from utils.embeds import create_success_embed, create_error_embed, create_info_embed
+from utils.api_client import BankAPIClient, BankAPIError
+from utils.concurrency import gather_api_calls
+from utils.embeds import create_success_embed, create_error_embed, create_info_embed, create_retry_later_embed
+from utils.autocomplete import invalidate_account_choices
 from config import API_BASE_URL, MSG_NOT_LINKED
 
+if TYPE_CHECKING:
+    from utils.operation_index import OperationIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,7 +25,7 @@ class AuthCog(commands.Cog):
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.api_client = BankAPIClient()
+        self.api_client: BankAPIClient = bot.api_client
     
     async def cog_load(self):
         """Appelé lors du chargement du cog"""
@@ -27,14 +33,14 @@ class AuthCog(commands.Cog):
     
     async def cog_unload(self):
         """Appelé lors du déchargement du cog"""
-        if self.api_client.session:
-            await self.api_client.session.close()
         logger.info("AuthCog déchargé")
     
     @app_commands.command(name="link", description="Lier votre compte bancaire à Discord")
     async def link(self, interaction: discord.Interaction):
         """Commande pour lier son compte bancaire"""
         await interaction.response.defer(ephemeral=True)
+        # La liaison se fait sur le site : ne plus proposer « aucun compte » à l'autocomplétion
+        invalidate_account_choices(interaction.client, str(interaction.user.id))
         
         try:
             # Vérifier si l'utilisateur est déjà lié
@@ -72,6 +78,9 @@ class AuthCog(commands.Cog):
             
             await interaction.followup.send(embed=embed, ephemeral=True)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la liaison: {e}")
             embed = create_error_embed(
@@ -98,7 +107,7 @@ class AuthCog(commands.Cog):
                 return
             
             # Créer une vue de confirmation
-            view = UnlinkConfirmView(self.api_client, token)
+            view = UnlinkConfirmView(self.api_client, token, self.bot.operation_index)
             
             embed = create_info_embed(
                 "Confirmation requise",
@@ -108,6 +117,9 @@ class AuthCog(commands.Cog):
             
             await interaction.followup.send(embed=embed, view=view, ephemeral=True)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la déliaison: {e}")
             embed = create_error_embed(
@@ -134,8 +146,10 @@ class AuthCog(commands.Cog):
                 return
             
             # Récupérer les informations de liaison
-            discord_info = await self.api_client.get_discord_link_status(token)
-            profile = await self.api_client.get_user_profile(token)
+            discord_info, profile = await gather_api_calls(
+                self.api_client.get_discord_link_status(token),
+                self.api_client.get_user_profile(token)
+            )
             
             if not discord_info or not profile:
                 embed = create_error_embed(
@@ -147,24 +161,24 @@ class AuthCog(commands.Cog):
             
             embed = create_success_embed(
                 "Compte lié",
-                f"Votre compte Discord est lié au compte bancaire de **{profile['prenom']} {profile['nom']}**"
+                f"Votre compte Discord est lié au compte bancaire de **{profile.full_name}**"
             )
             
             embed.add_field(
                 name="👤 Utilisateur",
-                value=profile['username'],
+                value=profile.username,
                 inline=True
             )
             
             embed.add_field(
                 name="📧 Email",
-                value=profile['email'],
+                value=profile.email,
                 inline=True
             )
             
             embed.add_field(
                 name="🏦 Rôle",
-                value=profile['role'].capitalize(),
+                value=profile.role.capitalize(),
                 inline=True
             )
             
@@ -187,6 +201,9 @@ class AuthCog(commands.Cog):
             
             await interaction.followup.send(embed=embed, ephemeral=True)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la vérification du statut: {e}")
             embed = create_error_embed(
@@ -199,10 +216,11 @@ class AuthCog(commands.Cog):
 class UnlinkConfirmView(discord.ui.View):
     """Vue de confirmation pour la déliaison"""
     
-    def __init__(self, api_client: BankAPIClient, token: str):
+    def __init__(self, api_client: BankAPIClient, token: str, operation_index: Optional['OperationIndex'] = None):
         super().__init__(timeout=60)
         self.api_client = api_client
         self.token = token
+        self.operation_index = operation_index
     
     @discord.ui.button(label="Confirmer", style=discord.ButtonStyle.danger)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -211,7 +229,12 @@ class UnlinkConfirmView(discord.ui.View):
         
         success = await self.api_client.unlink_discord(self.token)
         
+        if success and self.operation_index:
+            # Ne pas conserver l'historique indexé d'un compte délié
+            await self.operation_index.purge(self.token)
+        
         if success:
+            invalidate_account_choices(interaction.client, str(interaction.user.id))
             embed = create_success_embed(
                 "Compte délié",
                 "Votre compte Discord a été délié avec succès.\n"
@@ -5,20 +5,34 @@ Commandes pour la gestion des opérations bancaires
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
+import io
 import logging
-from typing import Optional
+from typing import Optional, List, Any, Dict, Tuple, TYPE_CHECKING
 
-from utils.api_client import BankAPIClient
+from utils.api_client import BankAPIClient, BankAPIError
+from utils.concurrency import gather_api_calls
+from utils.autocomplete import account_autocomplete, invalidate_account_choices
+from utils.models import Operation, to_float
 from utils.embeds import (
     create_error_embed, create_operation_confirmation_embed,
-    create_info_embed
+    create_info_embed, create_success_embed, create_warning_embed, create_retry_later_embed,
+    format_currency
 )
 from utils.validators import (
     validate_amount, validate_operation_type,
-    validate_string_length, sanitize_input,
+    validate_string_length, validate_date, sanitize_input,
     format_operation_type_display
 )
-from config import MSG_NOT_LINKED
+from config import (
+    MSG_NOT_LINKED, MSG_ERROR_API,
+    IMPORT_MAX_BYTES, IMPORT_MAX_ROWS, IMPORT_CONFIRM_TIMEOUT, IMPORT_ERRORS_DISPLAY
+)
+
+if TYPE_CHECKING:
+    from utils.operation_index import OperationIndex
+    # Importé à la première utilisation de /operation-import (csv)
+    from utils.operation_import import ImportRow, ImportResult
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +42,7 @@ class OperationsCog(commands.Cog):
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.api_client = BankAPIClient()
+        self.api_client: BankAPIClient = bot.api_client
     
     async def cog_load(self):
         """Appelé lors du chargement du cog"""
@@ -36,14 +50,45 @@ class OperationsCog(commands.Cog):
     
     async def cog_unload(self):
         """Appelé lors du déchargement du cog"""
-        if self.api_client.session:
-            await self.api_client.session.close()
         logger.info("OperationsCog déchargé")
     
     async def get_token(self, user_id: str) -> Optional[str]:
         """Récupère le token de l'utilisateur"""
         return await self.api_client.get_user_token(user_id)
     
+    async def search_operations(
+        self,
+        discord_id: str,
+        token: str,
+        compte_id: Optional[int],
+        limit: int,
+        **criteria: Any
+    ) -> Optional[List[Operation]]:
+        """Recherche des opérations dans l'index local si les comptes sont synchronisés, sinon via l'API"""
+        index = self.bot.operation_index
+        
+        if index:
+            try:
+                if compte_id:
+                    compte_ids = [compte_id]
+                else:
+                    accounts = await self.api_client.get_accounts(token)
+                    compte_ids = [account.id for account in accounts or []]
+                
+                if compte_ids:
+                    synced = await asyncio.gather(*(
+                        index.sync_account(self.api_client, token, account_id, discord_id)
+                        for account_id in compte_ids
+                    ))
+                    if all(synced):
+                        return await index.search(token, compte_ids, limit, **criteria)
+            except Exception as e:
+                logger.error(f"Erreur de l'index local des opérations: {e}")
+            
+            index.api_fallbacks += 1
+        
+        return await self.api_client.search_operations(token, compte_id=compte_id, limit=limit, **criteria)
+    
     @app_commands.command(name="operation", description="Enregistrer une nouvelle opération bancaire")
     @app_commands.describe(
         compte_id="ID du compte",
@@ -61,6 +106,7 @@ class OperationsCog(commands.Cog):
         app_commands.Choice(name="Retrait", value="retrait"),
         app_commands.Choice(name="Prélèvement", value="prelevement")
     ])
+    @app_commands.autocomplete(compte_id=account_autocomplete)
     async def operation(
         self,
         interaction: discord.Interaction,
@@ -130,7 +176,8 @@ class OperationsCog(commands.Cog):
                 montant,
                 destinataire,
                 nature,
-                description
+                description,
+                self.bot.operation_index
             )
             
             # Créer l'embed de confirmation
@@ -153,6 +200,9 @@ class OperationsCog(commands.Cog):
             
             await interaction.followup.send(embed=embed, view=view, ephemeral=True)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la création de l'opération: {e}")
             embed = create_error_embed(
@@ -167,6 +217,10 @@ class OperationsCog(commands.Cog):
         type_operation="Type d'opération (optionnel)",
         nature="Nature de l'opération (optionnel)",
         destinataire="Destinataire (optionnel)",
+        montant_min="Montant minimum (optionnel)",
+        montant_max="Montant maximum (optionnel)",
+        date_debut="Date de début au format AAAA-MM-JJ (optionnel)",
+        date_fin="Date de fin au format AAAA-MM-JJ (optionnel)",
         limite="Nombre de résultats (max 20)"
     )
     @app_commands.choices(type_operation=[
@@ -177,6 +231,7 @@ class OperationsCog(commands.Cog):
         app_commands.Choice(name="Retrait", value="retrait"),
         app_commands.Choice(name="Prélèvement", value="prelevement")
     ])
+    @app_commands.autocomplete(compte_id=account_autocomplete)
     async def search(
         self,
         interaction: discord.Interaction,
@@ -184,6 +239,10 @@ class OperationsCog(commands.Cog):
         type_operation: Optional[str] = None,
         nature: Optional[str] = None,
         destinataire: Optional[str] = None,
+        montant_min: Optional[float] = None,
+        montant_max: Optional[float] = None,
+        date_debut: Optional[str] = None,
+        date_fin: Optional[str] = None,
         limite: Optional[int] = 10
     ):
         """Commande pour rechercher des opérations"""
@@ -197,18 +256,40 @@ class OperationsCog(commands.Cog):
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
             
+            # Valider les dates
+            for value, field_name in ((date_debut, "Date de début"), (date_fin, "Date de fin")):
+                if value:
+                    valid, error = validate_date(value, field_name)
+                    if not valid:
+                        embed = create_error_embed("Date invalide", error)
+                        await interaction.followup.send(embed=embed, ephemeral=True)
+                        return
+            
             # Limiter à 20 résultats maximum
             limite = min(limite, 20)
             
-            # Rechercher les opérations
-            operations = await self.api_client.search_operations(
-                token,
-                compte_id=compte_id,
-                type_operation=type_operation,
-                nature=nature,
-                destinataire=destinataire,
-                limit=limite
-            )
+            # Rechercher les opérations et, si besoin, le numéro de compte en parallèle
+            calls = [
+                self.search_operations(
+                    str(interaction.user.id),
+                    token,
+                    compte_id,
+                    limite,
+                    type_operation=type_operation,
+                    nature=nature,
+                    destinataire=destinataire,
+                    montant_min=montant_min,
+                    montant_max=montant_max,
+                    date_debut=date_debut,
+                    # Inclure toute la journée de fin
+                    date_fin=f"{date_fin} 23:59:59" if date_fin else None
+                )
+            ]
+            known_numero = self.api_client.account_numbers.get(compte_id) if compte_id else None
+            if compte_id and known_numero is None:
+                calls.append(self.api_client.get_account_details(token, compte_id))
+            
+            operations, *account = await gather_api_calls(*calls)
             
             if operations is None:
                 embed = create_error_embed(
@@ -229,12 +310,9 @@ class OperationsCog(commands.Cog):
             # Créer l'embed avec les résultats
             from utils.embeds import create_operations_embed
             
-            compte_numero = "Tous les comptes"
-            if compte_id and operations:
-                # Essayer de récupérer le numéro de compte
-                account = await self.api_client.get_account_details(token, compte_id)
-                if account:
-                    compte_numero = account.get('numero_compte', str(compte_id))
+            compte_numero = known_numero or "Tous les comptes"
+            if account and account[0]:
+                compte_numero = account[0].numero_compte
             
             embed = create_operations_embed(operations, compte_numero)
             embed.title = f"🔍 Résultats de recherche"
@@ -247,12 +325,23 @@ class OperationsCog(commands.Cog):
                 criteres.append(f"Nature: {nature}")
             if destinataire:
                 criteres.append(f"Destinataire: {destinataire}")
+            if montant_min is not None:
+                criteres.append(f"Montant ≥ {montant_min:.2f} €")
+            if montant_max is not None:
+                criteres.append(f"Montant ≤ {montant_max:.2f} €")
+            if date_debut:
+                criteres.append(f"Depuis le {date_debut}")
+            if date_fin:
+                criteres.append(f"Jusqu'au {date_fin}")
             
             if criteres:
                 embed.description = "**Critères:** " + " • ".join(criteres)
             
             await interaction.followup.send(embed=embed, ephemeral=True)
             
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             logger.error(f"Erreur lors de la recherche: {e}")
             embed = create_error_embed(
@@ -260,6 +349,220 @@ class OperationsCog(commands.Cog):
                 "Une erreur s'est produite lors de la recherche."
             )
             await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="export", description="Exporter l'historique des opérations d'un compte")
+    @app_commands.rename(format_export="format")
+    @app_commands.describe(
+        compte_id="ID du compte",
+        format_export="Format du fichier (CSV ou JSON Lines)",
+        type_operation="Type d'opération (optionnel)",
+        date_debut="Date de début au format AAAA-MM-JJ (optionnel)",
+        date_fin="Date de fin au format AAAA-MM-JJ (optionnel)"
+    )
+    @app_commands.choices(
+        format_export=[
+            app_commands.Choice(name="CSV", value="csv"),
+            app_commands.Choice(name="JSON Lines", value="jsonl")
+        ],
+        type_operation=[
+            app_commands.Choice(name="Crédit", value="credit"),
+            app_commands.Choice(name="Débit", value="debit"),
+            app_commands.Choice(name="Virement", value="virement"),
+            app_commands.Choice(name="Dépôt", value="depot"),
+            app_commands.Choice(name="Retrait", value="retrait"),
+            app_commands.Choice(name="Prélèvement", value="prelevement")
+        ]
+    )
+    @app_commands.autocomplete(compte_id=account_autocomplete)
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        compte_id: int,
+        format_export: str = 'csv',
+        type_operation: Optional[str] = None,
+        date_debut: Optional[str] = None,
+        date_fin: Optional[str] = None
+    ):
+        """Commande pour exporter l'historique des opérations"""
+        # Importé à la première utilisation pour alléger le démarrage (csv, gzip, tempfile)
+        from utils.export import export_operations, ExportTooLargeError
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        try:
+            token = await self.get_token(str(interaction.user.id))
+            
+            if not token:
+                embed = create_error_embed("Compte non lié", MSG_NOT_LINKED)
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            
+            # Valider les dates
+            for value, field_name in ((date_debut, "Date de début"), (date_fin, "Date de fin")):
+                if value:
+                    valid, error = validate_date(value, field_name)
+                    if not valid:
+                        embed = create_error_embed("Date invalide", error)
+                        await interaction.followup.send(embed=embed, ephemeral=True)
+                        return
+            
+            operations = self.api_client.iter_operations(
+                token,
+                compte_id,
+                type_operation=type_operation,
+                date_debut=date_debut,
+                # Inclure toute la journée de fin
+                date_fin=f"{date_fin} 23:59:59" if date_fin else None,
+                # Un long export peut survivre au token : le renouveler au besoin
+                discord_id=str(interaction.user.id)
+            )
+            
+            fp, filename, count = await export_operations(
+                operations,
+                format_export,
+                f"operations_compte_{compte_id}"
+            )
+            
+            embed = create_info_embed(
+                "Export terminé",
+                f"{count} opération(s) exportée(s) au format {format_export.upper()}."
+            )
+            
+            try:
+                await interaction.followup.send(
+                    embed=embed,
+                    file=discord.File(fp, filename=filename),
+                    ephemeral=True
+                )
+            finally:
+                fp.close()
+            
+        except BankAPIError as e:
+            if e.retry_after is not None:
+                embed = create_retry_later_embed(e.code, e.retry_after)
+            else:
+                embed = create_error_embed(
+                    "Erreur",
+                    "Compte non trouvé ou vous n'avez pas accès à ce compte." if e.code == 404 else str(e)
+                )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        except ExportTooLargeError as e:
+            embed = create_error_embed(
+                "Export trop volumineux",
+                f"{e}. Réduisez la période avec `date_debut` et `date_fin`."
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'export: {e}")
+            embed = create_error_embed(
+                "Erreur",
+                "Une erreur s'est produite lors de l'export des opérations."
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="operation-import", description="Importer plusieurs opérations depuis un fichier CSV")
+    @app_commands.describe(
+        fichier="Fichier CSV : compte_id, type_operation, montant (et optionnellement destinataire, nature, description)"
+    )
+    async def operation_import(self, interaction: discord.Interaction, fichier: discord.Attachment):
+        """Commande pour importer des opérations depuis un fichier CSV"""
+        from utils.operation_import import OperationImportError, parse_operations_csv
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        try:
+            token = await self.get_token(str(interaction.user.id))
+            
+            if not token:
+                embed = create_error_embed("Compte non lié", MSG_NOT_LINKED)
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            
+            if fichier.size > IMPORT_MAX_BYTES:
+                embed = create_error_embed(
+                    "Fichier trop volumineux",
+                    f"Le fichier ne doit pas dépasser {IMPORT_MAX_BYTES // 1024} Ko ({IMPORT_MAX_ROWS} opérations)."
+                )
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            
+            # Les comptes de l'utilisateur servent à valider la colonne compte_id
+            data, accounts = await gather_api_calls(fichier.read(), self.api_client.get_accounts(token))
+            if data is None or accounts is None:
+                embed = create_error_embed("Erreur", MSG_ERROR_API if accounts is None else "Impossible de lire le fichier.")
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            
+            try:
+                rows, errors = parse_operations_csv(data, [account.id for account in accounts])
+            except OperationImportError as e:
+                embed = create_error_embed("Fichier invalide", str(e))
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            
+            # Une seule ligne invalide bloque tout l'import : rien n'est enregistré
+            if errors:
+                embed = create_error_embed(
+                    "Import refusé",
+                    f"{len(errors)} ligne(s) invalide(s), aucune opération n'a été enregistrée. "
+                    f"Corrigez le fichier puis relancez l'import.\n\n"
+                    + format_import_errors(errors)
+                )
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+            
+            numeros = {account.id: account.numero_compte for account in accounts}
+            embed = create_import_summary_embed(rows, numeros)
+            view = OperationImportConfirmView(self.api_client, rows, self.bot.operation_index)
+            
+            await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+            
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'import des opérations: {e}")
+            embed = create_error_embed(
+                "Erreur",
+                "Une erreur s'est produite lors de l'import des opérations."
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+
+def format_import_errors(errors: List[Tuple[int, str]]) -> str:
+    """Liste les premières erreurs d'un import, par numéro de ligne"""
+    lines = [f"**Ligne {line}** : {message}" for line, message in errors[:IMPORT_ERRORS_DISPLAY]]
+    if len(errors) > IMPORT_ERRORS_DISPLAY:
+        lines.append(f"… et {len(errors) - IMPORT_ERRORS_DISPLAY} autre(s)")
+    return '\n'.join(lines)
+
+
+def create_import_summary_embed(rows: List['ImportRow'], numeros: Dict[int, str]) -> discord.Embed:
+    """Récapitulatif d'un import à confirmer : nombre et total des opérations par compte et par type"""
+    embed = create_info_embed(
+        "Confirmation d'import",
+        f"⚠️ Vous êtes sur le point d'enregistrer **{len(rows)}** opération(s) :"
+    )
+    
+    # Compte -> type -> (nombre, total)
+    totals: Dict[int, Dict[str, List[float]]] = {}
+    for row in rows:
+        total = totals.setdefault(row.compte_id, {}).setdefault(row.type_operation, [0, 0.0])
+        total[0] += 1
+        total[1] += row.montant
+    
+    for compte_id, by_type in totals.items():
+        embed.add_field(
+            name=f"Compte {numeros.get(compte_id, compte_id)}",
+            value='\n'.join(
+                f"{format_operation_type_display(type_operation)} : {count} • {format_currency(amount)}"
+                for type_operation, (count, amount) in by_type.items()
+            ),
+            inline=False
+        )
+    
+    embed.set_footer(text="Confirmez pour enregistrer les opérations")
+    return embed
 
 
 class OperationConfirmView(discord.ui.View):
@@ -274,7 +577,8 @@ class OperationConfirmView(discord.ui.View):
         montant: float,
         destinataire: Optional[str],
         nature: Optional[str],
-        description: Optional[str]
+        description: Optional[str],
+        operation_index: Optional['OperationIndex'] = None
     ):
         super().__init__(timeout=60)
         self.api_client = api_client
@@ -285,6 +589,7 @@ class OperationConfirmView(discord.ui.View):
         self.destinataire = destinataire
         self.nature = nature
         self.description = description
+        self.operation_index = operation_index
     
     @discord.ui.button(label="Confirmer", style=discord.ButtonStyle.success)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -303,10 +608,14 @@ class OperationConfirmView(discord.ui.View):
         )
         
         if response.get('success'):
-            data = response.get('data', {})
-            operation = data.get('operation', {})
-            ancien_solde = data.get('ancien_solde', 0)
-            nouveau_solde = data.get('nouveau_solde', 0)
+            data = response.get('data') or {}
+            operation = Operation.from_api(data.get('operation') or {})
+            ancien_solde = to_float(data.get('ancien_solde'))
+            nouveau_solde = to_float(data.get('nouveau_solde'))
+            invalidate_account_choices(interaction.client, str(interaction.user.id))
+            if self.operation_index:
+                # La prochaine recherche doit trouver cette opération
+                await self.operation_index.mark_stale(self.token, self.compte_id)
             
             embed = create_operation_confirmation_embed(operation, ancien_solde, nouveau_solde)
         else:
@@ -336,6 +645,95 @@ class OperationConfirmView(discord.ui.View):
         await interaction.response.edit_message(embed=embed, view=self)
 
 
+class OperationImportConfirmView(discord.ui.View):
+    """Vue de confirmation d'un import d'opérations"""
+    
+    def __init__(
+        self,
+        api_client: BankAPIClient,
+        rows: List['ImportRow'],
+        operation_index: Optional['OperationIndex'] = None
+    ):
+        super().__init__(timeout=IMPORT_CONFIRM_TIMEOUT)
+        self.api_client = api_client
+        self.rows = rows
+        self.operation_index = operation_index
+    
+    @discord.ui.button(label="Confirmer", style=discord.ButtonStyle.success)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Bouton de confirmation"""
+        from utils.operation_import import submit_operations, build_report_csv
+        
+        # Désactiver les boutons avant l'envoi : un second clic ne relance pas l'import
+        for item in self.children:
+            item.disabled = True
+        self.stop()
+        
+        await interaction.response.edit_message(
+            embed=create_info_embed("Import en cours", f"Enregistrement de {len(self.rows)} opération(s)..."),
+            view=self
+        )
+        
+        # Token demandé à la confirmation : celui de la commande a pu expirer depuis
+        try:
+            token = await self.api_client.get_user_token(str(interaction.user.id))
+        except BankAPIError as e:
+            embed = create_retry_later_embed(e.code, e.retry_after)
+            await interaction.edit_original_response(embed=embed, view=self)
+            return
+        
+        if not token:
+            embed = create_error_embed("Compte non lié", MSG_NOT_LINKED)
+            await interaction.edit_original_response(embed=embed, view=self)
+            return
+        
+        results = await submit_operations(self.api_client, token, self.rows)
+        invalidate_account_choices(interaction.client, str(interaction.user.id))
+        
+        if self.operation_index:
+            # Les prochaines recherches doivent trouver les opérations importées
+            for compte_id in {result.row.compte_id for result in results if result.success}:
+                await self.operation_index.mark_stale(token, compte_id)
+        
+        embed = create_import_result_embed(results)
+        report = discord.File(io.BytesIO(build_report_csv(results)), filename="import_resultats.csv")
+        await interaction.edit_original_response(embed=embed, attachments=[report], view=self)
+    
+    @discord.ui.button(label="Annuler", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Bouton d'annulation"""
+        embed = create_info_embed(
+            "Annulé",
+            "L'import a été annulé, aucune opération n'a été enregistrée."
+        )
+        
+        # Désactiver les boutons
+        for item in self.children:
+            item.disabled = True
+        self.stop()
+        
+        await interaction.response.edit_message(embed=embed, view=self)
+
+
+def create_import_result_embed(results: List['ImportResult']) -> discord.Embed:
+    """Résultat d'un import : opérations enregistrées et erreurs ligne par ligne"""
+    failed = [(result.row.line, result.error) for result in results if not result.success]
+    succeeded = len(results) - len(failed)
+    
+    if not failed:
+        return create_success_embed(
+            "Import terminé",
+            f"{succeeded} opération(s) enregistrée(s). Le détail est dans le fichier joint."
+        )
+    
+    create_embed = create_error_embed if not succeeded else create_warning_embed
+    return create_embed(
+        "Import échoué" if not succeeded else "Import incomplet",
+        f"{succeeded}/{len(results)} opération(s) enregistrée(s), {len(failed)} en erreur "
+        f"(détail dans le fichier joint) :\n\n" + format_import_errors(failed)
+    )
+
+
 async def setup(bot: commands.Bot):
     """Fonction pour charger le cog"""
     await bot.add_cog(OperationsCog(bot))
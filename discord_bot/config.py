@@ -17,6 +17,63 @@ DISCORD_CLIENT_SECRET = os.getenv('DISCORD_CLIENT_SECRET')
 API_BASE_URL = os.getenv('API_BASE_URL', 'https://votre-domaine.com/api')
 API_BOT_TOKEN = os.getenv('API_BOT_TOKEN')  # Token secret pour authentifier le bot auprès de l'API
 
+# Pool de connexions HTTP vers l'API
+API_POOL_LIMIT = 100  # Connexions simultanées maximum
+API_POOL_LIMIT_PER_HOST = 30  # Connexions simultanées maximum vers l'API
+API_KEEPALIVE_TIMEOUT = 30  # Durée de conservation des connexions inactives (secondes)
+API_DNS_CACHE_TTL = 300  # Durée du cache DNS (secondes)
+
+# Délais, nouvelles tentatives et disjoncteur
+API_TIMEOUT = 5  # Délai par défaut d'une tentative (secondes)
+API_ENDPOINT_TIMEOUTS = {
+    r'^/operations/search$': 10,
+}
+API_REQUEST_DEADLINE = 12  # Durée maximale d'une requête, nouvelles tentatives comprises
+API_MAX_RETRIES = 2  # Nouvelles tentatives pour les requêtes GET
+API_RETRY_BASE_DELAY = 0.2  # Délai de base du backoff exponentiel (secondes)
+API_RETRY_MAX_DELAY = 2
+CIRCUIT_BREAKER_FAILURE_RATE = 0.5  # Taux d'erreur déclenchant l'ouverture
+CIRCUIT_BREAKER_MIN_REQUESTS = 10  # Nombre minimum d'appels dans la fenêtre
+CIRCUIT_BREAKER_WINDOW = 30  # Fenêtre d'observation (secondes)
+CIRCUIT_BREAKER_RESET_TIMEOUT = 15  # Durée d'ouverture avant un appel de test (secondes)
+
+# Traçage des requêtes vers l'API
+API_SLOW_REQUEST_THRESHOLD = float(os.getenv('API_SLOW_REQUEST_THRESHOLD', '1.0'))  # Seuil du journal des requêtes lentes (secondes)
+
+# Limite de débit côté client (identique à RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW de l'API)
+RATE_LIMIT_REQUESTS = 60  # Requêtes par fenêtre, par utilisateur et groupe d'endpoints
+RATE_LIMIT_WINDOW = 60  # Fenêtre en secondes
+RATE_LIMIT_MAX_WAIT = 2  # Attente maximale d'un jeton avant de refuser localement (secondes)
+RATE_LIMIT_MAX_BUCKETS = 50000
+
+# Journalisation
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', 'bot.log')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()  # Format du fichier : json ou text
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Taille déclenchant la rotation du fichier (10 Mo)
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', '')  # Rotation à l'heure plutôt qu'à la taille (ex. 'midnight')
+LOG_BACKUP_COUNT = 7  # Fichiers archivés conservés
+LOG_RATE_LIMIT_BURST = 10  # Avertissements/erreurs émis tels quels par ligne de code et par fenêtre
+LOG_RATE_LIMIT_WINDOW = 60  # Fenêtre de limitation (secondes)
+LOG_SAMPLE_EVERY = 100  # Au-delà, un enregistrement sur N est conservé
+
+# Synchronisation des commandes slash
+COMMAND_TREE_HASH_PATH = os.getenv('COMMAND_TREE_HASH_PATH', 'data/command_tree.json')  # Empreinte de la dernière synchronisation
+FORCE_COMMAND_SYNC = os.getenv('FORCE_COMMAND_SYNC', 'false').lower() == 'true'
+
+# Gateway Discord
+# Mode lean : seulement l'intent guilds (les commandes slash n'en demandent aucun),
+# sans cache des membres ni des messages, ni traitement des commandes à préfixe (à activer explicitement)
+GATEWAY_LEAN_MODE = os.getenv('GATEWAY_LEAN_MODE', 'false').lower() == 'true'
+GATEWAY_STATS_INTERVAL = 300  # Période du journal mémoire / événements par seconde (secondes)
+
+# Cluster multi-processus (launcher.py)
+CLUSTER_WORKERS = int(os.getenv('CLUSTER_WORKERS', '0'))  # Processus worker (0 : nombre de cœurs)
+CLUSTER_RESTART_MAX_DELAY = 60  # Délai maximum avant le redémarrage d'un worker arrêté (secondes)
+CLUSTER_STABLE_AFTER = 120  # Durée de fonctionnement après laquelle un worker est considéré stable (secondes)
+CLUSTER_IDENTIFY_INTERVAL = 5  # Intervalle imposé par Discord entre deux connexions de shards (secondes)
+EXIT_CODE_CONFIG_ERROR = 2  # Code de sortie du bot pour une erreur non récupérable (configuration, token)
+
 # Configuration du bot
 BOT_PREFIX = '/'  # Utiliser les slash commands
 BOT_DESCRIPTION = 'Bot bancaire pour gérer vos comptes via Discord'
@@ -42,11 +99,83 @@ EMOJI_ARROW_DOWN = '📉'
 
 # Limites
 MAX_OPERATIONS_DISPLAY = 10
+FORMAT_DATE_CACHE_SIZE = 4096  # Dates formatées conservées pour l'affichage des opérations
+OPERATIONS_VIEW_TIMEOUT = 180  # Durée de vie des boutons de pagination (secondes)
+OPERATIONS_PAGE_SIZE = 100  # Taille des pages lors d'un parcours complet (maximum de l'API)
+OPERATIONS_READ_AHEAD = 2  # Pages chargées en avance lors d'un parcours complet
+OPERATIONS_PAGE_ATTEMPTS = 5  # Tentatives par page quand l'API limite le débit
+
+# Export de l'historique
+EXPORT_BATCH_SIZE = 500  # Opérations encodées par lot
+EXPORT_BUFFER_SIZE = 64 * 1024  # Tampon d'écriture du fichier temporaire
+EXPORT_COMPRESS_THRESHOLD = 1024 * 1024  # Compression gzip au-delà de 1 Mo
+EXPORT_MAX_SIZE = 8 * 1024 * 1024  # Taille maximale d'une pièce jointe Discord
+
+# Import d'opérations (/operation-import)
+IMPORT_MAX_ROWS = 50  # Opérations par fichier, sous la limite de débit de l'API (RATE_LIMIT_REQUESTS par minute)
+IMPORT_MAX_BYTES = 256 * 1024  # Taille maximale du fichier CSV
+IMPORT_CONCURRENCY = 4  # Comptes traités simultanément (les opérations d'un même compte sont envoyées dans l'ordre)
+IMPORT_CONFIRM_TIMEOUT = 120  # Durée de validité du bouton de confirmation (secondes)
+IMPORT_ERRORS_DISPLAY = 10  # Erreurs de validation affichées
+
+# Index local des opérations pour /search (SQLite FTS5)
+OPERATION_INDEX_ENABLED = os.getenv('OPERATION_INDEX_ENABLED', 'true').lower() == 'true'
+OPERATION_INDEX_PATH = os.getenv('OPERATION_INDEX_PATH', 'data/operations.db')
+OPERATION_INDEX_SYNC_INTERVAL = 30  # Délai minimum entre deux synchronisations d'un compte (secondes)
+OPERATION_INDEX_SYNC_PAGE_SIZE = 10  # Taille des pages d'une synchronisation incrémentale (souvent une seule)
+OPERATION_INDEX_BATCH_SIZE = 500  # Opérations écrites par transaction lors d'une indexation complète
 CACHE_TIMEOUT = 300  # 5 minutes
 
+# Cache des réponses GET de l'API (durée de vie en secondes par endpoint)
+API_CACHE_MAX_BYTES = 16 * 1024 * 1024  # 16 Mo
+API_CACHE_TTLS = {
+    r'^/accounts$': 60,
+    r'^/accounts/\d+$': CACHE_TIMEOUT,
+    r'^/accounts/\d+/balance$': 30,
+    r'^/accounts/\d+/operations$': 30,
+    r'^/user/profile$': CACHE_TIMEOUT,
+    r'^/user/stats$': 60,
+    r'^/user/discord$': 60,
+}
+
+# Cache des tokens JWT
+TOKEN_REFRESH_MARGIN = 60  # Renouveler le token 60 secondes avant son expiration
+TOKEN_CACHE_MAX_SIZE = 10000
+
+# Cache partagé entre les processus du bot : memory (propre au processus), sqlite ou redis
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory').lower()
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', 'data/cache.db')
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+CACHE_REDIS_PREFIX = 'bankbot:'
+CACHE_BACKEND_TIMEOUT = 0.5  # Au-delà, une opération du cache partagé compte comme une absence (secondes)
+CACHE_LOCAL_TTL = 5  # Durée de vie maximale des copies en mémoire d'un cache partagé (secondes)
+CACHE_TAG_TTL = 3600  # Durée de vie des index d'invalidation par utilisateur (secondes)
+TOKEN_ENCRYPTION_KEY = os.getenv('TOKEN_ENCRYPTION_KEY')  # Clé Fernet des tokens hors mémoire (défaut : dérivée de API_BOT_TOKEN)
+
+# Redémarrage à chaud : caches enregistrés à l'arrêt et rechargés au démarrage
+WARM_CACHE_ENABLED = os.getenv('WARM_CACHE_ENABLED', 'true').lower() == 'true'
+WARM_CACHE_PATH = os.getenv('WARM_CACHE_PATH', 'data/warm_cache.json')
+WARM_CACHE_MAX_AGE = 24 * 3600  # Au-delà, l'instantané est ignoré (secondes)
+WARM_CACHE_ACTIVE_USERS = 1000  # Utilisateurs récents mémorisés
+WARM_CACHE_ACCOUNTS = 10000  # Numéros de comptes mémorisés
+WARMUP_USERS = 20  # Utilisateurs récents dont les comptes sont préchargés à la connexion
+
+# Autocomplétion des paramètres compte_id
+AUTOCOMPLETE_CACHE_TTL = 30  # Durée de conservation des comptes proposés (secondes)
+AUTOCOMPLETE_TIMEOUT = 2.5  # Discord attend une réponse en moins de 3 secondes
+AUTOCOMPLETE_CACHE_MAX_SIZE = 5000  # Utilisateurs dont les comptes sont conservés
+
+# Métriques (format Prometheus, servies en local)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+EVENT_LOOP_MONITOR_INTERVAL = 0.5  # Période de mesure du retard de la boucle d'événements (secondes)
+
 # Messages
 MSG_NOT_LINKED = "Vous n'avez pas encore lié votre compte bancaire. Utilisez `/link` pour commencer."
 MSG_ERROR_API = "Une erreur s'est produite lors de la communication avec l'API bancaire."
+MSG_RATE_LIMITED = "Trop de requêtes. Veuillez réessayer dans {retry_after:.0f}s."
+MSG_API_UNAVAILABLE = "L'API bancaire est temporairement indisponible. Réessayez dans {retry_after:.0f}s."
 MSG_ERROR_PERMISSION = "Vous n'avez pas la permission d'effectuer cette action."
 
 # Validation
@@ -0,0 +1,304 @@
+"""
+Lanceur multi-processus du bot
+
+Répartit les shards entre plusieurs processus bot.py (un par cœur par défaut),
+chacun avec sa propre connexion à la gateway et son propre client API.
+Le superviseur redémarre les workers arrêtés et expose sur METRICS_PORT les
+métriques de tous les workers, étiquetées par worker.
+
+Usage :
+    python launcher.py
+    python launcher.py --workers 4 --shards 16
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from config import (
+    DISCORD_BOT_TOKEN, METRICS_ENABLED, METRICS_HOST, METRICS_PORT,
+    CLUSTER_WORKERS, CLUSTER_RESTART_MAX_DELAY, CLUSTER_STABLE_AFTER, CLUSTER_IDENTIFY_INTERVAL,
+    EXIT_CODE_CONFIG_ERROR, WARM_CACHE_PATH, validate_config
+)
+from utils.logs import setup_logging, process_log_file
+from utils.metrics import Registry, Counter, Gauge, MetricsServer, merge_expositions
+
+logger = logging.getLogger('launcher')
+
+BOT_SCRIPT = Path(__file__).parent / 'bot.py'
+DISCORD_GATEWAY_BOT_URL = 'https://discord.com/api/v10/gateway/bot'
+
+# Métriques propres au superviseur
+CLUSTER_REGISTRY = Registry()
+WORKER_UP = CLUSTER_REGISTRY.register(Gauge(
+    'bankbot_cluster_worker_up',
+    "Worker en cours d'exécution (1) ou arrêté (0)",
+    ['worker']
+))
+WORKER_RESTARTS = CLUSTER_REGISTRY.register(Counter(
+    'bankbot_cluster_worker_restarts_total',
+    "Redémarrages de workers après un arrêt inattendu",
+    ['worker']
+))
+WORKER_SCRAPE_ERRORS = CLUSTER_REGISTRY.register(Counter(
+    'bankbot_cluster_scrape_errors_total',
+    "Échecs de lecture des métriques d'un worker",
+    ['worker']
+))
+
+
+async def fetch_recommended_shards(token: str) -> Tuple[int, int]:
+    """Retourne le nombre de shards recommandé par Discord et le nombre de connexions simultanées permises"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(DISCORD_GATEWAY_BOT_URL, headers={'Authorization': f'Bot {token}'}) as response:
+            response.raise_for_status()
+            data = await response.json()
+    
+    return data['shards'], data.get('session_start_limit', {}).get('max_concurrency', 1)
+
+
+def split_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """Répartit les shards en plages contiguës de tailles égales (à un près)"""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    
+    ranges = []
+    start = 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+class Worker:
+    """Processus bot.py gérant une plage de shards"""
+    
+    def __init__(self, index: int, shard_ids: List[int]):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.metrics_port = METRICS_PORT + 1 + index
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.started_at = 0.0
+        # Arrêts successifs sans période de fonctionnement stable
+        self.failures = 0
+    
+    @property
+    def name(self) -> str:
+        """Nom du worker dans les logs et les métriques"""
+        return f"worker{self.index}"
+
+
+class Supervisor:
+    """Démarre les workers, les redémarre en cas d'arrêt et agrège leurs métriques"""
+    
+    def __init__(self, shard_count: int, workers: int, max_concurrency: int = 1, force_sync: bool = False):
+        self.shard_count = shard_count
+        self.max_concurrency = max(1, max_concurrency)
+        self.force_sync = force_sync
+        self.workers = [Worker(index, shard_ids) for index, shard_ids in enumerate(split_shards(shard_count, workers))]
+        self.stopping = asyncio.Event()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.metrics_server: Optional[MetricsServer] = None
+    
+    def _command(self, worker: Worker) -> List[str]:
+        """Ligne de commande d'un worker"""
+        command = [
+            sys.executable, str(BOT_SCRIPT),
+            '--shard-ids', f"{worker.shard_ids[0]}-{worker.shard_ids[-1]}",
+            '--shard-count', str(self.shard_count)
+        ]
+        # Les commandes slash sont globales : un seul worker les synchronise
+        if worker.index:
+            command.append('--no-sync')
+        elif self.force_sync:
+            command.append('--force-sync')
+        return command
+    
+    def _environment(self, worker: Worker) -> Dict[str, str]:
+        """Variables d'environnement d'un worker : port de métriques, fichiers de logs et de cache dédiés"""
+        environment = os.environ.copy()
+        environment['METRICS_PORT'] = str(worker.metrics_port)
+        environment['LOG_FILE'] = process_log_file(worker.name)
+        cache_path = Path(WARM_CACHE_PATH)
+        environment['WARM_CACHE_PATH'] = str(cache_path.with_name(f"{cache_path.stem}.{worker.name}{cache_path.suffix}"))
+        return environment
+    
+    async def _run_worker(self, worker: Worker, delay: float):
+        """Exécute un worker et le redémarre tant que le cluster n'est pas arrêté"""
+        if delay and not await self._sleep(delay):
+            return
+        
+        while not self.stopping.is_set():
+            # Groupe de processus distinct : Ctrl+C n'atteint que le superviseur, qui relaie l'arrêt
+            worker.process = await asyncio.create_subprocess_exec(
+                *self._command(worker),
+                env=self._environment(worker),
+                start_new_session=sys.platform != 'win32'
+            )
+            worker.started_at = time.monotonic()
+            WORKER_UP.labels(worker.name).set(1)
+            logger.info(
+                f"{worker.name} démarré (PID {worker.process.pid}, "
+                f"shards {worker.shard_ids[0]}-{worker.shard_ids[-1]})"
+            )
+            
+            exit_code = await worker.process.wait()
+            WORKER_UP.labels(worker.name).set(0)
+            
+            if self.stopping.is_set():
+                break
+            
+            if exit_code == EXIT_CODE_CONFIG_ERROR:
+                # Erreur de configuration ou token invalide : tous les workers échoueraient
+                logger.error(f"{worker.name} arrêté sur une erreur de configuration, arrêt du cluster")
+                await self.stop()
+                break
+            
+            if time.monotonic() - worker.started_at >= CLUSTER_STABLE_AFTER:
+                worker.failures = 0
+            worker.failures += 1
+            restart_delay = min(CLUSTER_RESTART_MAX_DELAY, 2 ** (worker.failures - 1))
+            
+            logger.error(f"{worker.name} arrêté (code {exit_code}), redémarrage dans {restart_delay}s")
+            WORKER_RESTARTS.labels(worker.name).inc()
+            if not await self._sleep(restart_delay):
+                break
+    
+    async def _sleep(self, delay: float) -> bool:
+        """Attend, sauf arrêt du cluster ; retourne False si le cluster s'arrête"""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=delay)
+            return False
+        except asyncio.TimeoutError:
+            return True
+    
+    async def _scrape(self, worker: Worker) -> Optional[str]:
+        """Lit les métriques d'un worker"""
+        host = '127.0.0.1' if METRICS_HOST in ('0.0.0.0', '') else METRICS_HOST
+        try:
+            async with self.session.get(f"http://{host}:{worker.metrics_port}/metrics") as response:
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            WORKER_SCRAPE_ERRORS.labels(worker.name).inc()
+            return None
+    
+    async def render(self) -> str:
+        """Métriques du superviseur et de tous les workers"""
+        texts = await asyncio.gather(*(self._scrape(worker) for worker in self.workers))
+        expositions = {str(worker.index): text for worker, text in zip(self.workers, texts) if text}
+        return CLUSTER_REGISTRY.render() + merge_expositions(expositions, 'worker')
+    
+    async def run(self):
+        """Démarre le cluster et attend son arrêt"""
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, lambda: asyncio.ensure_future(self.stop()))
+            except (NotImplementedError, RuntimeError):
+                # Windows : Ctrl+C lève KeyboardInterrupt
+                pass
+        
+        if METRICS_ENABLED:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2))
+            self.metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT, self)
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Impossible d'exposer les métriques sur {METRICS_HOST}:{METRICS_PORT}: {e}")
+                self.metrics_server = None
+        
+        logger.info(f"Cluster: {self.shard_count} shard(s) répartis sur {len(self.workers)} worker(s)")
+        
+        # Discord limite les connexions de shards : décaler le démarrage des workers
+        tasks = []
+        identified = 0
+        for worker in self.workers:
+            delay = identified // self.max_concurrency * CLUSTER_IDENTIFY_INTERVAL
+            tasks.append(asyncio.create_task(self._run_worker(worker, delay)))
+            identified += len(worker.shard_ids)
+        
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if self.metrics_server:
+                await self.metrics_server.stop()
+            if self.session:
+                await self.session.close()
+    
+    async def stop(self, timeout: float = 30):
+        """Arrête proprement les workers (SIGINT), puis de force après le délai"""
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        logger.info("Arrêt du cluster...")
+        
+        running = [worker.process for worker in self.workers if worker.process and worker.process.returncode is None]
+        for process in running:
+            if sys.platform == 'win32':
+                process.terminate()
+            else:
+                process.send_signal(signal.SIGINT)
+        
+        try:
+            await asyncio.wait_for(asyncio.gather(*(process.wait() for process in running)), timeout=timeout)
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    process.kill()
+
+
+async def main(workers: int, shard_count: Optional[int], force_sync: bool) -> int:
+    """Fonction principale du lanceur"""
+    try:
+        validate_config()
+    except ValueError as e:
+        logger.error(f"Erreur de configuration: {e}")
+        return EXIT_CODE_CONFIG_ERROR
+    
+    max_concurrency = 1
+    if shard_count is None:
+        try:
+            shard_count, max_concurrency = await fetch_recommended_shards(DISCORD_BOT_TOKEN)
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Impossible d'obtenir le nombre de shards recommandé ({e.status})")
+            return EXIT_CODE_CONFIG_ERROR if e.status == 401 else 1
+        except aiohttp.ClientError as e:
+            logger.error(f"Impossible d'obtenir le nombre de shards recommandé: {e}")
+            return 1
+    
+    supervisor = Supervisor(shard_count, workers, max_concurrency, force_sync)
+    try:
+        await supervisor.run()
+    finally:
+        await supervisor.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lanceur multi-processus du bot bancaire")
+    parser.add_argument('--workers', type=int, default=CLUSTER_WORKERS or os.cpu_count() or 1,
+                        help="Nombre de processus worker (défaut : CLUSTER_WORKERS ou nombre de cœurs)")
+    parser.add_argument('--shards', type=int,
+                        help="Nombre total de shards (défaut : valeur recommandée par Discord)")
+    parser.add_argument('--force-sync', action='store_true',
+                        help="Synchroniser les commandes slash même si elles n'ont pas changé")
+    args = parser.parse_args()
+    
+    setup_logging(process_log_file('launcher'))
+    
+    exit_code = 0
+    try:
+        exit_code = asyncio.run(main(args.workers, args.shards, args.force_sync))
+    except KeyboardInterrupt:
+        logger.info("Cluster arrêté par l'utilisateur")
+    
+    sys.exit(exit_code)
@@ -3,13 +3,53 @@ Client API pour communiquer avec le backend Bank App
 """
 
 import aiohttp
+import asyncio
 import logging
-from typing import Optional, Dict, Any, List
-from config import API_BASE_URL, API_BOT_TOKEN
+import re
+import sqlite3
+import ssl
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any, List, Tuple, Set, AsyncIterator, Deque
+from urllib.parse import urlencode
+from config import (
+    API_BASE_URL, API_BOT_TOKEN,
+    API_POOL_LIMIT, API_POOL_LIMIT_PER_HOST,
+    API_KEEPALIVE_TIMEOUT, API_DNS_CACHE_TTL, API_CACHE_TTLS,
+    API_TIMEOUT, API_ENDPOINT_TIMEOUTS, API_REQUEST_DEADLINE, API_MAX_RETRIES,
+    MSG_API_UNAVAILABLE, MSG_RATE_LIMITED,
+    OPERATIONS_PAGE_SIZE, OPERATIONS_READ_AHEAD, OPERATIONS_PAGE_ATTEMPTS,
+    CACHE_LOCAL_TTL, TOKEN_REFRESH_MARGIN, WARM_CACHE_ACCOUNTS
+)
+from utils.cache import TokenCache, ResponseCache, token_principal
+from utils.cache_backends import CacheBackend, MemoryBackend, create_cache_backend
+from utils.resilience import CircuitBreaker, backoff_delay
+from utils.rate_limiter import RateLimiter
+from utils.json_codec import dumps, loads
+from utils.token_crypto import token_cipher
+from utils.tracing import REQUEST_ID_HEADER, RequestTrace, create_trace_config, new_request_id
+from utils.metrics import (
+    API_REQUEST_DURATION, API_REQUESTS_TOTAL,
+    API_HTTP_DURATION, API_HTTP_RESPONSES_TOTAL, API_HTTP_IN_FLIGHT,
+    endpoint_label
+)
+from utils.models import (
+    Account, AccountsSummary, Operation, OperationsPage, Profile, Stats
+)
 
 logger = logging.getLogger(__name__)
 
 
+class BankAPIError(Exception):
+    """Erreur renvoyée par l'API lors d'un parcours en plusieurs requêtes, ou API momentanément inaccessible"""
+    
+    def __init__(self, message: str, code: int = 500, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.code = code
+        # Délai avant de réessayer quand la requête est refusée (limite de débit, disjoncteur ouvert)
+        self.retry_after = retry_after
+
+
 class BankAPIClient:
     """Client pour interagir avec l'API Bank App"""
     
@@ -17,18 +57,282 @@ class BankAPIClient:
         self.base_url = API_BASE_URL
         self.bot_token = API_BOT_TOKEN
         self.session: Optional[aiohttp.ClientSession] = None
+        self.token_cache = TokenCache()
+        self.response_cache = ResponseCache()
+        # Second niveau de cache, partagé entre processus (CACHE_BACKEND)
+        self.shared_cache: CacheBackend = create_cache_backend()
+        self._shared_cache_opened = False
+        # Les tokens ne sont déposés dans le cache partagé que chiffrés
+        self._token_cipher = token_cipher()
+        # Numéros des comptes déjà lus (ID -> numéro), conservés entre deux démarrages
+        self.account_numbers: 'OrderedDict[int, str]' = OrderedDict()
+        self._cache_ttls = [(re.compile(pattern), ttl) for pattern, ttl in API_CACHE_TTLS.items()]
+        self._timeouts = [(re.compile(pattern), timeout) for pattern, timeout in API_ENDPOINT_TIMEOUTS.items()]
+        self.circuit_breaker = CircuitBreaker()
+        self.rate_limiter = RateLimiter()
+        self.retries = 0
+        # Requêtes GET en cours, partagées entre appels identiques
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.coalesced_requests = 0
+        self._session_lock = asyncio.Lock()
+        # Contexte TLS créé une seule fois (chargement des certificats racines) et partagé par
+        # toutes les connexions ; les poignées de main TLS sont évitées par la réutilisation
+        # des connexions keep-alive du pool, pas par ce contexte
+        self._ssl_context = ssl.create_default_context()
     
     async def __aenter__(self):
         """Créer une session lors de l'entrée dans le context manager"""
-        self.session = aiohttp.ClientSession()
+        await self.start()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Fermer la session lors de la sortie du context manager"""
-        if self.session:
-            await self.session.close()
+        await self.close()
+    
+    async def start(self) -> aiohttp.ClientSession:
+        """Crée la session HTTP partagée si elle n'existe pas encore"""
+        if self.session and not self.session.closed:
+            return self.session
+        
+        async with self._session_lock:
+            # Une autre coroutine a pu créer la session pendant l'attente du verrou
+            if self.session and not self.session.closed:
+                return self.session
+            
+            connector = aiohttp.TCPConnector(
+                limit=API_POOL_LIMIT,
+                limit_per_host=API_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=API_DNS_CACHE_TTL,
+                ssl=self._ssl_context
+            )
+            self.session = aiohttp.ClientSession(connector=connector, trace_configs=[create_trace_config()])
+            logger.info("Session HTTP de l'API créée")
+            
+            if not self._shared_cache_opened:
+                await self._open_shared_cache()
+        
+        return self.session
+    
+    async def close(self):
+        """Ferme la session HTTP et ses connexions"""
+        async with self._session_lock:
+            if self.session and not self.session.closed:
+                await self.session.close()
+                logger.info("Session HTTP de l'API fermée")
+            self.session = None
+            
+            if self._shared_cache_opened:
+                await self.shared_cache.close()
+                self._shared_cache_opened = False
+    
+    async def _open_shared_cache(self):
+        """Ouvre le cache partagé ; s'il est indisponible, se replie sur le cache en mémoire"""
+        try:
+            await self.shared_cache.open()
+        except (OSError, sqlite3.Error, ValueError) as e:
+            logger.error(f"Cache {self.shared_cache.name} indisponible, cache en mémoire utilisé: {e}")
+            self.shared_cache = MemoryBackend()
+        self._shared_cache_opened = True
+        
+        if self.shared_cache.shared and self._token_cipher is None:
+            logger.warning(
+                f"Tokens non partagés par le cache {self.shared_cache.name} : installez cryptography "
+                "et définissez TOKEN_ENCRYPTION_KEY ou API_BOT_TOKEN pour les chiffrer"
+            )
+    
+    @property
+    def _shares_tokens(self) -> bool:
+        """Indique si les tokens passent par le cache partagé (seulement chiffrés)"""
+        return self.shared_cache.shared and self._token_cipher is not None
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Retourne les statistiques des caches et de la résilience du client"""
+        return {
+            'tokens': self.token_cache.stats(),
+            'responses': self.response_cache.stats(),
+            'shared': self.shared_cache.stats(),
+            'coalescing': {
+                'coalesced': self.coalesced_requests,
+                'in_flight': len(self._inflight)
+            },
+            'circuit_breaker': {
+                **self.circuit_breaker.stats(),
+                'retries': self.retries
+            },
+            'rate_limiter': self.rate_limiter.stats()
+        }
+    
+    def _get_cache_ttl(self, endpoint: str) -> Optional[float]:
+        """Retourne la durée de cache d'un endpoint, ou None s'il n'est pas mis en cache"""
+        for pattern, ttl in self._cache_ttls:
+            if pattern.match(endpoint):
+                return ttl
+        return None
+    
+    def _get_timeout(self, endpoint: str) -> float:
+        """Retourne le délai d'une tentative pour un endpoint"""
+        for pattern, timeout in self._timeouts:
+            if pattern.match(endpoint):
+                return timeout
+        return API_TIMEOUT
+    
+    @staticmethod
+    def _shared_response_key(principal: str, endpoint: str, params: Optional[Dict] = None) -> str:
+        """Clé d'une réponse dans le cache partagé"""
+        return f"{principal}|{endpoint}|{urlencode(sorted((params or {}).items()))}"
+    
+    async def _invalidate_responses(self, token: str, predicate=None):
+        """Supprime les réponses en cache d'un utilisateur dont l'endpoint vérifie `predicate`"""
+        principal = token_principal(token)
+        self.response_cache.invalidate(principal, predicate)
+        
+        if self.shared_cache.shared:
+            keys = await self.shared_cache.tagged_keys('response', principal)
+            await self.shared_cache.delete(
+                'response',
+                (key for key in keys if predicate is None or predicate(key.split('|', 2)[1]))
+            )
+    
+    async def _invalidate_account(self, token: str, account_id: int):
+        """Invalide les réponses en cache concernant un compte"""
+        prefix = f'/accounts/{account_id}'
+        await self._invalidate_responses(
+            token,
+            lambda endpoint: (
+                endpoint in ('/accounts', '/user/stats', prefix)
+                or endpoint.startswith(prefix + '/')
+            )
+        )
+    
+    def _remember_account_numbers(self, accounts: List[Dict[str, Any]]):
+        """Mémorise les numéros des comptes renvoyés par l'API"""
+        for data in accounts:
+            if data.get('id') is None or not data.get('numero_compte'):
+                continue
+            account_id = int(data['id'])
+            self.account_numbers[account_id] = str(data['numero_compte'])
+            self.account_numbers.move_to_end(account_id)
+        
+        while len(self.account_numbers) > WARM_CACHE_ACCOUNTS:
+            self.account_numbers.popitem(last=False)
+    
+    async def warm_up(self, tokens: List[str]) -> int:
+        """Ouvre des connexions à l'API avant l'arrivée des commandes
+        
+        Charge en parallèle les comptes des utilisateurs dont les tokens sont
+        fournis (une connexion chacun, réponses mises en cache) ; sans token,
+        une simple requête HEAD ouvre une connexion. Retourne le nombre de
+        requêtes réussies.
+        """
+        if tokens:
+            results = await asyncio.gather(*(self.get_accounts(token) for token in tokens), return_exceptions=True)
+            return sum(1 for result in results if isinstance(result, list))
+        
+        session = await self.start()
+        try:
+            async with session.head(self.base_url, timeout=aiohttp.ClientTimeout(total=API_TIMEOUT)):
+                return 1
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Préchauffage des connexions à l'API impossible: {e}")
+            return 0
+    
+    async def _forget_token(self, token: str):
+        """Oublie un token expiré ou révoqué, dans tous les niveaux de cache"""
+        discord_ids = self.token_cache.invalidate_token(token)
+        if self.shared_cache.shared:
+            await self.shared_cache.delete('token', discord_ids)
+    
+    @staticmethod
+    def _raise_if_unavailable(response: Dict[str, Any]):
+        """Lève BankAPIError si la requête est refusée pour un temps (limite de débit, disjoncteur ouvert)
+        
+        Les méthodes typées retournent None en cas d'erreur : sans cette
+        exception, les commandes ne pourraient pas indiquer quand réessayer.
+        """
+        if response.get('code') in (429, 503) and response.get('retry_after') is not None:
+            raise BankAPIError(response['error'], response['code'], response['retry_after'])
     
     async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        token: Optional[str] = None,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Effectue une requête vers l'API, en passant par le cache pour les GET"""
+        start = time.perf_counter()
+        label = endpoint_label(endpoint)
+        cache_key = None
+        ttl = self._get_cache_ttl(endpoint) if method == 'GET' and token and use_cache else None
+        
+        if ttl:
+            principal = token_principal(token)
+            cache_key = ResponseCache.make_key(principal, endpoint, params)
+            cached = self.response_cache.get(cache_key)
+            
+            if cached is None and self.shared_cache.shared:
+                shared_key = self._shared_response_key(principal, endpoint, params)
+                encoded = await self.shared_cache.get('response', shared_key)
+                if encoded is not None:
+                    cached = loads(encoded)
+                    # La copie locale ne doit pas survivre longtemps à une invalidation par un autre processus
+                    self.response_cache.set(cache_key, cached, min(ttl, CACHE_LOCAL_TTL), len(encoded))
+            
+            if cached is not None:
+                API_REQUESTS_TOTAL.labels(method, label, 'cached').inc()
+                API_REQUEST_DURATION.labels(method, label).observe(time.perf_counter() - start)
+                return cached
+        
+        if method == 'GET':
+            response_data = await self._send_coalesced(endpoint, token, params)
+        else:
+            response_data = await self._send(method, endpoint, token, data, params)
+        
+        if cache_key and response_data.get('success'):
+            if self.shared_cache.shared:
+                encoded = dumps(response_data)
+                self.response_cache.set(cache_key, response_data, min(ttl, CACHE_LOCAL_TTL), len(encoded))
+                await self.shared_cache.set(
+                    'response', self._shared_response_key(*cache_key[:2], params), encoded, ttl, tag=cache_key[0]
+                )
+            else:
+                self.response_cache.set(cache_key, response_data, ttl)
+        
+        API_REQUESTS_TOTAL.labels(method, label, response_data.get('code', 200)).inc()
+        API_REQUEST_DURATION.labels(method, label).observe(time.perf_counter() - start)
+        return response_data
+    
+    async def _send_coalesced(
+        self,
+        endpoint: str,
+        token: Optional[str] = None,
+        params: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Effectue une requête GET, en partageant le résultat des requêtes identiques en cours"""
+        principal = token_principal(token) if token else None
+        key = ResponseCache.make_key(principal, endpoint, params)
+        
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced_requests += 1
+            return await asyncio.shield(pending)
+        
+        task = asyncio.ensure_future(self._send('GET', endpoint, token, None, params))
+        self._inflight[key] = task
+        
+        def _forget(done: asyncio.Future):
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+        
+        task.add_done_callback(_forget)
+        
+        # shield : l'annulation d'un appelant ne doit pas annuler la requête des autres
+        return await asyncio.shield(task)
+    
+    async def _send(
         self,
         method: str,
         endpoint: str,
@@ -36,53 +340,201 @@ class BankAPIClient:
         data: Optional[Dict] = None,
         params: Optional[Dict] = None
     ) -> Dict[str, Any]:
-        """Effectue une requête HTTP vers l'API"""
+        """Effectue une requête HTTP vers l'API, avec délai, nouvelles tentatives et disjoncteur"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + API_REQUEST_DEADLINE
+        
+        # Seules les requêtes idempotentes sont rejouées
+        attempts = API_MAX_RETRIES + 1 if method == 'GET' else 1
+        label = endpoint_label(endpoint)
+        # Identifiant commun aux tentatives, transmis à l'API dans l'en-tête X-Request-ID
+        request_id = new_request_id()
+        
+        # L'API limite les requêtes par utilisateur et par groupe d'endpoints
+        limit_key = None
+        if token:
+            limit_key = (token_principal(token), RateLimiter.endpoint_group(endpoint))
+        
+        for attempt in range(attempts):
+            if not self.circuit_breaker.allow_request():
+                retry_after = self.circuit_breaker.retry_after()
+                return {
+                    'success': False,
+                    'error': MSG_API_UNAVAILABLE.format(retry_after=retry_after),
+                    'code': 503,
+                    'retry_after': retry_after
+                }
+            
+            if limit_key:
+                retry_after = await self.rate_limiter.acquire(limit_key)
+                if retry_after:
+                    return {
+                        'success': False,
+                        'error': MSG_RATE_LIMITED.format(retry_after=retry_after),
+                        'code': 429,
+                        'retry_after': retry_after
+                    }
+            
+            timeout = min(self._get_timeout(endpoint), deadline - loop.time())
+            started = time.perf_counter()
+            API_HTTP_IN_FLIGHT.inc()
+            try:
+                response_data, failed = await self._send_once(
+                    method, endpoint, token, data, params, timeout, request_id, attempt
+                )
+            finally:
+                API_HTTP_IN_FLIGHT.dec()
+            API_HTTP_DURATION.labels(method, label).observe(time.perf_counter() - started)
+            API_HTTP_RESPONSES_TOTAL.labels(method, label, response_data.get('code', 200)).inc()
+            
+            if response_data.get('code') == 429:
+                if limit_key:
+                    # Le compteur de l'API est plus strict que notre seau : se caler dessus
+                    self.rate_limiter.penalize(limit_key)
+                # L'API n'indique pas de délai : son compteur est remis à zéro au plus tard après une fenêtre
+                retry_after = self.rate_limiter.window
+                response_data = {
+                    **response_data,
+                    'error': MSG_RATE_LIMITED.format(retry_after=retry_after),
+                    'retry_after': retry_after
+                }
+            
+            if failed:
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
+                return response_data
+            
+            if attempt == attempts - 1:
+                break
+            
+            delay = backoff_delay(attempt)
+            if loop.time() + delay >= deadline:
+                break
+            
+            self.retries += 1
+            logger.warning(f"Nouvelle tentative {method} {endpoint} dans {delay:.2f}s")
+            await asyncio.sleep(delay)
+        
+        return response_data
+    
+    async def _send_once(
+        self,
+        method: str,
+        endpoint: str,
+        token: Optional[str],
+        data: Optional[Dict],
+        params: Optional[Dict],
+        timeout: float,
+        request_id: Optional[str] = None,
+        attempt: int = 0
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Effectue une tentative de requête HTTP
+        
+        Retourne la réponse et un booléen indiquant une défaillance de l'API
+        (erreur réseau, délai dépassé ou erreur 5xx) justifiant une nouvelle tentative.
+        """
         url = f"{self.base_url}{endpoint}"
-        headers = {'Content-Type': 'application/json'}
+        request_id = request_id or new_request_id()
+        headers = {'Content-Type': 'application/json', REQUEST_ID_HEADER: request_id}
         
         if token:
             headers['Authorization'] = f'Bearer {token}'
         
+        payload = dumps(data) if data is not None else None
+        trace = RequestTrace(request_id, method, endpoint, attempt, len(payload) if payload else 0)
+        status = None
+        
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            session = await self.start()
             
-            async with self.session.request(
+            async with session.request(
                 method,
                 url,
                 headers=headers,
-                json=data,
-                params=params
+                data=payload,
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=max(timeout, 0.1)),
+                trace_request_ctx=trace
             ) as response:
-                response_data = await response.json()
+                status = response.status
+                trace.start('read')
+                body = await response.read()
+                trace.end('read')
+                trace.response_bytes = len(body)
+                
+                try:
+                    trace.start('decode')
+                    response_data = loads(body) if body else {}
+                    trace.end('decode')
+                except ValueError:
+                    logger.error(f"Invalid JSON from API ({response.status}, {request_id}): {body[:200]!r}")
+                    return {
+                        'success': False,
+                        'error': 'Réponse invalide de l\'API',
+                        'code': response.status if response.status >= 400 else 502
+                    }, response.status >= 500
+                
+                if response.status == 401 and token:
+                    # Token expiré ou révoqué : ne plus le réutiliser
+                    await self._forget_token(token)
                 
                 if response.status >= 400:
-                    logger.error(f"API Error {response.status}: {response_data}")
+                    logger.error(f"API Error {response.status} ({request_id}): {response_data}")
                     return {
                         'success': False,
                         'error': response_data.get('error', 'Erreur inconnue'),
                         'code': response.status
-                    }
+                    }, response.status >= 500
                 
-                return response_data
+                return response_data, False
                 
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout after {timeout:.1f}s: {method} {endpoint} ({request_id})")
+            return {
+                'success': False,
+                'error': 'L\'API bancaire ne répond pas',
+                'code': 504
+            }, True
         except aiohttp.ClientError as e:
-            logger.error(f"Client error: {e}")
+            logger.error(f"Client error ({request_id}): {e}")
             return {
                 'success': False,
                 'error': 'Erreur de connexion à l\'API',
                 'code': 500
-            }
+            }, True
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
+            logger.error(f"Unexpected error ({request_id}): {e}")
             return {
                 'success': False,
                 'error': 'Erreur inattendue',
                 'code': 500
-            }
+            }, False
+        finally:
+            trace.finish(status)
     
     async def get_user_token(self, discord_id: str) -> Optional[str]:
         """Obtient un token JWT pour un utilisateur Discord"""
+        token = self.token_cache.get(discord_id)
+        if token:
+            return token
+        
+        if self._shares_tokens:
+            # Token obtenu par un autre processus
+            shared = await self.shared_cache.get('token', discord_id)
+            entry = None
+            if shared is not None:
+                try:
+                    entry = loads(self._token_cipher.decrypt(shared))
+                except Exception as e:
+                    # Clé de chiffrement différente d'un processus à l'autre, ou entrée corrompue
+                    logger.warning(f"Token du cache partagé illisible, ignoré ({type(e).__name__})")
+            if entry is not None:
+                expires_in = entry['expires_at'] - time.time()
+                if expires_in > TOKEN_REFRESH_MARGIN:
+                    self.token_cache.set(discord_id, entry['token'], expires_in)
+                    return entry['token']
+        
         response = await self._request(
             'POST',
             '/auth/discord/token',
@@ -93,35 +545,58 @@ class BankAPIClient:
         )
         
         if response.get('success'):
-            return response.get('access_token')
+            token = response.get('access_token')
+            if token:
+                self.token_cache.set(discord_id, token, response.get('expires_in'))
+                expires_at = TokenCache.token_expiry(token, response.get('expires_in'))
+                if self._shares_tokens and expires_at:
+                    await self.shared_cache.set(
+                        'token', discord_id,
+                        self._token_cipher.encrypt(dumps({'token': token, 'expires_at': expires_at})),
+                        expires_at - TOKEN_REFRESH_MARGIN - time.time()
+                    )
+            return token
         
+        self._raise_if_unavailable(response)
         return None
     
-    async def get_accounts(self, token: str) -> Optional[List[Dict]]:
+    async def get_accounts(self, token: str) -> Optional[List[Account]]:
         """Récupère la liste des comptes de l'utilisateur"""
+        summary = await self.get_accounts_summary(token)
+        return summary.comptes if summary else None
+    
+    async def get_accounts_summary(self, token: str) -> Optional[AccountsSummary]:
+        """Récupère la liste des comptes de l'utilisateur et leur solde total"""
         response = await self._request('GET', '/accounts', token=token)
         
         if response.get('success'):
-            return response.get('data', {}).get('comptes', [])
+            data = response.get('data') or {}
+            self._remember_account_numbers(data.get('comptes') or [])
+            return AccountsSummary.from_api(data)
         
+        self._raise_if_unavailable(response)
         return None
     
-    async def get_account_details(self, token: str, account_id: int) -> Optional[Dict]:
+    async def get_account_details(self, token: str, account_id: int) -> Optional[Account]:
         """Récupère les détails d'un compte"""
         response = await self._request('GET', f'/accounts/{account_id}', token=token)
         
         if response.get('success'):
-            return response.get('data')
+            data = response.get('data') or {}
+            self._remember_account_numbers([data])
+            return Account.from_api(data)
         
+        self._raise_if_unavailable(response)
         return None
     
-    async def get_account_balance(self, token: str, account_id: int) -> Optional[Dict]:
+    async def get_account_balance(self, token: str, account_id: int) -> Optional[Account]:
         """Récupère le solde d'un compte"""
         response = await self._request('GET', f'/accounts/{account_id}/balance', token=token)
         
         if response.get('success'):
-            return response.get('data')
+            return Account.from_api(response.get('data') or {})
         
+        self._raise_if_unavailable(response)
         return None
     
     async def get_account_operations(
@@ -130,7 +605,7 @@ class BankAPIClient:
         account_id: int,
         limit: int = 10,
         offset: int = 0
-    ) -> Optional[Dict]:
+    ) -> Optional[OperationsPage]:
         """Récupère les opérations d'un compte"""
         response = await self._request(
             'GET',
@@ -140,10 +615,123 @@ class BankAPIClient:
         )
         
         if response.get('success'):
-            return response.get('data')
+            return OperationsPage.from_api(response.get('data') or {})
         
+        self._raise_if_unavailable(response)
         return None
     
+    async def _fetch_operations_page(
+        self,
+        token: str,
+        account_id: int,
+        params: Dict[str, Any],
+        discord_id: Optional[str] = None
+    ) -> OperationsPage:
+        """Récupère une page d'historique sans passer par le cache, en respectant la limite de débit
+        
+        Avec `discord_id`, le token de l'utilisateur est relu avant chaque
+        tentative : il est renouvelé s'il arrive à expiration pendant un long
+        parcours, ou s'il vient d'être refusé.
+        """
+        for attempt in range(OPERATIONS_PAGE_ATTEMPTS):
+            if discord_id is not None:
+                token = await self.get_user_token(discord_id)
+                if not token:
+                    raise BankAPIError("Token de l'utilisateur indisponible", 401)
+            
+            response = await self._request(
+                'GET',
+                f'/accounts/{account_id}/operations',
+                token=token,
+                params=params,
+                use_cache=False
+            )
+            
+            if response.get('success'):
+                return OperationsPage.from_api(response.get('data') or {})
+            
+            if response.get('code') == 401 and discord_id is not None and attempt == 0:
+                # Token refusé (et déjà oublié) : réessayer une fois avec un nouveau token
+                continue
+            
+            # Un parcours complet peut dépasser la limite de débit : patienter puis reprendre
+            retry_after = response.get('retry_after')
+            if response.get('code') not in (429, 503) or not retry_after:
+                break
+            
+            await asyncio.sleep(retry_after)
+        
+        raise BankAPIError(
+            response.get('error', 'Erreur inconnue'),
+            response.get('code', 500),
+            response.get('retry_after')
+        )
+    
+    async def iter_operations(
+        self,
+        token: str,
+        account_id: int,
+        type_operation: Optional[str] = None,
+        date_debut: Optional[str] = None,
+        date_fin: Optional[str] = None,
+        page_size: int = OPERATIONS_PAGE_SIZE,
+        read_ahead: int = OPERATIONS_READ_AHEAD,
+        discord_id: Optional[str] = None
+    ) -> AsyncIterator[Operation]:
+        """Parcourt tout l'historique d'un compte, de la plus récente à la plus ancienne opération
+        
+        Les pages sont récupérées par offset avec au plus `read_ahead` pages
+        chargées en avance, ce qui garde une mémoire constante quelle que soit
+        la taille de l'historique. Lève BankAPIError si une page ne peut pas
+        être récupérée.
+        
+        Un parcours peut durer plus longtemps que le token : avec `discord_id`,
+        chaque page est demandée avec le token courant de l'utilisateur (obtenu
+        par get_user_token) plutôt qu'avec `token`.
+        """
+        filters: Dict[str, Any] = {}
+        if type_operation:
+            filters['type'] = type_operation
+        if date_debut:
+            filters['date_debut'] = date_debut
+        if date_fin:
+            filters['date_fin'] = date_fin
+        
+        def fetch(offset: int) -> asyncio.Task:
+            params = {**filters, 'limit': page_size, 'offset': offset}
+            return asyncio.create_task(self._fetch_operations_page(token, account_id, params, discord_id))
+        
+        first = await self._fetch_operations_page(
+            token, account_id, {**filters, 'limit': page_size, 'offset': 0}, discord_id
+        )
+        total = first.total
+        next_offset = page_size
+        pending: Deque[asyncio.Task] = deque()
+        
+        try:
+            page: Optional[OperationsPage] = first
+            # IDs de la page précédente : une opération créée pendant le parcours
+            # décale les offsets et ferait apparaître un doublon
+            previous_ids: Set[int] = set()
+            
+            while page is not None:
+                while len(pending) < read_ahead and next_offset < total:
+                    pending.append(fetch(next_offset))
+                    next_offset += page_size
+                
+                for operation in page.operations:
+                    if operation.id not in previous_ids:
+                        yield operation
+                
+                if not page.operations:
+                    break
+                
+                previous_ids = {operation.id for operation in page.operations}
+                page = await pending.popleft() if pending else None
+        finally:
+            for task in pending:
+                task.cancel()
+    
     async def create_operation(
         self,
         token: str,
@@ -168,7 +756,13 @@ class BankAPIClient:
         if description:
             data['description'] = description
         
-        return await self._request('POST', '/operations', token=token, data=data)
+        response = await self._request('POST', '/operations', token=token, data=data)
+        
+        if response.get('success'):
+            # Le solde et l'historique du compte ont changé
+            await self._invalidate_account(token, compte_id)
+        
+        return response
     
     async def search_operations(
         self,
@@ -182,7 +776,7 @@ class BankAPIClient:
         date_debut: Optional[str] = None,
         date_fin: Optional[str] = None,
         limit: int = 20
-    ) -> Optional[List[Dict]]:
+    ) -> Optional[List[Operation]]:
         """Recherche des opérations selon des critères"""
         params = {'limit': limit}
         
@@ -206,26 +800,30 @@ class BankAPIClient:
         response = await self._request('GET', '/operations/search', token=token, params=params)
         
         if response.get('success'):
-            return response.get('data', {}).get('operations', [])
+            data = response.get('data') or {}
+            return [Operation.from_api(op) for op in data.get('operations') or []]
         
+        self._raise_if_unavailable(response)
         return None
     
-    async def get_user_profile(self, token: str) -> Optional[Dict]:
+    async def get_user_profile(self, token: str) -> Optional[Profile]:
         """Récupère le profil de l'utilisateur"""
         response = await self._request('GET', '/user/profile', token=token)
         
         if response.get('success'):
-            return response.get('data')
+            return Profile.from_api(response.get('data') or {})
         
+        self._raise_if_unavailable(response)
         return None
     
-    async def get_user_stats(self, token: str) -> Optional[Dict]:
+    async def get_user_stats(self, token: str) -> Optional[Stats]:
         """Récupère les statistiques de l'utilisateur"""
         response = await self._request('GET', '/user/stats', token=token)
         
         if response.get('success'):
-            return response.get('data')
+            return Stats.from_api(response.get('data') or {})
         
+        self._raise_if_unavailable(response)
         return None
     
     async def get_discord_link_status(self, token: str) -> Optional[Dict]:
@@ -235,9 +833,15 @@ class BankAPIClient:
         if response.get('success'):
             return response.get('data')
         
+        self._raise_if_unavailable(response)
         return None
     
     async def unlink_discord(self, token: str) -> bool:
         """Délie le compte Discord"""
         response = await self._request('DELETE', '/user/discord', token=token)
+        
+        if response.get('success'):
+            await self._invalidate_responses(token)
+            await self._forget_token(token)
+        
         return response.get('success', False)
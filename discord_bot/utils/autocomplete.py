@@ -0,0 +1,130 @@
+"""
+Autocomplétion des paramètres des commandes slash
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
+
+import discord
+from discord import app_commands
+
+from utils.models import Account
+from utils.embeds import format_currency
+from config import AUTOCOMPLETE_TIMEOUT, AUTOCOMPLETE_CACHE_TTL, AUTOCOMPLETE_CACHE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+MAX_CHOICES = 25  # Limite de Discord
+MAX_CHOICE_NAME_LENGTH = 100
+
+
+class AccountChoicesCache:
+    """Comptes de chaque utilisateur, conservés brièvement entre deux frappes
+    
+    Les utilisateurs non liés sont aussi mémorisés (None) pour ne pas
+    demander un token à l'API à chaque caractère saisi ; /link et /unlink
+    oublient l'entrée de l'utilisateur. Une instance par bot (bot.account_choices).
+    """
+    
+    def __init__(self, ttl: float = AUTOCOMPLETE_CACHE_TTL, max_size: int = AUTOCOMPLETE_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: 'OrderedDict[str, Tuple[float, Optional[List[Account]]]]' = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+    
+    def get(self, user_id: str) -> Tuple[bool, Optional[List[Account]]]:
+        """Retourne (trouvé, comptes) pour un utilisateur"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False, None
+        
+        expires_at, accounts = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            return False, None
+        
+        self._entries.move_to_end(user_id)
+        return True, accounts
+    
+    def set(self, user_id: str, accounts: Optional[List[Account]]):
+        """Mémorise les comptes d'un utilisateur"""
+        self._entries[user_id] = (time.monotonic() + self.ttl, accounts)
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: str):
+        """Oublie les comptes d'un utilisateur (soldes modifiés, compte lié ou délié)"""
+        self._entries.pop(user_id, None)
+    
+    async def load(self, api_client, user_id: str) -> Optional[List[Account]]:
+        """Récupère les comptes d'un utilisateur, une seule fois pour des frappes simultanées"""
+        task = self._loading.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(api_client, user_id))
+            self._loading[user_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        
+        # Le chargement continue si Discord n'attend plus la réponse : la frappe suivante en profitera
+        return await asyncio.shield(task)
+    
+    async def _fetch(self, api_client, user_id: str) -> Optional[List[Account]]:
+        """Récupère les comptes depuis l'API (ou son cache de réponses)"""
+        token = await api_client.get_user_token(user_id)
+        accounts = await api_client.get_accounts(token) if token else None
+        
+        # Une erreur de l'API n'est pas mémorisée, contrairement à un compte non lié
+        if token is None or accounts is not None:
+            self.set(user_id, accounts)
+        return accounts
+
+
+def invalidate_account_choices(client: discord.Client, user_id: str):
+    """Oublie les comptes proposés à un utilisateur, par exemple après une opération"""
+    client.account_choices.invalidate(user_id)
+
+
+def format_account_choice(account: Account) -> str:
+    """Libellé d'un compte dans la liste de suggestions"""
+    name = f"{account.numero_compte} • {account.type_compte.capitalize()} • {format_currency(account.solde)}"
+    return name[:MAX_CHOICE_NAME_LENGTH]
+
+
+async def account_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[int]]:
+    """Suggère les comptes de l'utilisateur pour un paramètre compte_id"""
+    user_id = str(interaction.user.id)
+    cache: AccountChoicesCache = interaction.client.account_choices
+    found, accounts = cache.get(user_id)
+    
+    if not found:
+        try:
+            accounts = await asyncio.wait_for(
+                cache.load(interaction.client.api_client, user_id),
+                timeout=AUTOCOMPLETE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Autocomplétion des comptes trop lente pour {user_id}")
+            return []
+        except Exception as e:
+            logger.error(f"Erreur lors de l'autocomplétion des comptes: {e}")
+            return []
+    
+    search = current.strip().lower()
+    choices = []
+    
+    for account in accounts or []:
+        if search and not (
+            search in str(account.id)
+            or search in account.numero_compte.lower()
+            or search in account.type_compte.lower()
+        ):
+            continue
+        
+        choices.append(app_commands.Choice(name=format_account_choice(account), value=account.id))
+        if len(choices) >= MAX_CHOICES:
+            break
+    
+    return choices
@@ -0,0 +1,238 @@
+"""
+Caches en mémoire pour le client API
+"""
+
+import base64
+import json
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple, Set, Callable, Hashable, List
+
+from utils.json_codec import dumps
+from config import TOKEN_REFRESH_MARGIN, TOKEN_CACHE_MAX_SIZE, API_CACHE_MAX_BYTES
+
+
+def decode_token_payload(token: str) -> Optional[Dict[str, Any]]:
+    """Décode le payload d'un JWT sans vérifier la signature"""
+    parts = token.split('.')
+    if len(parts) != 3:
+        return None
+    
+    # L'API encode en base64 standard, on accepte aussi la variante URL-safe
+    payload = parts[1].replace('-', '+').replace('_', '/')
+    payload += '=' * (-len(payload) % 4)
+    
+    try:
+        data = json.loads(base64.b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    
+    return data if isinstance(data, dict) else None
+
+
+@lru_cache(maxsize=4096)
+def token_principal(token: str) -> str:
+    """Identifie l'utilisateur porteur d'un token (user_id du JWT, sinon le token)"""
+    payload = decode_token_payload(token) or {}
+    user_id = payload.get('user_id')
+    return f"user:{user_id}" if user_id is not None else f"token:{token}"
+
+
+class TokenCache:
+    """Cache des tokens JWT par Discord ID, respectant leur expiration"""
+    
+    def __init__(
+        self,
+        refresh_margin: int = TOKEN_REFRESH_MARGIN,
+        max_size: int = TOKEN_CACHE_MAX_SIZE
+    ):
+        self.refresh_margin = refresh_margin
+        self.max_size = max_size
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, discord_id: str) -> Optional[str]:
+        """Retourne le token en cache s'il reste valide assez longtemps"""
+        entry = self._tokens.get(discord_id)
+        
+        if entry and entry[1] - self.refresh_margin > time.time():
+            self.hits += 1
+            return entry[0]
+        
+        if entry:
+            del self._tokens[discord_id]
+        
+        self.misses += 1
+        return None
+    
+    @staticmethod
+    def token_expiry(token: str, expires_in: Optional[int] = None) -> Optional[float]:
+        """Retourne l'expiration d'un token (claim `exp`, sinon `expires_in`), ou None si inconnue"""
+        payload = decode_token_payload(token) or {}
+        expires_at = payload.get('exp')
+        
+        if isinstance(expires_at, (int, float)):
+            return float(expires_at)
+        if expires_in:
+            return time.time() + expires_in
+        return None
+    
+    def set(self, discord_id: str, token: str, expires_in: Optional[int] = None):
+        """Enregistre un token, son expiration est lue dans le claim `exp`"""
+        expires_at = self.token_expiry(token, expires_in)
+        if expires_at is None:
+            return
+        
+        if len(self._tokens) >= self.max_size:
+            self.purge_expired()
+            if len(self._tokens) >= self.max_size:
+                # Supprimer l'entrée la plus ancienne
+                del self._tokens[next(iter(self._tokens))]
+        
+        self._tokens[discord_id] = (token, expires_at)
+    
+    def invalidate(self, discord_id: str):
+        """Supprime le token d'un utilisateur"""
+        self._tokens.pop(discord_id, None)
+    
+    def invalidate_token(self, token: str) -> List[str]:
+        """Supprime un token précis (par exemple après une réponse 401) et retourne ses Discord IDs"""
+        discord_ids = [discord_id for discord_id, entry in self._tokens.items() if entry[0] == token]
+        for discord_id in discord_ids:
+            del self._tokens[discord_id]
+        return discord_ids
+    
+    def snapshot(self) -> Dict[str, Tuple[str, float]]:
+        """Retourne les tokens encore valides : Discord ID -> (token, expiration)"""
+        limit = time.time() + self.refresh_margin
+        return {discord_id: entry for discord_id, entry in self._tokens.items() if entry[1] > limit}
+    
+    def restore(self, tokens: Dict[str, Tuple[str, float]]):
+        """Recharge des tokens enregistrés par snapshot(), sans remplacer ceux déjà en cache"""
+        for discord_id, (token, expires_at) in tokens.items():
+            if len(self._tokens) >= self.max_size:
+                break
+            self._tokens.setdefault(discord_id, (token, expires_at))
+    
+    def purge_expired(self):
+        """Supprime les tokens expirés ou proches de l'expiration"""
+        limit = time.time() + self.refresh_margin
+        for discord_id, entry in list(self._tokens.items()):
+            if entry[1] <= limit:
+                del self._tokens[discord_id]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._tokens),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0
+        }
+
+
+
+class ResponseCache:
+    """Cache LRU des réponses de l'API, avec TTL par entrée et budget mémoire"""
+    
+    def __init__(self, max_bytes: int = API_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        # clé -> (réponse, expiration, taille estimée)
+        self._entries: 'OrderedDict[Hashable, Tuple[Dict[str, Any], float, int]]' = OrderedDict()
+        # principal -> clés, pour invalider les entrées d'un utilisateur
+        self._keys_by_principal: Dict[str, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def make_key(principal: str, endpoint: str, params: Optional[Dict] = None) -> Tuple:
+        """Construit la clé d'une réponse"""
+        return (principal, endpoint, tuple(sorted((params or {}).items())))
+    
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Retourne une réponse en cache si elle n'a pas expiré"""
+        entry = self._entries.get(key)
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        if entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    def set(self, key: Tuple, value: Dict[str, Any], ttl: float, size: Optional[int] = None):
+        """Enregistre une réponse pour `ttl` secondes"""
+        if size is None:
+            size = len(dumps(value))
+        
+        # Une réponse plus grosse que le budget n'est pas mise en cache
+        if size > self.max_bytes:
+            return
+        
+        if key in self._entries:
+            self._remove(key)
+        
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self._keys_by_principal.setdefault(key[0], set()).add(key)
+        self.size_bytes += size
+        
+        # Évincer les entrées les moins récemment utilisées
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def invalidate(self, principal: str, predicate: Optional[Callable[[str], bool]] = None):
+        """Supprime les entrées d'un utilisateur dont l'endpoint vérifie `predicate`"""
+        for key in list(self._keys_by_principal.get(principal, ())):
+            if predicate is None or predicate(key[1]):
+                self._remove(key)
+                self.invalidations += 1
+    
+    def clear(self):
+        """Vide le cache"""
+        self._entries.clear()
+        self._keys_by_principal.clear()
+        self.size_bytes = 0
+    
+    def _remove(self, key: Tuple):
+        """Supprime une entrée et met à jour la taille du cache"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        
+        self.size_bytes -= entry[2]
+        keys = self._keys_by_principal.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_principal[key[0]]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'size_bytes': self.size_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
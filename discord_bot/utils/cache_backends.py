@@ -0,0 +1,485 @@
+"""
+Backends de cache partagés entre les processus du bot
+
+Un backend conserve des valeurs binaires avec une durée de vie, rangées par
+espace de noms (tokens, réponses) et éventuellement regroupées par étiquette
+(l'utilisateur), pour pouvoir invalider toutes les entrées d'un utilisateur.
+Trois implémentations :
+
+- memory : en mémoire, propre au processus (comportement historique) ;
+- sqlite : fichier local, partagé par les processus d'une machine et
+  conservé entre les redémarrages ;
+- redis : tout serveur parlant le protocole Redis (RESP).
+
+Une panne ou une lenteur du backend ne doit jamais faire échouer une
+requête : les erreurs et dépassements de CACHE_BACKEND_TIMEOUT sont
+comptés, journalisés, et traités comme des absences du cache.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from config import (
+    CACHE_BACKEND, CACHE_SQLITE_PATH, CACHE_REDIS_URL, CACHE_REDIS_PREFIX,
+    CACHE_BACKEND_TIMEOUT, CACHE_TAG_TTL
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Interface commune des backends de cache"""
+    
+    name = ''
+    # Cache partagé entre processus (et conservé entre redémarrages)
+    shared = False
+    
+    def __init__(self, timeout: float = CACHE_BACKEND_TIMEOUT):
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+    
+    async def open(self):
+        """Prépare le backend"""
+    
+    async def close(self):
+        """Libère les ressources du backend"""
+    
+    async def _guard(self, operation: str, coroutine, default: Any = None) -> Any:
+        """Exécute une opération en limitant sa durée ; une erreur vaut `default`"""
+        try:
+            return await asyncio.wait_for(coroutine, timeout=self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache {self.name}: échec de {operation} ({type(e).__name__}: {e})")
+            return default
+    
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """Retourne la valeur d'une clé, ou None si elle est absente ou expirée"""
+        value = await self._guard('lecture', self._get(namespace, key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    async def set(self, namespace: str, key: str, value: bytes, ttl: float, tag: Optional[str] = None):
+        """Enregistre une valeur pour `ttl` secondes, rattachée à l'étiquette `tag`"""
+        if ttl > 0:
+            await self._guard('écriture', self._set(namespace, key, value, ttl, tag))
+    
+    async def delete(self, namespace: str, keys: Iterable[str]):
+        """Supprime des clés"""
+        keys = list(keys)
+        if keys:
+            await self._guard('suppression', self._delete(namespace, keys))
+    
+    async def tagged_keys(self, namespace: str, tag: str) -> List[str]:
+        """Retourne les clés rattachées à une étiquette"""
+        return await self._guard('lecture des étiquettes', self._tagged_keys(namespace, tag), [])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du backend"""
+        total = self.hits + self.misses
+        return {
+            'backend': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'errors': self.errors
+        }
+    
+    # Opérations propres à chaque backend (les erreurs sont gérées par les méthodes publiques)
+    
+    @abstractmethod
+    async def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        """Lit une clé"""
+    
+    @abstractmethod
+    async def _set(self, namespace: str, key: str, value: bytes, ttl: float, tag: Optional[str]):
+        """Écrit une clé"""
+    
+    @abstractmethod
+    async def _delete(self, namespace: str, keys: List[str]):
+        """Supprime des clés"""
+    
+    @abstractmethod
+    async def _tagged_keys(self, namespace: str, tag: str) -> List[str]:
+        """Liste les clés d'une étiquette"""
+
+
+class MemoryBackend(CacheBackend):
+    """Backend en mémoire, propre au processus"""
+    
+    name = 'memory'
+    
+    def __init__(self, timeout: float = CACHE_BACKEND_TIMEOUT):
+        super().__init__(timeout)
+        # (espace, clé) -> (valeur, expiration, étiquette)
+        self._entries: Dict[Tuple[str, str], Tuple[bytes, float, Optional[str]]] = {}
+        self._tags: Dict[Tuple[str, str], Set[str]] = {}
+    
+    async def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            self._remove(namespace, key)
+            return None
+        return entry[0]
+    
+    async def _set(self, namespace: str, key: str, value: bytes, ttl: float, tag: Optional[str]):
+        self._remove(namespace, key)
+        self._entries[(namespace, key)] = (value, time.monotonic() + ttl, tag)
+        if tag is not None:
+            self._tags.setdefault((namespace, tag), set()).add(key)
+    
+    async def _delete(self, namespace: str, keys: List[str]):
+        for key in keys:
+            self._remove(namespace, key)
+    
+    async def _tagged_keys(self, namespace: str, tag: str) -> List[str]:
+        return list(self._tags.get((namespace, tag), ()))
+    
+    def _remove(self, namespace: str, key: str):
+        """Supprime une entrée et sa référence dans son étiquette"""
+        entry = self._entries.pop((namespace, key), None)
+        if entry is None or entry[2] is None:
+            return
+        
+        keys = self._tags.get((namespace, entry[2]))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[(namespace, entry[2])]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    tag TEXT,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_tag ON cache (namespace, tag) WHERE tag IS NOT NULL;
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at);
+"""
+
+
+class SQLiteBackend(CacheBackend):
+    """Backend SQLite : partagé par les processus d'une machine, conservé entre les redémarrages"""
+    
+    name = 'sqlite'
+    shared = True
+    
+    # Nombre d'écritures entre deux purges des entrées expirées
+    PURGE_EVERY = 1000
+    
+    def __init__(self, path: str = CACHE_SQLITE_PATH, timeout: float = CACHE_BACKEND_TIMEOUT):
+        super().__init__(timeout)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        # sqlite3 n'est pas asynchrone : les accès passent par un thread, un à la fois
+        self._db_lock = threading.Lock()
+        self._writes = 0
+    
+    async def _run(self, func, *args):
+        """Exécute une fonction d'accès à la base hors de la boucle d'événements"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._locked, func, *args)
+    
+    def _locked(self, func, *args):
+        """Exécute une fonction avec le verrou de la connexion"""
+        with self._db_lock:
+            return func(*args)
+    
+    def _open(self):
+        """Ouvre la base (lisible par le seul propriétaire : elle contient des tokens)"""
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            Path(self.path).touch(mode=0o600, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SQLITE_SCHEMA)
+        self._conn.commit()
+        
+        if self.path != ':memory:':
+            # SQLite donne à -wal et -shm les droits de la base ; ceux d'une base existante sont corrigés
+            for suffix in ('', '-wal', '-shm'):
+                file = Path(f"{self.path}{suffix}")
+                try:
+                    if file.exists():
+                        file.chmod(0o600)
+                except OSError as e:
+                    logger.warning(f"Droits de {file} non modifiables: {e}")
+    
+    async def open(self):
+        await self._run(self._open)
+        logger.info(f"Cache SQLite ouvert: {self.path}")
+    
+    async def close(self):
+        if self._conn:
+            await self._run(self._conn.close)
+            self._conn = None
+    
+    def _get_row(self, namespace: str, key: str) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+    
+    def _set_row(self, namespace: str, key: str, value: bytes, ttl: float, tag: Optional[str]):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, tag) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, value, now + ttl, tag)
+        )
+        
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        self._conn.commit()
+    
+    def _delete_rows(self, namespace: str, keys: List[str]):
+        self._conn.executemany(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?",
+            [(namespace, key) for key in keys]
+        )
+        self._conn.commit()
+    
+    def _tagged_rows(self, namespace: str, tag: str) -> List[str]:
+        rows = self._conn.execute(
+            "SELECT key FROM cache WHERE namespace = ? AND tag = ? AND expires_at > ?",
+            (namespace, tag, time.time())
+        ).fetchall()
+        return [row[0] for row in rows]
+    
+    async def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        return await self._run(self._get_row, namespace, key)
+    
+    async def _set(self, namespace: str, key: str, value: bytes, ttl: float, tag: Optional[str]):
+        await self._run(self._set_row, namespace, key, value, ttl, tag)
+    
+    async def _delete(self, namespace: str, keys: List[str]):
+        await self._run(self._delete_rows, namespace, keys)
+    
+    async def _tagged_keys(self, namespace: str, tag: str) -> List[str]:
+        return await self._run(self._tagged_rows, namespace, tag)
+
+
+class RedisError(Exception):
+    """Erreur renvoyée par le serveur Redis"""
+
+
+class RedisBackend(CacheBackend):
+    """Backend Redis (protocole RESP), partagé entre machines
+    
+    Une seule connexion, en pipeline : les commandes sont écrites sans
+    attendre les réponses précédentes, qui arrivent dans l'ordre d'envoi.
+    """
+    
+    name = 'redis'
+    shared = True
+    
+    def __init__(
+        self,
+        url: str = CACHE_REDIS_URL,
+        prefix: str = CACHE_REDIS_PREFIX,
+        timeout: float = CACHE_BACKEND_TIMEOUT
+    ):
+        super().__init__(timeout)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.prefix = prefix
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+    
+    async def open(self):
+        await self._connect()
+        logger.info(f"Cache Redis connecté: {self.host}:{self.port}/{self.db}")
+    
+    async def close(self):
+        await self._disconnect(ConnectionError("Connexion Redis fermée"))
+    
+    async def _connect(self):
+        """Ouvre la connexion si nécessaire"""
+        if self._writer is not None:
+            return
+        
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self._reader, self._writer = reader, writer
+            self._reader_task = asyncio.create_task(self._read_replies(reader))
+            
+            # Envoyées avant toute autre commande, sans point de suspension
+            setup = []
+            if self.password:
+                setup.append(self._send(('AUTH', self.password)))
+            if self.db:
+                setup.append(self._send(('SELECT', self.db)))
+            if setup:
+                try:
+                    await writer.drain()
+                    await asyncio.gather(*setup)
+                except Exception as e:
+                    # Connexion inutilisable (mot de passe refusé...) : réessayer à la commande suivante
+                    error = ConnectionError(f"Initialisation de la connexion Redis impossible: {e}")
+                    await self._disconnect(error)
+                    raise error from e
+                except BaseException:
+                    # Annulation (dépassement de CACHE_BACKEND_TIMEOUT...) pendant AUTH/SELECT :
+                    # ne pas garder une connexion à moitié initialisée
+                    await self._disconnect(ConnectionError("Initialisation de la connexion Redis interrompue"))
+                    raise
+    
+    async def _disconnect(self, error: Exception):
+        """Ferme la connexion et fait échouer les commandes en attente"""
+        writer, self._writer, self._reader = self._writer, None, None
+        if self._reader_task:
+            self._reader_task.cancel()
+            self._reader_task = None
+        
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+        
+        if writer is not None:
+            writer.close()
+    
+    async def _read_replies(self, reader: asyncio.StreamReader):
+        """Lit les réponses et les attribue aux commandes, dans l'ordre"""
+        try:
+            while True:
+                reply = await self._read_reply(reader)
+                future = self._pending.popleft()
+                if future.done():
+                    continue
+                if isinstance(reply, RedisError):
+                    future.set_exception(reply)
+                else:
+                    future.set_result(reply)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._disconnect(ConnectionError(f"Connexion Redis perdue: {e}"))
+    
+    async def _read_reply(self, reader: asyncio.StreamReader) -> Any:
+        """Lit une réponse RESP"""
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connexion fermée par le serveur")
+        
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            return RedisError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(payload)
+            if count < 0:
+                return None
+            return [await self._read_reply(reader) for _ in range(count)]
+        raise ConnectionError(f"Réponse Redis invalide: {line[:50]!r}")
+    
+    @staticmethod
+    def _encode(args: Tuple[Any, ...]) -> bytes:
+        """Encode une commande RESP"""
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif not isinstance(arg, (bytes, bytearray)):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+    
+    def _send(self, args: Tuple[Any, ...]) -> asyncio.Future:
+        """Écrit une commande et retourne la future de sa réponse
+        
+        Écriture et mise en attente se font sans point de suspension :
+        les réponses sont attribuées dans l'ordre d'envoi.
+        """
+        if self._writer is None:
+            raise ConnectionError("Connexion Redis fermée")
+        
+        future = asyncio.get_running_loop().create_future()
+        self._writer.write(self._encode(args))
+        self._pending.append(future)
+        return future
+    
+    async def execute(self, *args: Any) -> Any:
+        """Envoie une commande, en (re)connectant si nécessaire, et attend sa réponse"""
+        await self._connect()
+        future = self._send(args)
+        await self._writer.drain()
+        return await future
+    
+    def _key(self, namespace: str, key: str) -> str:
+        """Clé Redis d'une entrée"""
+        return f"{self.prefix}{namespace}:{key}"
+    
+    def _tag_key(self, namespace: str, tag: str) -> str:
+        """Clé Redis de l'ensemble des clés d'une étiquette"""
+        return f"{self.prefix}{namespace}:tag:{tag}"
+    
+    async def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        return await self.execute('GET', self._key(namespace, key))
+    
+    async def _set(self, namespace: str, key: str, value: bytes, ttl: float, tag: Optional[str]):
+        pending = [self.execute('SET', self._key(namespace, key), value, 'PX', max(1, int(ttl * 1000)))]
+        if tag is not None:
+            tag_key = self._tag_key(namespace, tag)
+            pending.append(self.execute('SADD', tag_key, key))
+            pending.append(self.execute('EXPIRE', tag_key, CACHE_TAG_TTL))
+        await asyncio.gather(*pending)
+    
+    async def _delete(self, namespace: str, keys: List[str]):
+        await self.execute('DEL', *(self._key(namespace, key) for key in keys))
+    
+    async def _tagged_keys(self, namespace: str, tag: str) -> List[str]:
+        members = await self.execute('SMEMBERS', self._tag_key(namespace, tag))
+        return [member.decode('utf-8') for member in members or ()]
+
+
+def create_cache_backend(kind: str = CACHE_BACKEND) -> CacheBackend:
+    """Crée le backend de cache configuré (CACHE_BACKEND)"""
+    if kind == 'sqlite':
+        return SQLiteBackend()
+    if kind == 'redis':
+        return RedisBackend()
+    if kind != 'memory':
+        logger.warning(f"Backend de cache inconnu '{kind}', utilisation du cache en mémoire")
+    return MemoryBackend()
@@ -0,0 +1,64 @@
+"""
+Synchronisation des commandes slash uniquement lorsque leur définition change
+
+La synchronisation globale est un appel limité de l'API Discord : on calcule
+une empreinte stable de l'arbre des commandes et on la compare à celle de la
+dernière synchronisation réussie, conservée dans COMMAND_TREE_HASH_PATH.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+
+def command_tree_hash(tree: app_commands.CommandTree) -> str:
+    """Calcule l'empreinte SHA-256 des commandes globales de l'arbre"""
+    payload = []
+    for command_type in (discord.AppCommandType.chat_input, discord.AppCommandType.user, discord.AppCommandType.message):
+        for command in tree.get_commands(type=command_type):
+            try:
+                payload.append(command.to_dict(tree))
+            except TypeError:
+                # discord.py < 2.4 : to_dict() sans argument
+                payload.append(command.to_dict())
+    
+    payload.sort(key=lambda command: (command.get('type', 1), command['name']))
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def load_synced_hash(path: str, application_id: Optional[int]) -> Optional[str]:
+    """Retourne l'empreinte de la dernière synchronisation pour cette application"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Empreinte des commandes illisible ({path}): {e}")
+        return None
+    
+    if state.get('application_id') != application_id:
+        return None
+    return state.get('hash')
+
+
+def save_synced_hash(path: str, application_id: Optional[int], tree_hash: str):
+    """Enregistre l'empreinte des commandes synchronisées (écriture atomique)"""
+    temp_path = f"{path}.tmp"
+    
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'application_id': application_id, 'hash': tree_hash}, file)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Impossible d'enregistrer l'empreinte des commandes ({path}): {e}")
@@ -0,0 +1,34 @@
+"""
+Outils pour exécuter des appels API en parallèle
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, List
+
+from utils.api_client import BankAPIError
+
+logger = logging.getLogger(__name__)
+
+
+async def gather_api_calls(*calls: Awaitable[Any]) -> List[Any]:
+    """Exécute des appels API indépendants en parallèle
+    
+    Les résultats sont renvoyés dans l'ordre des appels. Un appel qui lève
+    une exception est journalisé et remplacé par None, comme un appel
+    ayant échoué côté API, pour que chaque commande gère les échecs partiels.
+    Une API momentanément inaccessible (BankAPIError avec retry_after) est
+    propagée : la commande indique alors quand réessayer.
+    """
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    
+    for index, result in enumerate(results):
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+        if isinstance(result, BankAPIError) and result.retry_after is not None:
+            raise result
+        if isinstance(result, Exception):
+            logger.error(f"Erreur lors de l'appel API parallèle #{index}: {result}")
+            results[index] = None
+    
+    return results
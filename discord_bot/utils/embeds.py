@@ -4,22 +4,44 @@ Utilitaires pour créer des embeds Discord formatés
 
 import discord
 from datetime import datetime
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Optional
+from utils.models import Account, Operation, Stats
 from config import (
     COLOR_SUCCESS, COLOR_ERROR, COLOR_INFO, COLOR_WARNING,
     EMOJI_MONEY, EMOJI_BANK, EMOJI_CARD, EMOJI_CHECK, EMOJI_CROSS,
     EMOJI_WARNING, EMOJI_INFO, EMOJI_CHART, EMOJI_CALENDAR,
-    EMOJI_ARROW_UP, EMOJI_ARROW_DOWN
+    EMOJI_ARROW_UP, EMOJI_ARROW_DOWN, FORMAT_DATE_CACHE_SIZE,
+    MSG_API_UNAVAILABLE, MSG_RATE_LIMITED
 )
 
+OPERATION_EMOJIS = {
+    'credit': EMOJI_ARROW_UP,
+    'debit': EMOJI_ARROW_DOWN,
+    'depot': EMOJI_ARROW_UP,
+    'retrait': EMOJI_ARROW_DOWN,
+    'virement': '💸',
+    'prelevement': '📤'
+}
+
+# Types qui augmentent le solde (montant affiché avec un +)
+CREDIT_TYPES = frozenset(('credit', 'depot'))
+
+# Début du titre d'un champ d'opération ("📈 Credit"), précalculé par type
+OPERATION_TITLES = {
+    type_operation: f"{emoji} {type_operation.capitalize()}"
+    for type_operation, emoji in OPERATION_EMOJIS.items()
+}
+
 
 def format_currency(amount: float) -> str:
     """Formate un montant en devise"""
     return f"{amount:,.2f} €".replace(',', ' ')
 
 
+@lru_cache(maxsize=FORMAT_DATE_CACHE_SIZE)
 def format_date(date_str: str) -> str:
-    """Formate une date pour l'affichage"""
+    """Formate une date pour l'affichage (mémorisé : une page d'historique répète souvent les mêmes dates)"""
     try:
         dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
         return dt.strftime('%d/%m/%Y %H:%M')
@@ -29,15 +51,7 @@ def format_date(date_str: str) -> str:
 
 def get_operation_emoji(type_operation: str) -> str:
     """Retourne l'emoji correspondant au type d'opération"""
-    emojis = {
-        'credit': EMOJI_ARROW_UP,
-        'debit': EMOJI_ARROW_DOWN,
-        'depot': EMOJI_ARROW_UP,
-        'retrait': EMOJI_ARROW_DOWN,
-        'virement': '💸',
-        'prelevement': '📤'
-    }
-    return emojis.get(type_operation, EMOJI_MONEY)
+    return OPERATION_EMOJIS.get(type_operation, EMOJI_MONEY)
 
 
 def create_success_embed(title: str, description: str) -> discord.Embed:
@@ -84,7 +98,14 @@ def create_warning_embed(title: str, description: str) -> discord.Embed:
     return embed
 
 
-def create_accounts_embed(accounts: List[Dict], solde_total: float) -> discord.Embed:
+def create_retry_later_embed(code: int, retry_after: float) -> discord.Embed:
+    """Crée l'embed d'une requête refusée (429 : limite de débit, 503 : API indisponible), avec le délai avant de réessayer"""
+    if code == 429:
+        return create_error_embed("Trop de requêtes", MSG_RATE_LIMITED.format(retry_after=retry_after))
+    return create_error_embed("Service indisponible", MSG_API_UNAVAILABLE.format(retry_after=retry_after))
+
+
+def create_accounts_embed(accounts: List[Account], solde_total: float) -> discord.Embed:
     """Crée un embed pour afficher les comptes"""
     embed = discord.Embed(
         title=f"{EMOJI_BANK} Vos comptes bancaires",
@@ -94,18 +115,18 @@ def create_accounts_embed(accounts: List[Dict], solde_total: float) -> discord.E
     )
     
     for account in accounts:
-        solde = account['solde']
+        solde = account.solde
         emoji = EMOJI_ARROW_UP if solde >= 0 else EMOJI_ARROW_DOWN
         
         field_value = (
-            f"**Type:** {account['type_compte'].capitalize()}\n"
+            f"**Type:** {account.type_compte.capitalize()}\n"
             f"**Solde:** {emoji} {format_currency(solde)}\n"
-            f"**Découvert autorisé:** {format_currency(account['negatif_autorise'])}\n"
-            f"**Relation:** {account['relation'].capitalize()}"
+            f"**Découvert autorisé:** {format_currency(account.negatif_autorise)}\n"
+            f"**Relation:** {account.relation.capitalize()}"
         )
         
         embed.add_field(
-            name=f"{EMOJI_CARD} Compte {account['numero_compte']}",
+            name=f"{EMOJI_CARD} Compte {account.numero_compte}",
             value=field_value,
             inline=False
         )
@@ -114,17 +135,17 @@ def create_accounts_embed(accounts: List[Dict], solde_total: float) -> discord.E
     return embed
 
 
-def create_balance_embed(account: Dict) -> discord.Embed:
+def create_balance_embed(account: Account) -> discord.Embed:
     """Crée un embed pour afficher le solde d'un compte"""
-    solde = account['solde']
-    disponible = account['disponible']
-    en_negatif = account['en_negatif']
+    solde = account.solde
+    disponible = account.disponible
+    en_negatif = account.en_negatif
     
     color = COLOR_ERROR if en_negatif else COLOR_SUCCESS
     emoji = EMOJI_ARROW_DOWN if en_negatif else EMOJI_ARROW_UP
     
     embed = discord.Embed(
-        title=f"{EMOJI_BANK} Solde du compte {account['numero_compte']}",
+        title=f"{EMOJI_BANK} Solde du compte {account.numero_compte}",
         color=color,
         timestamp=datetime.utcnow()
     )
@@ -143,7 +164,7 @@ def create_balance_embed(account: Dict) -> discord.Embed:
     
     embed.add_field(
         name="Type de compte",
-        value=account['type_compte'].capitalize(),
+        value=account.type_compte.capitalize(),
         inline=True
     )
     
@@ -158,10 +179,11 @@ def create_balance_embed(account: Dict) -> discord.Embed:
 
 
 def create_operations_embed(
-    operations: List[Dict],
+    operations: List[Operation],
     compte_numero: str,
     page: int = 1,
-    total: Optional[int] = None
+    total: Optional[int] = None,
+    page_count: Optional[int] = None
 ) -> discord.Embed:
     """Crée un embed pour afficher les opérations"""
     embed = discord.Embed(
@@ -175,32 +197,29 @@ def create_operations_embed(
         return embed
     
     for op in operations[:10]:  # Limiter à 10 opérations
-        emoji = get_operation_emoji(op['type_operation'])
-        montant = op['montant']
+        title = OPERATION_TITLES.get(op.type_operation)
+        if title is None:
+            title = f"{EMOJI_MONEY} {op.type_operation.capitalize()}"
         
         # Formater le montant avec signe
-        if op['type_operation'] in ['credit', 'depot']:
-            montant_str = f"+{format_currency(montant)}"
-        else:
-            montant_str = f"-{format_currency(montant)}"
-        
-        field_name = f"{emoji} {op['type_operation'].capitalize()} - {montant_str}"
+        sign = '+' if op.type_operation in CREDIT_TYPES else '-'
+        field_name = f"{title} - {sign}{format_currency(op.montant)}"
         
         field_value_parts = [
-            f"**Date:** {format_date(op['date_operation'])}"
+            f"**Date:** {format_date(op.date_operation)}"
         ]
         
-        if op.get('destinataire'):
-            field_value_parts.append(f"**Destinataire:** {op['destinataire']}")
+        if op.destinataire:
+            field_value_parts.append(f"**Destinataire:** {op.destinataire}")
         
-        if op.get('nature'):
-            field_value_parts.append(f"**Nature:** {op['nature']}")
+        if op.nature:
+            field_value_parts.append(f"**Nature:** {op.nature}")
         
-        if op.get('description'):
-            desc = op['description'][:50] + '...' if len(op['description']) > 50 else op['description']
+        if op.description:
+            desc = op.description[:50] + '...' if len(op.description) > 50 else op.description
             field_value_parts.append(f"**Description:** {desc}")
         
-        field_value_parts.append(f"**Solde après:** {format_currency(op['solde_apres'])}")
+        field_value_parts.append(f"**Solde après:** {format_currency(op.solde_apres)}")
         
         embed.add_field(
             name=field_name,
@@ -208,7 +227,7 @@ def create_operations_embed(
             inline=False
         )
     
-    footer_text = f"Page {page}"
+    footer_text = f"Page {page}/{page_count}" if page_count else f"Page {page}"
     if total:
         footer_text += f" • Total: {total} opérations"
     
@@ -216,7 +235,7 @@ def create_operations_embed(
     return embed
 
 
-def create_operation_confirmation_embed(operation: Dict, ancien_solde: float, nouveau_solde: float) -> discord.Embed:
+def create_operation_confirmation_embed(operation: Operation, ancien_solde: float, nouveau_solde: float) -> discord.Embed:
     """Crée un embed de confirmation d'opération"""
     embed = discord.Embed(
         title=f"{EMOJI_CHECK} Opération enregistrée",
@@ -224,37 +243,37 @@ def create_operation_confirmation_embed(operation: Dict, ancien_solde: float, no
         timestamp=datetime.utcnow()
     )
     
-    emoji = get_operation_emoji(operation['type_operation'])
+    emoji = get_operation_emoji(operation.type_operation)
     
     embed.add_field(
         name=f"{emoji} Type",
-        value=operation['type_operation'].capitalize(),
+        value=operation.type_operation.capitalize(),
         inline=True
     )
     
     embed.add_field(
         name=f"{EMOJI_MONEY} Montant",
-        value=format_currency(operation['montant']),
+        value=format_currency(operation.montant),
         inline=True
     )
     
     embed.add_field(
         name=f"{EMOJI_CALENDAR} Date",
-        value=format_date(operation['date_operation']),
+        value=format_date(operation.date_operation),
         inline=True
     )
     
-    if operation.get('destinataire'):
+    if operation.destinataire:
         embed.add_field(
             name="Destinataire",
-            value=operation['destinataire'],
+            value=operation.destinataire,
             inline=True
         )
     
-    if operation.get('nature'):
+    if operation.nature:
         embed.add_field(
             name="Nature",
-            value=operation['nature'],
+            value=operation.nature,
             inline=True
         )
     
@@ -270,17 +289,17 @@ def create_operation_confirmation_embed(operation: Dict, ancien_solde: float, no
         inline=True
     )
     
-    if operation.get('description'):
+    if operation.description:
         embed.add_field(
             name="Description",
-            value=operation['description'],
+            value=operation.description,
             inline=False
         )
     
     return embed
 
 
-def create_stats_embed(stats: Dict, username: str) -> discord.Embed:
+def create_stats_embed(stats: Stats, username: str) -> discord.Embed:
     """Crée un embed pour afficher les statistiques"""
     embed = discord.Embed(
         title=f"{EMOJI_CHART} Statistiques de {username}",
@@ -289,40 +308,37 @@ def create_stats_embed(stats: Dict, username: str) -> discord.Embed:
     )
     
     # Comptes
-    comptes = stats.get('comptes', {})
     embed.add_field(
         name=f"{EMOJI_BANK} Comptes",
         value=(
-            f"**Nombre:** {comptes.get('nombre', 0)}\n"
-            f"**Solde total:** {format_currency(comptes.get('solde_total', 0))}"
+            f"**Nombre:** {stats.nombre_comptes}\n"
+            f"**Solde total:** {format_currency(stats.solde_total)}"
         ),
         inline=False
     )
     
     # Opérations du mois
-    ops_mois = stats.get('operations_mois', {})
-    solde_mois = ops_mois.get('solde', 0)
+    solde_mois = stats.solde_mois
     emoji_solde = EMOJI_ARROW_UP if solde_mois >= 0 else EMOJI_ARROW_DOWN
     
     embed.add_field(
         name=f"{EMOJI_CHART} Ce mois-ci",
         value=(
-            f"**Opérations:** {ops_mois.get('nombre', 0)}\n"
-            f"**Revenus:** {EMOJI_ARROW_UP} {format_currency(ops_mois.get('revenus', 0))}\n"
-            f"**Dépenses:** {EMOJI_ARROW_DOWN} {format_currency(ops_mois.get('depenses', 0))}\n"
+            f"**Opérations:** {stats.operations_mois}\n"
+            f"**Revenus:** {EMOJI_ARROW_UP} {format_currency(stats.revenus_mois)}\n"
+            f"**Dépenses:** {EMOJI_ARROW_DOWN} {format_currency(stats.depenses_mois)}\n"
             f"**Solde:** {emoji_solde} {format_currency(solde_mois)}"
         ),
         inline=False
     )
     
     # Crédits
-    credits = stats.get('credits', {})
-    if credits.get('nombre', 0) > 0:
+    if stats.nombre_credits > 0:
         embed.add_field(
             name=f"{EMOJI_CARD} Crédits",
             value=(
-                f"**Nombre:** {credits.get('nombre', 0)}\n"
-                f"**Restant à payer:** {format_currency(credits.get('montant_restant', 0))}"
+                f"**Nombre:** {stats.nombre_credits}\n"
+                f"**Restant à payer:** {format_currency(stats.credits_restant)}"
             ),
             inline=False
         )
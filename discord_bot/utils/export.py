@@ -0,0 +1,125 @@
+"""
+Export de l'historique des opérations en CSV ou JSON Lines
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import shutil
+import tempfile
+from typing import AsyncIterator, BinaryIO, List, Tuple
+
+from utils.json_codec import dumps
+from utils.models import Operation
+from config import (
+    EXPORT_BATCH_SIZE, EXPORT_BUFFER_SIZE,
+    EXPORT_COMPRESS_THRESHOLD, EXPORT_MAX_SIZE
+)
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+class ExportTooLargeError(Exception):
+    """L'export dépasse la taille maximale d'une pièce jointe"""
+
+
+class OperationExporter:
+    """Écrit des opérations dans un fichier temporaire, par lots
+    
+    Les lots sont encodés puis écrits via un tampon de taille fixe : la
+    mémoire utilisée ne dépend pas du nombre d'opérations exportées.
+    """
+    
+    def __init__(self, export_format: str):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Format d'export invalide: {export_format}")
+        
+        self.format = export_format
+        self.count = 0
+        self.file: BinaryIO = tempfile.TemporaryFile(buffering=EXPORT_BUFFER_SIZE)
+        
+        if export_format == 'csv':
+            # BOM UTF-8 pour une ouverture correcte dans Excel
+            self.file.write('\ufeff'.encode('utf-8'))
+            self.file.write(self._encode_csv([Operation._fields]))
+    
+    @staticmethod
+    def _encode_csv(rows: List[tuple]) -> bytes:
+        """Encode des lignes CSV"""
+        text = io.StringIO()
+        writer = csv.writer(text, delimiter=';')
+        writer.writerows(rows)
+        return text.getvalue().encode('utf-8')
+    
+    def write_batch(self, operations: List[Operation]):
+        """Encode et écrit un lot d'opérations"""
+        if self.format == 'csv':
+            data = self._encode_csv(operations)
+        else:
+            data = b''.join(dumps(operation._asdict()) + b'\n' for operation in operations)
+        
+        self.file.write(data)
+        self.count += len(operations)
+    
+    def finish(self, basename: str) -> Tuple[BinaryIO, str]:
+        """Termine l'export, le compresse s'il est volumineux et retourne le fichier et son nom"""
+        self.file.flush()
+        size = self.file.tell()
+        self.file.seek(0)
+        filename = f"{basename}.{self.format}"
+        
+        if size <= EXPORT_COMPRESS_THRESHOLD:
+            return self.file, filename
+        
+        compressed = tempfile.TemporaryFile(buffering=EXPORT_BUFFER_SIZE)
+        with gzip.GzipFile(fileobj=compressed, mode='wb', filename=filename) as archive:
+            shutil.copyfileobj(self.file, archive, EXPORT_BUFFER_SIZE)
+        self.file.close()
+        
+        self.file = compressed
+        if self.file.tell() > EXPORT_MAX_SIZE:
+            self.file.close()
+            raise ExportTooLargeError(
+                f"L'export compressé dépasse {EXPORT_MAX_SIZE // (1024 * 1024)} Mo"
+            )
+        
+        self.file.seek(0)
+        return self.file, f"{filename}.gz"
+    
+    def close(self):
+        """Supprime le fichier temporaire"""
+        self.file.close()
+
+
+async def export_operations(
+    operations: AsyncIterator[Operation],
+    export_format: str,
+    basename: str
+) -> Tuple[BinaryIO, str, int]:
+    """Exporte un flux d'opérations et retourne le fichier, son nom et le nombre d'opérations
+    
+    L'encodage, l'écriture et la compression sont exécutés hors de la
+    boucle d'événements pour ne pas bloquer le bot.
+    """
+    loop = asyncio.get_running_loop()
+    exporter = await loop.run_in_executor(None, OperationExporter, export_format)
+    
+    try:
+        batch: List[Operation] = []
+        
+        async for operation in operations:
+            batch.append(operation)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                await loop.run_in_executor(None, exporter.write_batch, batch)
+                batch = []
+        
+        if batch:
+            await loop.run_in_executor(None, exporter.write_batch, batch)
+        
+        fp, filename = await loop.run_in_executor(None, exporter.finish, basename)
+    except BaseException:
+        exporter.close()
+        raise
+    
+    return fp, filename, exporter.count
@@ -0,0 +1,34 @@
+"""
+Encodage et décodage JSON, avec orjson si disponible
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+
+if orjson is not None:
+    JSON_BACKEND = 'orjson'
+    
+    def dumps(obj: Any) -> bytes:
+        """Encode un objet en JSON (UTF-8)"""
+        return orjson.dumps(obj)
+    
+    def loads(data: Any) -> Any:
+        """Décode un document JSON (bytes ou str)"""
+        return orjson.loads(data)
+
+else:
+    JSON_BACKEND = 'json'
+    
+    def dumps(obj: Any) -> bytes:
+        """Encode un objet en JSON (UTF-8)"""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    def loads(data: Any) -> Any:
+        """Décode un document JSON (bytes ou str)"""
+        return json.loads(data)
@@ -0,0 +1,167 @@
+"""
+Journalisation non bloquante : file d'attente, rotation, format JSON et limitation des rafales
+
+Les appels de logging ne font que déposer l'enregistrement dans une file ;
+un thread d'écoute (QueueListener) écrit sur la console et dans le fichier,
+qui tourne selon sa taille ou l'heure. Au-delà de LOG_RATE_LIMIT_BURST
+avertissements ou erreurs émis au même endroit du code dans une fenêtre,
+seul un enregistrement sur LOG_SAMPLE_EVERY est conservé, afin qu'une panne
+de l'API ne produise pas une avalanche de lignes identiques.
+"""
+
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Tuple
+
+from config import (
+    LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN,
+    LOG_RATE_LIMIT_BURST, LOG_RATE_LIMIT_WINDOW, LOG_SAMPLE_EVERY
+)
+from utils.json_codec import dumps
+from utils.metrics import LOG_RECORDS_SUPPRESSED
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributs standards d'un LogRecord : les autres viennent de extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formate chaque enregistrement en une ligne JSON"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value if isinstance(value, (str, int, float, bool, list, dict, type(None))) else str(value)
+        
+        return dumps(entry).decode('utf-8')
+
+
+class RateLimitFilter(logging.Filter):
+    """Limite les avertissements et erreurs répétés depuis une même ligne de code"""
+    
+    def __init__(
+        self,
+        burst: int = LOG_RATE_LIMIT_BURST,
+        window: float = LOG_RATE_LIMIT_WINDOW,
+        sample_every: int = LOG_SAMPLE_EVERY
+    ):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_every = sample_every
+        # (fichier, ligne, niveau) -> [début de la fenêtre, émis, ignorés]
+        self._sites: Dict[Tuple[str, int, int], list] = {}
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        
+        key = (record.pathname, record.lineno, record.levelno)
+        now = time.monotonic()
+        
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                if len(self._sites) >= 10000:
+                    self._sites.clear()
+                suppressed = site[2] if site else 0
+                site = self._sites[key] = [now, 0, 0]
+            else:
+                suppressed = 0
+            
+            site[1] += 1
+            if site[1] > self.burst and (site[1] - self.burst) % self.sample_every:
+                site[2] += 1
+                LOG_RECORDS_SUPPRESSED.labels(record.levelname).inc()
+                return False
+        
+        if suppressed:
+            # Signaler les messages ignorés pendant la fenêtre précédente
+            record.msg = f"{record.getMessage()} ({suppressed} message(s) similaire(s) ignoré(s))"
+            record.args = None
+        elif site[1] > self.burst:
+            record.msg = f"{record.getMessage()} (échantillon : 1 message sur {self.sample_every})"
+            record.args = None
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler conservant la trace d'exception à part du message"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Le formatage final est fait par les handlers du thread d'écoute
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _file_handler(log_file: str) -> logging.Handler:
+    """Handler du fichier de logs, avec rotation à l'heure (LOG_ROTATE_WHEN) ou à la taille"""
+    if LOG_ROTATE_WHEN:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True
+        )
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def process_log_file(name: str, log_file: str = LOG_FILE) -> str:
+    """Fichier de logs propre à un processus du cluster (bot.log -> bot.worker0.log)
+    
+    Plusieurs processus ne peuvent pas faire tourner le même fichier.
+    """
+    base, dot, extension = log_file.rpartition('.')
+    return f"{base}.{name}.{extension}" if dot and base else f"{log_file}.{name}"
+
+
+def setup_logging(log_file: str = LOG_FILE) -> logging.handlers.QueueListener:
+    """Configure le logger racine et démarre le thread d'écoute, arrêté à la sortie du programme"""
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+    
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    
+    listener = logging.handlers.QueueListener(log_queue, _file_handler(log_file), console, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,466 @@
+"""
+Métriques du bot au format texte Prometheus, exposées par un serveur HTTP local
+
+Les compteurs, jauges et histogrammes sont des objets de module, mis à
+jour par le code instrumenté. Les valeurs déjà tenues ailleurs (caches,
+latence de la gateway) sont lues au moment de la collecte par des
+fonctions enregistrées avec REGISTRY.register_collector().
+"""
+
+import asyncio
+import inspect
+import logging
+import math
+import os
+import re
+import sys
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # aiohttp.web n'est importé qu'au démarrage du serveur
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Limites des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Échantillon collecté : nom, étiquettes, valeur
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    """Formate une valeur selon le format texte Prometheus"""
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+def _escape_label_value(value: Any) -> str:
+    """Échappe la valeur d'une étiquette"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Formate les étiquettes d'un échantillon"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+@lru_cache(maxsize=1024)
+def endpoint_label(endpoint: str) -> str:
+    """Normalise un endpoint pour limiter le nombre de séries (/accounts/12 -> /accounts/{id})"""
+    return re.sub(r'/\d+', '/{id}', endpoint)
+
+
+class _Metric(ABC):
+    """Base des métriques : nom, description et séries par valeurs d'étiquettes"""
+    
+    type_name = ''
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+    
+    def labels(self, *values: Any):
+        """Retourne la série correspondant aux valeurs d'étiquettes"""
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: {len(self.labelnames)} étiquette(s) attendue(s)")
+        
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+    
+    @abstractmethod
+    def _new_child(self):
+        """Crée une série"""
+    
+    def _default(self):
+        """Série sans étiquette"""
+        return self.labels()
+    
+    def samples(self) -> Iterable[Sample]:
+        """Retourne les échantillons de toutes les séries"""
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            for suffix, extra, value in child.samples():
+                yield self.name + suffix, {**labels, **extra}, value
+
+
+class _CounterChild:
+    """Série d'un compteur"""
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1):
+        """Incrémente le compteur"""
+        self.value += amount
+    
+    def samples(self):
+        """Retourne la valeur du compteur"""
+        return [('', {}, self.value)]
+
+
+class Counter(_Metric):
+    """Compteur croissant"""
+    
+    type_name = 'counter'
+    
+    def _new_child(self):
+        """Crée une série"""
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1):
+        """Incrémente la série sans étiquette"""
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    """Série d'une jauge"""
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def set(self, value: float):
+        """Fixe la valeur"""
+        self.value = value
+    
+    def inc(self, amount: float = 1):
+        """Augmente la valeur"""
+        self.value += amount
+    
+    def dec(self, amount: float = 1):
+        """Diminue la valeur"""
+        self.value -= amount
+    
+    def samples(self):
+        """Retourne la valeur de la jauge"""
+        return [('', {}, self.value)]
+
+
+class Gauge(_Metric):
+    """Valeur instantanée"""
+    
+    type_name = 'gauge'
+    
+    def _new_child(self):
+        """Crée une série"""
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        """Fixe la série sans étiquette"""
+        self._default().set(value)
+    
+    def inc(self, amount: float = 1):
+        """Incrémente la série sans étiquette"""
+        self._default().inc(amount)
+    
+    def dec(self, amount: float = 1):
+        """Décrémente la série sans étiquette"""
+        self._default().dec(amount)
+
+
+class _HistogramChild:
+    """Série d'un histogramme : effectif par seuil et somme des valeurs"""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        """Enregistre une valeur"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+    
+    def samples(self):
+        """Retourne les effectifs cumulés, la somme et le nombre d'observations"""
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            samples.append(('_bucket', {'le': _format_value(bound)}, cumulative))
+        samples.append(('_sum', {}, self.sum))
+        samples.append(('_count', {}, cumulative))
+        return samples
+
+
+class Histogram(_Metric):
+    """Répartition de valeurs observées (latences) par seuils"""
+    
+    type_name = 'histogram'
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self):
+        """Crée une série"""
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        """Enregistre une valeur dans la série sans étiquette"""
+        self._default().observe(value)
+
+
+class Registry:
+    """Ensemble des métriques exposées"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+    
+    def register(self, metric: _Metric) -> _Metric:
+        """Ajoute une métrique au registre"""
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def register_collector(self, collector: Callable):
+        """Ajoute une fonction appelée à chaque collecte
+        
+        Elle retourne des tuples (nom, type, description, [(étiquettes, valeur)]).
+        """
+        self._collectors.append(collector)
+    
+    def unregister_collector(self, collector: Callable):
+        """Retire une fonction de collecte"""
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+    
+    def render(self) -> str:
+        """Retourne toutes les métriques au format texte Prometheus"""
+        lines = []
+        
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        
+        for collector in list(self._collectors):
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.error(f"Erreur lors de la collecte des métriques: {e}")
+                continue
+            
+            for name, type_name, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Commandes slash
+COMMAND_DURATION = REGISTRY.register(Histogram(
+    'bankbot_command_duration_seconds',
+    "Durée d'exécution des commandes slash",
+    ['command']
+))
+COMMANDS_TOTAL = REGISTRY.register(Counter(
+    'bankbot_commands_total',
+    "Commandes slash exécutées, par résultat",
+    ['command', 'status']
+))
+COMMANDS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'bankbot_commands_in_flight',
+    "Commandes slash en cours d'exécution"
+))
+
+# Client API
+API_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'bankbot_api_request_duration_seconds',
+    "Durée des appels au client API, cache et nouvelles tentatives compris",
+    ['method', 'endpoint']
+))
+API_REQUESTS_TOTAL = REGISTRY.register(Counter(
+    'bankbot_api_requests_total',
+    "Appels au client API, par code de réponse (cached : servi par le cache)",
+    ['method', 'endpoint', 'status']
+))
+API_HTTP_DURATION = REGISTRY.register(Histogram(
+    'bankbot_api_http_duration_seconds',
+    "Durée des requêtes HTTP envoyées à l'API",
+    ['method', 'endpoint']
+))
+API_HTTP_RESPONSES_TOTAL = REGISTRY.register(Counter(
+    'bankbot_api_http_responses_total',
+    "Requêtes HTTP envoyées à l'API, par code de réponse",
+    ['method', 'endpoint', 'status']
+))
+API_HTTP_PHASE_DURATION = REGISTRY.register(Histogram(
+    'bankbot_api_http_phase_duration_seconds',
+    "Durée des phases des requêtes HTTP (pool, DNS, connexion, envoi, attente, lecture, décodage)",
+    ['endpoint', 'phase']
+))
+API_HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'bankbot_api_http_in_flight',
+    "Requêtes HTTP vers l'API en cours"
+))
+
+# Gateway Discord
+GATEWAY_EVENTS_TOTAL = REGISTRY.register(Counter(
+    'bankbot_gateway_events_total',
+    "Événements reçus de la gateway Discord, par type",
+    ['event']
+))
+
+# Démarrage
+STARTUP_PHASE_DURATION = REGISTRY.register(Gauge(
+    'bankbot_startup_phase_seconds',
+    "Durée des phases du dernier démarrage (import, login, cogs, sync, gateway, ready)",
+    ['phase']
+))
+
+# Journalisation
+LOG_RECORDS_SUPPRESSED = REGISTRY.register(Counter(
+    'bankbot_log_records_suppressed_total',
+    "Enregistrements de log ignorés par la limitation des rafales",
+    ['level']
+))
+
+# Boucle d'événements
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    'bankbot_event_loop_lag_seconds',
+    "Retard de la boucle d'événements sur un réveil programmé",
+    buckets=LOOP_LAG_BUCKETS
+))
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Mémoire résidente du processus (RSS), ou None si elle n'est pas mesurable"""
+    try:
+        with open('/proc/self/statm', 'r') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Pic de mémoire à défaut de la valeur courante (Ko sous Linux, octets sous macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+async def monitor_event_loop(interval: float):
+    """Mesure en continu le retard de la boucle d'événements"""
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+def merge_expositions(expositions: Dict[str, str], label: str) -> str:
+    """Fusionne les métriques texte de plusieurs processus
+    
+    Chaque échantillon reçoit l'étiquette `label` valant la clé de son
+    processus ; les échantillons d'une même métrique sont regroupés sous
+    un seul en-tête HELP/TYPE, comme l'exige le format.
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    
+    for source, text in expositions.items():
+        extra = f'{label}="{_escape_label_value(source)}"'
+        family = None
+        
+        for line in text.splitlines():
+            if not line:
+                continue
+            
+            if line.startswith('#'):
+                parts = line.split(' ', 3)
+                if len(parts) >= 3 and parts[1] in ('HELP', 'TYPE'):
+                    family = parts[2]
+                    header = headers.setdefault(family, [])
+                    if len(header) < 2 and not any(existing.startswith(f"# {parts[1]} ") for existing in header):
+                        header.append(line)
+                    samples.setdefault(family, [])
+                continue
+            
+            brace = line.find('{')
+            space = line.find(' ')
+            if 0 <= brace < space:
+                closing = '' if line[brace + 1] == '}' else ','
+                line = f"{line[:brace + 1]}{extra}{closing}{line[brace + 1:]}"
+            else:
+                line = f"{line[:space]}{{{extra}}}{line[space:]}"
+            samples.setdefault(family or line[:space], []).append(line)
+    
+    lines = []
+    for family, family_samples in samples.items():
+        lines.extend(headers.get(family, []))
+        lines.extend(family_samples)
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+class MetricsServer:
+    """Serveur HTTP local exposant /metrics"""
+    
+    def __init__(self, host: str, port: int, registry: Any = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._runner: Optional['web.AppRunner'] = None
+    
+    async def _handle_metrics(self, request: 'web.Request') -> 'web.Response':
+        """GET /metrics"""
+        from aiohttp import web
+        
+        body = self.registry.render()
+        if inspect.isawaitable(body):
+            # Registre agrégé du cluster, qui interroge les workers
+            body = await body
+        
+        return web.Response(
+            body=body.encode('utf-8'),
+            headers={'Content-Type': CONTENT_TYPE}
+        )
+    
+    async def start(self):
+        """Démarre le serveur"""
+        from aiohttp import web
+        
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Métriques exposées sur http://{self.host}:{self.port}/metrics")
+    
+    async def stop(self):
+        """Arrête le serveur"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
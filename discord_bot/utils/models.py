@@ -0,0 +1,181 @@
+"""
+Structures typées pour les réponses de l'API
+
+Les réponses sont décodées une seule fois dans le client API. L'API (PDO)
+renvoie les colonnes DECIMAL sous forme de chaînes : les montants sont
+convertis ici plutôt qu'à chaque affichage.
+"""
+
+from typing import NamedTuple, Optional, List, Dict, Any
+
+
+def to_float(value: Any, default: float = 0.0) -> float:
+    """Convertit une valeur de l'API en float"""
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def to_int(value: Any, default: int = 0) -> int:
+    """Convertit une valeur de l'API en int"""
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class Account(NamedTuple):
+    """Compte bancaire"""
+    id: int
+    numero_compte: str
+    type_compte: str
+    solde: float
+    negatif_autorise: float
+    relation: str = 'proprietaire'
+    disponible: Optional[float] = None
+    en_negatif: bool = False
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'Account':
+        """Construit un compte depuis une réponse de l'API"""
+        solde = to_float(data.get('solde'))
+        negatif_autorise = to_float(data.get('negatif_autorise'))
+        disponible = data.get('disponible')
+        return cls(
+            id=to_int(data.get('id')),
+            numero_compte=str(data.get('numero_compte', data.get('id', ''))),
+            type_compte=data.get('type_compte') or '',
+            solde=solde,
+            negatif_autorise=negatif_autorise,
+            relation=data.get('relation') or 'proprietaire',
+            disponible=to_float(disponible) if disponible is not None else solde + negatif_autorise,
+            en_negatif=bool(data.get('en_negatif', solde < 0))
+        )
+
+
+class AccountsSummary(NamedTuple):
+    """Liste des comptes de l'utilisateur et solde total"""
+    comptes: List[Account]
+    solde_total: float
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'AccountsSummary':
+        """Construit la liste des comptes depuis une réponse de l'API"""
+        return cls(
+            comptes=[Account.from_api(compte) for compte in data.get('comptes') or []],
+            solde_total=to_float(data.get('solde_total'))
+        )
+
+
+class Operation(NamedTuple):
+    """Opération bancaire"""
+    id: int
+    type_operation: str
+    montant: float
+    date_operation: str
+    solde_apres: float
+    destinataire: Optional[str] = None
+    nature: Optional[str] = None
+    description: Optional[str] = None
+    compte_id: Optional[int] = None
+    numero_compte: Optional[str] = None
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'Operation':
+        """Construit une opération depuis une réponse de l'API"""
+        compte_id = data.get('compte_id')
+        return cls(
+            id=to_int(data.get('id')),
+            type_operation=data.get('type_operation') or '',
+            montant=to_float(data.get('montant')),
+            date_operation=data.get('date_operation') or '',
+            solde_apres=to_float(data.get('solde_apres')),
+            destinataire=data.get('destinataire') or None,
+            nature=data.get('nature') or None,
+            description=data.get('description') or None,
+            compte_id=to_int(compte_id) if compte_id is not None else None,
+            numero_compte=data.get('numero_compte')
+        )
+
+
+class OperationsPage(NamedTuple):
+    """Page d'opérations d'un compte"""
+    operations: List[Operation]
+    total: int
+    limit: int
+    offset: int
+    has_more: bool
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'OperationsPage':
+        """Construit une page d'opérations depuis une réponse de l'API"""
+        operations = [Operation.from_api(op) for op in data.get('operations') or []]
+        pagination = data.get('pagination') or {}
+        return cls(
+            operations=operations,
+            total=to_int(pagination.get('total'), len(operations)),
+            limit=to_int(pagination.get('limit'), len(operations)),
+            offset=to_int(pagination.get('offset')),
+            has_more=bool(pagination.get('has_more', False))
+        )
+
+
+class Profile(NamedTuple):
+    """Profil de l'utilisateur"""
+    id: int
+    username: str
+    email: str
+    nom: str
+    prenom: str
+    role: str
+    
+    @property
+    def full_name(self) -> str:
+        """Prénom et nom de l'utilisateur"""
+        return f"{self.prenom} {self.nom}"
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'Profile':
+        """Construit un profil depuis une réponse de l'API"""
+        return cls(
+            id=to_int(data.get('id')),
+            username=data.get('username') or '',
+            email=data.get('email') or '',
+            nom=data.get('nom') or '',
+            prenom=data.get('prenom') or '',
+            role=data.get('role') or ''
+        )
+
+
+class Stats(NamedTuple):
+    """Statistiques bancaires de l'utilisateur"""
+    nombre_comptes: int
+    solde_total: float
+    operations_mois: int
+    revenus_mois: float
+    depenses_mois: float
+    solde_mois: float
+    nombre_credits: int
+    credits_restant: float
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'Stats':
+        """Construit les statistiques depuis une réponse de l'API"""
+        comptes = data.get('comptes') or {}
+        ops_mois = data.get('operations_mois') or {}
+        credits = data.get('credits') or {}
+        return cls(
+            nombre_comptes=to_int(comptes.get('nombre')),
+            solde_total=to_float(comptes.get('solde_total')),
+            operations_mois=to_int(ops_mois.get('nombre')),
+            revenus_mois=to_float(ops_mois.get('revenus')),
+            depenses_mois=to_float(ops_mois.get('depenses')),
+            solde_mois=to_float(ops_mois.get('solde')),
+            nombre_credits=to_int(credits.get('nombre')),
+            credits_restant=to_float(credits.get('montant_restant'))
+        )
@@ -0,0 +1,195 @@
+"""
+Import d'opérations depuis un fichier CSV
+
+Toutes les lignes sont validées avant l'envoi, avec les mêmes règles que la
+commande /operation. Les opérations sont ensuite créées en parallèle d'un
+compte à l'autre (IMPORT_CONCURRENCY comptes à la fois), mais dans l'ordre
+du fichier pour un même compte, afin que les soldes évoluent comme prévu.
+"""
+
+import asyncio
+import csv
+import io
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from utils.models import to_float
+from utils.validators import (
+    validate_amount, validate_operation_type, validate_string_length, sanitize_input,
+    OPERATION_TYPE_DISPLAY_NAMES
+)
+from config import IMPORT_MAX_ROWS, IMPORT_CONCURRENCY
+
+REQUIRED_COLUMNS = ('compte_id', 'type_operation', 'montant')
+OPTIONAL_COLUMNS = {'destinataire': 255, 'nature': 100, 'description': 1000}
+# Libellés affichés acceptés comme types (« Dépôt » -> depot)
+TYPE_ALIASES = {name.lower(): operation_type for operation_type, name in OPERATION_TYPE_DISPLAY_NAMES.items()}
+
+
+class OperationImportError(Exception):
+    """Fichier d'import inutilisable (encodage, colonnes, nombre de lignes)"""
+
+
+class ImportRow(NamedTuple):
+    """Opération à importer"""
+    line: int
+    compte_id: int
+    type_operation: str
+    montant: float
+    destinataire: Optional[str]
+    nature: Optional[str]
+    description: Optional[str]
+
+
+class ImportResult(NamedTuple):
+    """Résultat de l'envoi d'une ligne"""
+    row: ImportRow
+    success: bool
+    nouveau_solde: Optional[float]
+    error: Optional[str]
+
+
+def _decode(data: bytes) -> str:
+    """Décode le fichier : UTF-8 (avec ou sans BOM), sinon Windows-1252 (Excel)"""
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('cp1252', errors='replace')
+
+
+def _parse_amount(value: str) -> float:
+    """Lit un montant (« 12.50 », « 12,50 », « 1 200,00 € »)"""
+    value = value.replace('€', '').replace('\u00a0', '').replace('\u202f', '').replace(' ', '')
+    if ',' in value and '.' not in value:
+        value = value.replace(',', '.')
+    return float(value)
+
+
+def parse_operations_csv(
+    data: bytes,
+    account_ids: Optional[Iterable[int]] = None
+) -> Tuple[List[ImportRow], List[Tuple[int, str]]]:
+    """Lit et valide un fichier CSV d'opérations
+    
+    Retourne les lignes valides et les erreurs (numéro de ligne, message).
+    Si `account_ids` est fourni, les comptes qui n'en font pas partie sont refusés.
+    """
+    text = _decode(data)
+    if not text.strip():
+        raise OperationImportError("Le fichier est vide")
+    
+    first_line = text.split('\n', 1)[0]
+    delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    
+    columns = {(name or '').strip().lower(): name for name in reader.fieldnames or ()}
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise OperationImportError(f"Colonne(s) manquante(s): {', '.join(missing)}")
+    
+    allowed = set(account_ids) if account_ids is not None else None
+    rows: List[ImportRow] = []
+    errors: List[Tuple[int, str]] = []
+    
+    for record in reader:
+        line = reader.line_num
+        values = {column: (record.get(name) or '').strip() for column, name in columns.items()}
+        if not any(values.values()):
+            continue
+        
+        if len(rows) + len(errors) >= IMPORT_MAX_ROWS:
+            raise OperationImportError(f"Le fichier dépasse {IMPORT_MAX_ROWS} opérations")
+        
+        try:
+            compte_id = int(values['compte_id'])
+        except ValueError:
+            errors.append((line, f"ID de compte invalide: {values['compte_id'][:30] or '(vide)'}"))
+            continue
+        if allowed is not None and compte_id not in allowed:
+            errors.append((line, f"Compte {compte_id} introuvable parmi vos comptes"))
+            continue
+        
+        type_operation = values['type_operation'].lower()
+        type_operation = TYPE_ALIASES.get(type_operation, type_operation)
+        valid, error = validate_operation_type(type_operation)
+        if not valid:
+            errors.append((line, error))
+            continue
+        
+        try:
+            montant = _parse_amount(values['montant'])
+        except ValueError:
+            errors.append((line, f"Montant invalide: {values['montant'][:30] or '(vide)'}"))
+            continue
+        valid, error = validate_amount(montant)
+        if not valid:
+            errors.append((line, error))
+            continue
+        
+        optional: Dict[str, Optional[str]] = {}
+        for column, max_length in OPTIONAL_COLUMNS.items():
+            value = sanitize_input(values.get(column, ''))
+            valid, error = validate_string_length(value, max_length=max_length, field_name=column.capitalize())
+            if not valid:
+                errors.append((line, error))
+                break
+            optional[column] = value or None
+        else:
+            rows.append(ImportRow(line, compte_id, type_operation, montant, **optional))
+    
+    if not rows and not errors:
+        raise OperationImportError("Le fichier ne contient aucune opération")
+    
+    return rows, errors
+
+
+async def submit_operations(
+    api_client,
+    token: str,
+    rows: List[ImportRow],
+    concurrency: int = IMPORT_CONCURRENCY
+) -> List[ImportResult]:
+    """Crée les opérations et retourne leur résultat, dans l'ordre du fichier"""
+    by_account: Dict[int, List[ImportRow]] = {}
+    for row in rows:
+        by_account.setdefault(row.compte_id, []).append(row)
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    results: Dict[int, ImportResult] = {}
+    
+    async def submit_account(account_rows: List[ImportRow]):
+        async with semaphore:
+            for row in account_rows:
+                try:
+                    response = await api_client.create_operation(
+                        token, row.compte_id, row.type_operation, row.montant,
+                        row.destinataire, row.nature, row.description
+                    )
+                except Exception as e:
+                    response = {'success': False, 'error': f"Erreur inattendue: {e}"}
+                
+                if response.get('success'):
+                    data = response.get('data') or {}
+                    nouveau_solde = to_float(data.get('nouveau_solde'), None) if 'nouveau_solde' in data else None
+                    results[row.line] = ImportResult(row, True, nouveau_solde, None)
+                else:
+                    results[row.line] = ImportResult(row, False, None, response.get('error', 'Erreur inconnue'))
+    
+    await asyncio.gather(*(submit_account(account_rows) for account_rows in by_account.values()))
+    return [results[row.line] for row in rows]
+
+
+def build_report_csv(results: List[ImportResult]) -> bytes:
+    """Rapport CSV du résultat de chaque ligne"""
+    text = io.StringIO()
+    writer = csv.writer(text, delimiter=';')
+    writer.writerow(('ligne', 'compte_id', 'type_operation', 'montant', 'statut', 'nouveau_solde', 'erreur'))
+    for result in results:
+        row = result.row
+        writer.writerow((
+            row.line, row.compte_id, row.type_operation, f"{row.montant:.2f}",
+            'ok' if result.success else 'erreur',
+            f"{result.nouveau_solde:.2f}" if result.nouveau_solde is not None else '',
+            result.error or ''
+        ))
+    # BOM UTF-8 pour une ouverture correcte dans Excel
+    return '\ufeff'.encode('utf-8') + text.getvalue().encode('utf-8')
@@ -0,0 +1,403 @@
+"""
+Index local (SQLite FTS5) des opérations déjà récupérées, par utilisateur
+
+L'index est alimenté depuis l'API avec BankAPIClient.iter_operations : un
+premier parcours complet en arrière-plan, puis des synchronisations
+incrémentales qui s'arrêtent aux opérations antérieures à la date de la
+plus récente opération déjà indexée.
+Tant qu'un compte n'est pas entièrement indexé, la recherche passe par l'API.
+
+Comme l'API (LIKE sur une collation insensible à la casse et aux accents),
+la nature et le destinataire sont cherchés comme sous-chaînes : ils sont
+indexés par trigrammes, sans casse ni accents.
+"""
+
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import weakref
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+
+from utils.api_client import BankAPIClient, BankAPIError
+from utils.cache import token_principal
+from utils.models import Operation
+from config import OPERATION_INDEX_SYNC_INTERVAL, OPERATION_INDEX_SYNC_PAGE_SIZE, OPERATION_INDEX_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    principal TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    compte_id INTEGER NOT NULL,
+    type_operation TEXT NOT NULL,
+    montant REAL NOT NULL,
+    date_operation TEXT NOT NULL,
+    solde_apres REAL NOT NULL,
+    destinataire TEXT,
+    nature TEXT,
+    description TEXT,
+    numero_compte TEXT,
+    UNIQUE (principal, id)
+);
+CREATE INDEX IF NOT EXISTS idx_operations_compte
+    ON operations (principal, compte_id, date_operation);
+CREATE VIRTUAL TABLE IF NOT EXISTS operations_fts USING fts5(
+    nature, destinataire,
+    tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS operations_ai AFTER INSERT ON operations BEGIN
+    INSERT INTO operations_fts (rowid, nature, destinataire)
+    VALUES (new.rowid, fold(new.nature), fold(new.destinataire));
+END;
+CREATE TRIGGER IF NOT EXISTS operations_au AFTER UPDATE OF nature, destinataire ON operations BEGIN
+    UPDATE operations_fts SET nature = fold(new.nature), destinataire = fold(new.destinataire)
+    WHERE rowid = new.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS operations_ad AFTER DELETE ON operations BEGIN
+    DELETE FROM operations_fts WHERE rowid = old.rowid;
+END;
+CREATE TABLE IF NOT EXISTS sync_state (
+    principal TEXT NOT NULL,
+    compte_id INTEGER NOT NULL,
+    newest_id INTEGER NOT NULL DEFAULT 0,
+    newest_date TEXT NOT NULL DEFAULT '',
+    complete INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (principal, compte_id)
+);
+"""
+
+# Codes d'erreur de l'API indiquant que l'utilisateur n'a plus accès au compte
+ACCESS_LOST_CODES = (403, 404)
+
+COLUMNS = (
+    'id', 'type_operation', 'montant', 'date_operation', 'solde_apres',
+    'destinataire', 'nature', 'description', 'compte_id', 'numero_compte'
+)
+
+
+def fold(value: Optional[str]) -> str:
+    """Retire la casse et les accents d'un texte (« Électricité » -> « electricite »)"""
+    if not value:
+        return ''
+    if value.isascii():
+        return value.lower()
+    decomposed = unicodedata.normalize('NFKD', value.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def substring_pattern(value: str) -> str:
+    """Motif GLOB trouvant `value` n'importe où dans le texte"""
+    return '*' + re.sub(r'([*?\[])', r'[\1]', value) + '*'
+
+
+class OperationIndex:
+    """Index local des opérations, interrogé sans appel à l'API"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        # sqlite3 n'est pas asynchrone : les accès passent par un thread, un à la fois
+        self._db_lock = threading.Lock()
+        # Verrous des synchronisations en cours, libérés avec leur dernier utilisateur
+        self._sync_locks: 'weakref.WeakValueDictionary[Tuple[str, int], asyncio.Lock]' = weakref.WeakValueDictionary()
+        self._full_syncs: Dict[Tuple[str, int], asyncio.Task] = {}
+        self.local_searches = 0
+        self.api_fallbacks = 0
+    
+    async def _run(self, func, *args):
+        """Exécute une fonction d'accès à la base hors de la boucle d'événements"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._locked, func, *args)
+    
+    def _locked(self, func, *args):
+        """Exécute une fonction avec le verrou de la connexion"""
+        with self._db_lock:
+            return func(*args)
+    
+    def _open(self):
+        """Ouvre la base et crée le schéma"""
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # Utilisée par les déclencheurs qui alimentent operations_fts
+        self._conn.create_function('fold', 1, fold, deterministic=True)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+    
+    async def open(self):
+        """Ouvre l'index"""
+        await self._run(self._open)
+        logger.info(f"Index local des opérations ouvert: {self.path}")
+    
+    async def close(self):
+        """Arrête les synchronisations en cours et ferme l'index"""
+        for task in self._full_syncs.values():
+            task.cancel()
+        self._full_syncs.clear()
+        
+        if self._conn:
+            await self._run(self._conn.close)
+            self._conn = None
+    
+    # Accès à la base (exécutés dans un thread)
+    
+    def _get_state(self, principal: str, compte_id: int) -> Optional[Tuple[str, bool, float]]:
+        """Retourne l'état de synchronisation d'un compte (date la plus récente, complet, date de synchronisation)"""
+        row = self._conn.execute(
+            "SELECT newest_date, complete, synced_at FROM sync_state WHERE principal = ? AND compte_id = ?",
+            (principal, compte_id)
+        ).fetchone()
+        return (row[0], bool(row[1]), row[2]) if row else None
+    
+    def _insert(self, principal: str, compte_id: int, operations: Iterable[Operation]):
+        """Ajoute ou met à jour des opérations"""
+        # Pas de INSERT OR REPLACE : la suppression implicite ne déclenche pas operations_ad
+        self._conn.executemany(
+            """
+            INSERT INTO operations (
+                principal, id, compte_id, type_operation, montant, date_operation,
+                solde_apres, destinataire, nature, description, numero_compte
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (principal, id) DO UPDATE SET
+                compte_id = excluded.compte_id,
+                type_operation = excluded.type_operation,
+                montant = excluded.montant,
+                date_operation = excluded.date_operation,
+                solde_apres = excluded.solde_apres,
+                destinataire = excluded.destinataire,
+                nature = excluded.nature,
+                description = excluded.description,
+                numero_compte = excluded.numero_compte
+            """,
+            [
+                (
+                    principal, op.id, compte_id, op.type_operation, op.montant,
+                    op.date_operation, op.solde_apres, op.destinataire, op.nature,
+                    op.description, op.numero_compte
+                )
+                for op in operations
+            ]
+        )
+        self._conn.commit()
+    
+    def _set_state(self, principal: str, compte_id: int, newest_id: int, newest_date: str, complete: bool):
+        """Enregistre l'état de synchronisation d'un compte"""
+        self._conn.execute(
+            """
+            INSERT INTO sync_state (principal, compte_id, newest_id, newest_date, complete, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (principal, compte_id) DO UPDATE SET
+                newest_id = MAX(newest_id, excluded.newest_id),
+                newest_date = MAX(newest_date, excluded.newest_date),
+                complete = MAX(complete, excluded.complete),
+                synced_at = excluded.synced_at
+            """,
+            (principal, compte_id, newest_id, newest_date, int(complete), time.time())
+        )
+        self._conn.commit()
+    
+    def _mark_stale(self, principal: str, compte_id: int):
+        """Force la synchronisation d'un compte à la prochaine recherche"""
+        self._conn.execute(
+            "UPDATE sync_state SET synced_at = 0 WHERE principal = ? AND compte_id = ?",
+            (principal, compte_id)
+        )
+        self._conn.commit()
+    
+    def _purge(self, principal: str, compte_id: Optional[int]):
+        """Supprime les opérations indexées d'un utilisateur ou d'un de ses comptes"""
+        condition = "principal = ?"
+        params: Tuple = (principal,)
+        if compte_id is not None:
+            condition += " AND compte_id = ?"
+            params = (principal, compte_id)
+        
+        self._conn.execute(f"DELETE FROM operations WHERE {condition}", params)
+        self._conn.execute(f"DELETE FROM sync_state WHERE {condition}", params)
+        self._conn.commit()
+    
+    def _search(self, principal: str, compte_ids: List[int], criteria: Dict[str, Any], limit: int) -> List[Operation]:
+        """Recherche des opérations dans l'index"""
+        sql = f"SELECT {', '.join('o.' + column for column in COLUMNS)} FROM operations o"
+        conditions = ["o.principal = ?", f"o.compte_id IN ({', '.join('?' * len(compte_ids))})"]
+        params: List[Any] = [principal, *compte_ids]
+        
+        texts = [(column, fold(criteria.get(column))) for column in ('nature', 'destinataire')]
+        texts = [(column, value) for column, value in texts if value]
+        if texts:
+            # Sous-requête : l'index trigramme est parcouru une fois, pas par opération
+            matches = " AND ".join(f"{column} GLOB ?" for column, _ in texts)
+            conditions.append(f"o.rowid IN (SELECT rowid FROM operations_fts WHERE {matches})")
+            params.extend(substring_pattern(value) for _, value in texts)
+        
+        filters = (
+            ('type_operation', "o.type_operation = ?"),
+            ('montant_min', "o.montant >= ?"),
+            ('montant_max', "o.montant <= ?"),
+            ('date_debut', "o.date_operation >= ?"),
+            ('date_fin', "o.date_operation <= ?"),
+        )
+        for name, condition in filters:
+            if criteria.get(name):
+                conditions.append(condition)
+                params.append(criteria[name])
+        
+        sql += " WHERE " + " AND ".join(conditions) + " ORDER BY o.date_operation DESC, o.id DESC LIMIT ?"
+        params.append(limit)
+        
+        rows = self._conn.execute(sql, params).fetchall()
+        return [Operation(*row) for row in rows]
+    
+    # Synchronisation avec l'API
+    
+    async def _full_sync(
+        self,
+        api_client: BankAPIClient,
+        token: str,
+        principal: str,
+        compte_id: int,
+        discord_id: Optional[str]
+    ):
+        """Indexe tout l'historique d'un compte"""
+        newest_id = 0
+        newest_date = ''
+        batch: List[Operation] = []
+        
+        try:
+            async for operation in api_client.iter_operations(token, compte_id, discord_id=discord_id):
+                newest_id = max(newest_id, operation.id)
+                newest_date = max(newest_date, operation.date_operation)
+                batch.append(operation)
+                if len(batch) >= OPERATION_INDEX_BATCH_SIZE:
+                    await self._run(self._insert, principal, compte_id, batch)
+                    batch = []
+            
+            if batch:
+                await self._run(self._insert, principal, compte_id, batch)
+            
+            await self._run(self._set_state, principal, compte_id, newest_id, newest_date, True)
+            logger.info(f"Compte {compte_id} indexé pour {principal}")
+        except BankAPIError as e:
+            logger.warning(f"Indexation du compte {compte_id} interrompue: {e}")
+            if e.code in ACCESS_LOST_CODES:
+                await self._run(self._purge, principal, compte_id)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'indexation du compte {compte_id}: {e}")
+    
+    async def _incremental_sync(
+        self,
+        api_client: BankAPIClient,
+        token: str,
+        principal: str,
+        compte_id: int,
+        newest_date: str,
+        discord_id: Optional[str]
+    ) -> bool:
+        """Indexe les opérations datées au plus tôt de la dernière opération indexée
+        
+        L'API trie par date seulement : les opérations de même date arrivent
+        dans un ordre quelconque et leurs IDs ne sont pas forcément croissants.
+        Le parcours s'arrête donc à la première opération strictement plus
+        ancienne, et les opérations de la date limite sont réindexées.
+        """
+        operations: List[Operation] = []
+        # Petites pages sans lecture anticipée : la synchronisation s'arrête en général dès la première
+        stream = api_client.iter_operations(
+            token, compte_id, page_size=OPERATION_INDEX_SYNC_PAGE_SIZE, read_ahead=1, discord_id=discord_id
+        )
+        
+        try:
+            async for operation in stream:
+                if operation.date_operation < newest_date:
+                    break
+                operations.append(operation)
+        except BankAPIError as e:
+            if e.code in ACCESS_LOST_CODES:
+                # Accès au compte retiré : oublier ses opérations
+                await self._run(self._purge, principal, compte_id)
+            return False
+        finally:
+            await stream.aclose()
+        
+        newest_id = 0
+        if operations:
+            await self._run(self._insert, principal, compte_id, operations)
+            newest_id = max(op.id for op in operations)
+            newest_date = max(newest_date, max(op.date_operation for op in operations))
+        
+        await self._run(self._set_state, principal, compte_id, newest_id, newest_date, True)
+        return True
+    
+    async def sync_account(
+        self,
+        api_client: BankAPIClient,
+        token: str,
+        compte_id: int,
+        discord_id: Optional[str] = None
+    ) -> bool:
+        """Met à jour l'index d'un compte et indique s'il peut répondre aux recherches
+        
+        Un compte jamais indexé est parcouru en arrière-plan : la recherche
+        en cours doit alors passer par l'API. Avec `discord_id`, les pages
+        sont demandées avec le token courant de l'utilisateur, renouvelé si
+        le parcours dure plus longtemps que `token`.
+        """
+        principal = token_principal(token)
+        key = (principal, compte_id)
+        lock = self._sync_locks.setdefault(key, asyncio.Lock())
+        
+        async with lock:
+            state = await self._run(self._get_state, principal, compte_id)
+            
+            if state is None or not state[1]:
+                if key not in self._full_syncs:
+                    task = asyncio.create_task(
+                        self._full_sync(api_client, token, principal, compte_id, discord_id)
+                    )
+                    self._full_syncs[key] = task
+                    task.add_done_callback(lambda _: self._full_syncs.pop(key, None))
+                return False
+            
+            newest_date, _, synced_at = state
+            if time.time() - synced_at < OPERATION_INDEX_SYNC_INTERVAL:
+                return True
+            
+            return await self._incremental_sync(
+                api_client, token, principal, compte_id, newest_date, discord_id
+            )
+    
+    async def search(
+        self,
+        token: str,
+        compte_ids: List[int],
+        limit: int = 20,
+        **criteria: Any
+    ) -> List[Operation]:
+        """Recherche des opérations dans l'index (comptes déjà synchronisés uniquement)"""
+        self.local_searches += 1
+        return await self._run(self._search, token_principal(token), compte_ids, criteria, limit)
+    
+    async def mark_stale(self, token: str, compte_id: int):
+        """Signale une opération créée sur un compte : la prochaine recherche le resynchronise"""
+        await self._run(self._mark_stale, token_principal(token), compte_id)
+    
+    async def purge(self, token: str, compte_id: Optional[int] = None):
+        """Supprime les opérations indexées d'un utilisateur (par exemple après /unlink)"""
+        await self._run(self._purge, token_principal(token), compte_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs de l'index"""
+        return {
+            'local_searches': self.local_searches,
+            'api_fallbacks': self.api_fallbacks,
+            'full_syncs_running': len(self._full_syncs)
+        }
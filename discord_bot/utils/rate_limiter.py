@@ -0,0 +1,123 @@
+"""
+Limiteur de débit côté client, aligné sur la politique de l'API
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Hashable
+
+from config import (
+    RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW,
+    RATE_LIMIT_MAX_WAIT, RATE_LIMIT_MAX_BUCKETS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Seau à jetons : `capacity` requêtes en rafale, rechargé en continu"""
+    
+    def __init__(self, capacity: int, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+    
+    def _refill(self):
+        """Recharge le seau selon le temps écoulé"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+    
+    def try_acquire(self) -> float:
+        """Consomme un jeton, ou retourne le délai avant qu'un jeton soit disponible"""
+        self._refill()
+        
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        
+        return (1 - self.tokens) / self.refill_rate
+    
+    def drain(self, penalty: float):
+        """Vide le seau : aucun jeton avant `penalty` secondes (l'API a refusé la requête)"""
+        self._refill()
+        self.tokens = 1 - penalty * self.refill_rate
+
+
+class RateLimiter:
+    """Limiteur par utilisateur et groupe d'endpoints, reproduisant checkRateLimit de l'API"""
+    
+    def __init__(
+        self,
+        requests: int = RATE_LIMIT_REQUESTS,
+        window: float = RATE_LIMIT_WINDOW,
+        max_wait: float = RATE_LIMIT_MAX_WAIT,
+        max_buckets: int = RATE_LIMIT_MAX_BUCKETS
+    ):
+        self.requests = requests
+        self.window = window
+        self.max_wait = max_wait
+        self.max_buckets = max_buckets
+        self._buckets: 'OrderedDict[Hashable, TokenBucket]' = OrderedDict()
+        self.delayed = 0
+        self.rejected = 0
+    
+    @staticmethod
+    def endpoint_group(endpoint: str) -> str:
+        """Retourne le groupe d'un endpoint tel que compté par l'API (accounts, operations, user)"""
+        return endpoint.lstrip('/').split('/', 1)[0]
+    
+    def _bucket(self, key: Hashable) -> TokenBucket:
+        """Retourne le seau d'une clé, en oubliant les moins récemment utilisés"""
+        bucket = self._buckets.get(key)
+        
+        if bucket is None:
+            bucket = TokenBucket(self.requests, self.requests / self.window)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        
+        return bucket
+    
+    async def acquire(self, key: Hashable) -> float:
+        """Attend brièvement un jeton
+        
+        Retourne 0 si la requête peut partir, sinon le délai (retry_after)
+        avant qu'elle soit autorisée, sans attendre plus de `max_wait`.
+        """
+        bucket = self._bucket(key)
+        wait = bucket.try_acquire()
+        
+        if wait == 0:
+            return 0.0
+        
+        if wait > self.max_wait:
+            self.rejected += 1
+            logger.warning(f"Limite de débit locale atteinte pour {key}, réessayer dans {wait:.1f}s")
+            return wait
+        
+        self.delayed += 1
+        await asyncio.sleep(wait)
+        
+        # D'autres requêtes ont pu consommer le jeton pendant l'attente
+        wait = bucket.try_acquire()
+        if wait:
+            self.rejected += 1
+        return wait
+    
+    def penalize(self, key: Hashable):
+        """Bloque une clé pendant une fenêtre après une réponse 429 de l'API"""
+        self._bucket(key).drain(self.window)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du limiteur"""
+        return {
+            'buckets': len(self._buckets),
+            'delayed': self.delayed,
+            'rejected': self.rejected
+        }
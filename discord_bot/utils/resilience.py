@@ -0,0 +1,133 @@
+"""
+Outils de résilience pour le client API : backoff et disjoncteur
+"""
+
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Any, Deque, Tuple
+
+from config import (
+    API_RETRY_BASE_DELAY, API_RETRY_MAX_DELAY,
+    CIRCUIT_BREAKER_FAILURE_RATE, CIRCUIT_BREAKER_MIN_REQUESTS,
+    CIRCUIT_BREAKER_WINDOW, CIRCUIT_BREAKER_RESET_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(
+    attempt: int,
+    base_delay: float = API_RETRY_BASE_DELAY,
+    max_delay: float = API_RETRY_MAX_DELAY
+) -> float:
+    """Calcule le délai avant une nouvelle tentative (backoff exponentiel avec jitter complet)"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Disjoncteur basé sur le taux d'erreur de l'API sur une fenêtre glissante"""
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(
+        self,
+        failure_rate: float = CIRCUIT_BREAKER_FAILURE_RATE,
+        min_requests: int = CIRCUIT_BREAKER_MIN_REQUESTS,
+        window: float = CIRCUIT_BREAKER_WINDOW,
+        reset_timeout: float = CIRCUIT_BREAKER_RESET_TIMEOUT
+    ):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        # (horodatage, échec) des derniers appels
+        self._results: Deque[Tuple[float, bool]] = deque()
+    
+    def allow_request(self) -> bool:
+        """Indique si un appel vers l'API peut être tenté"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            
+            # Laisser passer un appel de test
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        
+        if self.state == self.HALF_OPEN:
+            # Un appel de test annulé ne doit pas bloquer le disjoncteur indéfiniment
+            probe_stale = time.monotonic() - self._probe_started >= self.reset_timeout
+            if self._probe_in_flight and not probe_stale:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+            self._probe_started = time.monotonic()
+        
+        return True
+    
+    def retry_after(self) -> float:
+        """Temps restant avant le prochain appel de test"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+    
+    def record_success(self):
+        """Enregistre un appel réussi"""
+        if self.state == self.HALF_OPEN:
+            logger.info("Disjoncteur API refermé, l'API répond à nouveau")
+            self.state = self.CLOSED
+            self._probe_in_flight = False
+            self._results.clear()
+            return
+        
+        self._record(False)
+    
+    def record_failure(self):
+        """Enregistre un appel en échec"""
+        if self.state == self.HALF_OPEN:
+            self._open()
+            return
+        
+        self._record(True)
+        
+        failures = sum(1 for _, failed in self._results if failed)
+        total = len(self._results)
+        if total >= self.min_requests and failures / total >= self.failure_rate:
+            self._open()
+    
+    def _record(self, failed: bool):
+        """Ajoute un résultat et oublie ceux sortis de la fenêtre"""
+        now = time.monotonic()
+        self._results.append((now, failed))
+        while self._results and self._results[0][0] < now - self.window:
+            self._results.popleft()
+    
+    def _open(self):
+        """Ouvre le disjoncteur"""
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._probe_in_flight = False
+        self._results.clear()
+        logger.warning(
+            f"Disjoncteur API ouvert : appels suspendus pendant {self.reset_timeout}s"
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retourne l'état du disjoncteur"""
+        return {
+            'state': self.state,
+            'times_opened': self.times_opened,
+            'rejected': self.rejected,
+            'retry_after': self.retry_after()
+        }
@@ -0,0 +1,42 @@
+"""
+Chiffrement des tokens JWT conservés hors de la mémoire du processus
+
+Les tokens placés dans un cache partagé ou enregistrés sur disque sont
+chiffrés avec Fernet, si le paquet cryptography est installé. La clé est
+TOKEN_ENCRYPTION_KEY, ou à défaut dérivée de API_BOT_TOKEN : tous les
+processus d'un même bot utilisent donc la même.
+"""
+
+import base64
+import hashlib
+import logging
+from typing import Optional
+
+from config import API_BOT_TOKEN, TOKEN_ENCRYPTION_KEY
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    Fernet = None
+    
+    class InvalidToken(Exception):
+        """Remplace l'exception de cryptography lorsque le paquet est absent"""
+
+logger = logging.getLogger(__name__)
+
+
+def token_cipher() -> Optional['Fernet']:
+    """Chiffreur des tokens, ou None si cryptography ou la clé manquent"""
+    if Fernet is None:
+        return None
+    
+    if TOKEN_ENCRYPTION_KEY:
+        try:
+            return Fernet(TOKEN_ENCRYPTION_KEY.encode('utf-8'))
+        except ValueError:
+            logger.error("TOKEN_ENCRYPTION_KEY n'est pas une clé Fernet valide, tokens non chiffrés")
+            return None
+    if API_BOT_TOKEN:
+        digest = hashlib.sha256(f"bankbot-token-key:{API_BOT_TOKEN}".encode('utf-8')).digest()
+        return Fernet(base64.urlsafe_b64encode(digest))
+    return None
@@ -0,0 +1,179 @@
+"""
+Traçage des requêtes HTTP vers l'API : durée de chaque phase et journal des requêtes lentes
+
+Un TraceConfig aiohttp horodate les étapes de chaque requête (attente d'une
+connexion du pool, résolution DNS, connexion TCP/TLS, envoi, attente de la
+réponse). Le client complète la trace avec la lecture du corps et le décodage
+JSON, puis la termine : les requêtes dépassant API_SLOW_REQUEST_THRESHOLD sont
+journalisées avec leurs phases, leur taille et leur identifiant X-Request-ID.
+"""
+
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from config import API_SLOW_REQUEST_THRESHOLD
+from utils.json_codec import dumps
+from utils.metrics import API_HTTP_PHASE_DURATION, endpoint_label
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Phases dans l'ordre où elles se produisent
+PHASES = ('queued', 'dns', 'connect', 'send', 'wait', 'read', 'decode')
+
+
+def new_request_id() -> str:
+    """Génère un identifiant de requête"""
+    return uuid.uuid4().hex
+
+
+class RequestTrace:
+    """Horodatage des phases d'une tentative de requête"""
+    
+    def __init__(self, request_id: str, method: str, endpoint: str, attempt: int = 0, request_bytes: int = 0):
+        self.request_id = request_id
+        self.method = method
+        self.endpoint = endpoint
+        self.attempt = attempt
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.status: Optional[int] = None
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+        self.reused_connection = False
+        # Début des phases en cours
+        self._marks: Dict[str, float] = {}
+    
+    def start(self, phase: str):
+        """Marque le début d'une phase"""
+        self._marks[phase] = time.perf_counter()
+    
+    def end(self, phase: str):
+        """Marque la fin d'une phase commencée avec start()"""
+        started = self._marks.pop(phase, None)
+        if started is not None:
+            self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - started
+    
+    def as_dict(self, total: float) -> Dict[str, Any]:
+        """Retourne la trace sous forme de dictionnaire (durées en millisecondes)"""
+        return {
+            'request_id': self.request_id,
+            'method': self.method,
+            'endpoint': self.endpoint,
+            'attempt': self.attempt,
+            'status': self.status,
+            'total_ms': round(total * 1000, 1),
+            'phases_ms': {
+                phase: round(self.phases[phase] * 1000, 1) for phase in PHASES if phase in self.phases
+            },
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'reused_connection': self.reused_connection
+        }
+    
+    def finish(self, status: Optional[int] = None) -> float:
+        """Termine la trace : métriques par phase et journal si la requête est lente"""
+        total = time.perf_counter() - self.started
+        self.status = status
+        
+        label = endpoint_label(self.endpoint)
+        for phase, duration in self.phases.items():
+            API_HTTP_PHASE_DURATION.labels(label, phase).observe(duration)
+        
+        if total >= API_SLOW_REQUEST_THRESHOLD:
+            record = self.as_dict(total)
+            logger.warning(
+                f"Requête lente {self.method} {self.endpoint} ({total * 1000:.0f} ms): "
+                f"{dumps(record).decode('utf-8')}",
+                extra={'trace': record}
+            )
+        return total
+
+
+def _trace(context) -> Optional[RequestTrace]:
+    """Retourne la trace associée à une requête aiohttp, s'il y en a une"""
+    trace = context.trace_request_ctx
+    return trace if isinstance(trace, RequestTrace) else None
+
+
+async def _on_queued_start(session, context, params):
+    trace = _trace(context)
+    if trace:
+        trace.start('queued')
+
+
+async def _on_queued_end(session, context, params):
+    trace = _trace(context)
+    if trace:
+        trace.end('queued')
+
+
+async def _on_dns_start(session, context, params):
+    trace = _trace(context)
+    if trace:
+        trace.start('dns')
+
+
+async def _on_dns_end(session, context, params):
+    trace = _trace(context)
+    if trace:
+        trace.end('dns')
+
+
+async def _on_connection_create_start(session, context, params):
+    trace = _trace(context)
+    if trace:
+        trace.start('connect')
+
+
+async def _on_connection_create_end(session, context, params):
+    trace = _trace(context)
+    if trace:
+        trace.end('connect')
+        # La résolution DNS a lieu pendant la création de la connexion
+        trace.phases['connect'] = max(0.0, trace.phases['connect'] - trace.phases.get('dns', 0.0))
+        # aiohttp émet on_request_start avant d'obtenir la connexion : l'envoi
+        # commence ici (ou à la reprise d'une connexion du pool)
+        trace.start('send')
+
+
+async def _on_connection_reuse(session, context, params):
+    trace = _trace(context)
+    if trace:
+        trace.reused_connection = True
+        trace.start('send')
+
+
+async def _on_request_headers_sent(session, context, params):
+    trace = _trace(context)
+    if trace:
+        trace.end('send')
+        trace.start('wait')
+
+
+async def _on_request_end(session, context, params):
+    trace = _trace(context)
+    if trace:
+        # En-têtes de la réponse reçus
+        trace.end('send')
+        trace.end('wait')
+
+
+def create_trace_config() -> aiohttp.TraceConfig:
+    """Crée le TraceConfig à attacher à la session HTTP du client"""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_queued_start.append(_on_queued_start)
+    trace_config.on_connection_queued_end.append(_on_queued_end)
+    trace_config.on_dns_resolvehost_start.append(_on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(_on_dns_end)
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuse)
+    trace_config.on_request_headers_sent.append(_on_request_headers_sent)
+    trace_config.on_request_end.append(_on_request_end)
+    return trace_config
@@ -2,8 +2,22 @@
 Validateurs pour les entrées utilisateur
 """
 
+from datetime import datetime
 from typing import Optional, Tuple
 
+VALID_OPERATION_TYPES = ('debit', 'credit', 'virement', 'prelevement', 'depot', 'retrait')
+_VALID_OPERATION_TYPES_SET = frozenset(VALID_OPERATION_TYPES)
+_INVALID_OPERATION_TYPE_ERROR = f"Type d'opération invalide. Types valides: {', '.join(VALID_OPERATION_TYPES)}"
+
+OPERATION_TYPE_DISPLAY_NAMES = {
+    'debit': 'Débit',
+    'credit': 'Crédit',
+    'virement': 'Virement',
+    'prelevement': 'Prélèvement',
+    'depot': 'Dépôt',
+    'retrait': 'Retrait'
+}
+
 
 def validate_amount(amount: float) -> Tuple[bool, Optional[str]]:
     """Valide un montant"""
@@ -22,10 +36,8 @@ def validate_amount(amount: float) -> Tuple[bool, Optional[str]]:
 
 def validate_operation_type(operation_type: str) -> Tuple[bool, Optional[str]]:
     """Valide un type d'opération"""
-    valid_types = ['debit', 'credit', 'virement', 'prelevement', 'depot', 'retrait']
-    
-    if operation_type.lower() not in valid_types:
-        return False, f"Type d'opération invalide. Types valides: {', '.join(valid_types)}"
+    if operation_type.lower() not in _VALID_OPERATION_TYPES_SET:
+        return False, _INVALID_OPERATION_TYPE_ERROR
     
     return True, None
 
@@ -49,6 +61,16 @@ def validate_account_id(account_id: int) -> Tuple[bool, Optional[str]]:
     return True, None
 
 
+def validate_date(date_str: str, field_name: str = "Date") -> Tuple[bool, Optional[str]]:
+    """Valide une date au format AAAA-MM-JJ"""
+    try:
+        datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        return False, f"{field_name} doit être au format AAAA-MM-JJ"
+    
+    return True, None
+
+
 def sanitize_input(text: str) -> str:
     """Nettoie une entrée utilisateur"""
     # Supprimer les espaces en début et fin
@@ -73,13 +95,4 @@ def sanitize_input(text: str) -> str:
 
 def format_operation_type_display(operation_type: str) -> str:
     """Formate un type d'opération pour l'affichage"""
-    display_names = {
-        'debit': 'Débit',
-        'credit': 'Crédit',
-        'virement': 'Virement',
-        'prelevement': 'Prélèvement',
-        'depot': 'Dépôt',
-        'retrait': 'Retrait'
-    }
-    
-    return display_names.get(operation_type.lower(), operation_type.capitalize())
+    return OPERATION_TYPE_DISPLAY_NAMES.get(operation_type.lower(), operation_type.capitalize())
@@ -0,0 +1,119 @@
+"""
+Redémarrage à chaud : instantané des caches enregistré à l'arrêt du bot
+
+Après un redémarrage, les premières commandes demandent toutes un token et
+la liste des comptes à l'API. L'instantané conserve les tokens encore
+valides (chiffrés avec Fernet, si le paquet cryptography est installé),
+les numéros des comptes déjà affichés et les utilisateurs récents, dont
+les comptes sont préchargés dès la connexion à Discord.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import API_BASE_URL, WARM_CACHE_MAX_AGE, TOKEN_REFRESH_MARGIN
+from utils.json_codec import dumps, loads
+from utils.token_crypto import InvalidToken, token_cipher
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class WarmCache:
+    """Contenu d'un instantané"""
+    
+    # Discord ID -> (token, expiration)
+    tokens: Dict[str, Tuple[str, float]] = field(default_factory=dict)
+    # ID de compte -> numéro de compte
+    account_numbers: Dict[int, str] = field(default_factory=dict)
+    # Discord IDs, du moins au plus récent
+    active_users: List[str] = field(default_factory=list)
+
+
+def save_warm_cache(path: str, cache: WarmCache) -> bool:
+    """Enregistre l'instantané (écriture atomique, fichier lisible par son seul propriétaire)"""
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time(),
+        'api_base_url': API_BASE_URL,
+        'account_numbers': {str(account_id): numero for account_id, numero in cache.account_numbers.items()},
+        'active_users': cache.active_users
+    }
+    
+    cipher = token_cipher()
+    if cipher is not None:
+        tokens = {discord_id: list(entry) for discord_id, entry in cache.tokens.items()}
+        snapshot['tokens'] = cipher.encrypt(dumps(tokens)).decode('ascii')
+    elif cache.tokens:
+        logger.info("Tokens non enregistrés : installez cryptography pour les conserver entre deux démarrages")
+    
+    temp_path = f"{path}.tmp"
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(dumps(snapshot))
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Impossible d'enregistrer le cache ({path}): {e}")
+        return False
+    return True
+
+
+def load_warm_cache(path: str) -> Optional[WarmCache]:
+    """Charge l'instantané, sans les tokens expirés ; None s'il est absent, périmé ou illisible"""
+    try:
+        with open(path, 'rb') as file:
+            snapshot = loads(file.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cache enregistré illisible ({path}): {e}")
+        return None
+    
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get('version') != SNAPSHOT_VERSION
+        or snapshot.get('api_base_url') != API_BASE_URL
+    ):
+        return None
+    
+    age = time.time() - snapshot.get('saved_at', 0)
+    if not 0 <= age <= WARM_CACHE_MAX_AGE:
+        logger.info(f"Cache enregistré ignoré (âge {age:.0f}s)")
+        return None
+    
+    try:
+        cache = WarmCache(
+            account_numbers={
+                int(account_id): str(numero) for account_id, numero in snapshot.get('account_numbers', {}).items()
+            },
+            active_users=[str(discord_id) for discord_id in snapshot.get('active_users', [])]
+        )
+    except (AttributeError, TypeError, ValueError) as e:
+        logger.warning(f"Cache enregistré corrompu, ignoré ({path}): {e}")
+        return None
+    
+    cipher = token_cipher()
+    if cipher is not None and snapshot.get('tokens'):
+        limit = time.time() + TOKEN_REFRESH_MARGIN
+        try:
+            tokens = loads(cipher.decrypt(snapshot['tokens'].encode('ascii')))
+            cache.tokens = {
+                str(discord_id): (str(token), float(expires_at))
+                for discord_id, (token, expires_at) in tokens.items()
+                if float(expires_at) > limit
+            }
+        except InvalidToken:
+            # Clé changée (TOKEN_ENCRYPTION_KEY ou API_BOT_TOKEN) : les tokens sont perdus
+            logger.warning("Tokens enregistrés indéchiffrables, ignorés")
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.warning(f"Tokens enregistrés corrompus, ignorés: {e}")
+    
+    return cache